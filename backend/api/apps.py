@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .cache import check_shared_cache
+
+        check_shared_cache()
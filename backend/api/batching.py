@@ -0,0 +1,73 @@
+"""
+Batched maintenance writes.
+
+Sweepers walk a queryset in primary-key order (``pk > last_seen``), so every
+batch is a short indexed range scan and its own transaction: no statement
+holds locks for long and no ``OFFSET`` work grows as the table is processed.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class BatchStats:
+    batches: int = 0
+    rows: int = 0
+    related_rows: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "related_rows": self.related_rows,
+            "seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rate, 1),
+        }
+
+
+def iter_pk_batches(queryset, batch_size: int):
+    """Yield lists of primary keys from ``queryset`` in ascending pk ranges."""
+    last = None
+    while True:
+        qs = queryset.order_by("pk")
+        if last is not None:
+            qs = qs.filter(pk__gt=last)
+        pks = list(qs.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+        if len(pks) < batch_size:
+            return
+
+
+def delete_in_batches(queryset, batch_size: int = 1000, pause: float = 0.0, on_batch=None) -> BatchStats:
+    """
+    Delete the rows of ``queryset`` one pk range at a time.
+
+    Each batch re-applies the queryset's filters, so a row that stopped
+    matching after it was listed (e.g. a cart that was just used) survives.
+    ``on_batch(pks, stats)`` runs before each delete.
+    """
+    stats = BatchStats()
+    for pks in iter_pk_batches(queryset, batch_size):
+        if on_batch:
+            on_batch(pks, stats)
+        deleted, per_model = queryset.filter(pk__in=pks).delete()
+        own = per_model.get(queryset.model._meta.label, 0)
+        stats.batches += 1
+        stats.rows += own
+        stats.related_rows += deleted - own
+        if pause:
+            time.sleep(pause)
+    return stats
@@ -0,0 +1,170 @@
+"""
+Endpoint benchmark: latency percentiles and query counts per public endpoint.
+
+Requests go through Django's test client (the full middleware and view stack,
+no network), so numbers are comparable between commits on the same machine.
+Only read endpoints are measured; writes would change the data under test.
+By default the catalog caches are off (``CATALOG_CACHE_TIMEOUT=0``), so cached
+responses cannot hide query regressions; ``warm=True`` measures
+cached serving. In-process indexes (search, facets) are built by the warm-up
+request in both modes, as they would be on a running server.
+"""
+
+import math
+import statistics
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Product as ApiProduct
+from cart.models import Cart, CartItem
+from catalog.models import Category, Product, ProductVariant
+from orders.models import Order
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    headers: dict = field(default_factory=dict)
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def _bench_cart(prefix: str) -> str:
+    session_id = f"{prefix}-bench-cart"
+    cart, created = Cart.objects.get_or_create(cart_session_id=session_id)
+    if created:
+        variants = ProductVariant.objects.order_by("pk")[:5]
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product_variant=v, quantity=1, price_snapshot=v.price) for v in variants]
+        )
+    return session_id
+
+
+def endpoints(prefix: str = "load") -> list[Endpoint]:
+    """The endpoint set, with paths pointing at existing (preferably load) rows."""
+    active = Product.objects.filter(is_active=True).order_by("pk")
+    product = active.filter(slug__startswith=f"{prefix}-p-").first() or active.first()
+    category = Category.objects.filter(parent__isnull=True, children__isnull=False).order_by("pk").first()
+    order = Order.objects.filter(user__isnull=False).order_by("-created_at").first()
+
+    found = [
+        Endpoint("health", "/api/health/"),
+        Endpoint("api.brands", "/api/brands/"),
+        Endpoint("api.categories", "/api/categories/"),
+        Endpoint("api.products", "/api/products/"),
+        Endpoint("catalog.categories", "/api/catalog/categories/"),
+        Endpoint("catalog.products", "/api/catalog/products/"),
+        Endpoint("catalog.products.by_price", "/api/catalog/products/?ordering=price&in_stock=true"),
+        Endpoint("catalog.products.facets", "/api/catalog/products/facets/"),
+        Endpoint("orders.shipping_estimate", "/api/orders/shipping/estimate/?pincode=600001"),
+    ]
+    api_product = ApiProduct.objects.order_by("pk").first()
+    if api_product is not None:
+        found.append(Endpoint("api.product_detail", f"/api/products/{api_product.slug}/"))
+    if product is not None:
+        word = product.title.split()[0]
+        found += [
+            Endpoint("catalog.product_detail", f"/api/catalog/products/{product.slug}/"),
+            Endpoint("search", f"/api/search/?q={word}"),
+            Endpoint("catalog.products.search", f"/api/catalog/products/?search={word}"),
+            Endpoint("cart", "/api/cart/", {"HTTP_X_CART_SESSION": _bench_cart(prefix)}),
+        ]
+    if category is not None:
+        found += [
+            Endpoint("catalog.products.category", f"/api/catalog/products/?category={category.slug}"),
+            Endpoint("catalog.products.facets.category", f"/api/catalog/products/facets/?category={category.slug}"),
+        ]
+    if order is not None:
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(order.user)}"}
+        found += [
+            Endpoint("orders.list", "/api/orders/", auth),
+            Endpoint("orders.detail", f"/api/orders/{order.pk}/", auth),
+            Endpoint("orders.tracking", f"/api/orders/{order.pk}/tracking/"),
+        ]
+    return found
+
+
+def _client() -> Client:
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")]
+    return Client(HTTP_HOST=hosts[0] if hosts else "localhost")
+
+
+def measure(client: Client, endpoint: Endpoint, iterations: int, warm: bool = False) -> dict:
+    timings = []
+    queries = []
+    with nullcontext() if warm else override_settings(CATALOG_CACHE_TIMEOUT=0):
+        client.get(endpoint.path, **endpoint.headers)  # warm-up: imports, connections, indexes
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(endpoint.path, **endpoint.headers)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+    return {
+        "name": endpoint.name,
+        "path": endpoint.path,
+        "status": response.status_code,
+        "bytes": len(response.content),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "queries": max(queries),
+    }
+
+
+def scale_info(prefix: str = "load") -> dict:
+    return {
+        "products": Product.objects.count(),
+        "variants": ProductVariant.objects.count(),
+        "orders": Order.objects.count(),
+        "load_products": Product.objects.filter(slug__startswith=f"{prefix}-p-").count(),
+    }
+
+
+def run(iterations: int = 20, warm: bool = False, prefix: str = "load", only=None) -> dict:
+    client = _client()
+    results = []
+    for endpoint in endpoints(prefix):
+        if only and endpoint.name not in only:
+            continue
+        results.append(measure(client, endpoint, iterations, warm))
+    return {"scale": scale_info(prefix), "endpoints": results}
+
+
+def compare(baseline: list[dict], current: list[dict], threshold: float = 0.2) -> list[dict]:
+    """
+    Match runs by load-product scale and endpoint name. A row regresses when
+    it issues more queries, or its p95 grew by more than ``threshold``.
+    """
+    before = {
+        (result["scale"]["load_products"], row["name"]): row for result in baseline for row in result["endpoints"]
+    }
+    rows = []
+    for result in current:
+        for row in result["endpoints"]:
+            old = before.get((result["scale"]["load_products"], row["name"]))
+            if old is None:
+                continue
+            growth = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+            rows.append(
+                {
+                    "scale": result["scale"]["load_products"],
+                    "name": row["name"],
+                    "p95_ms": (old["p95_ms"], row["p95_ms"]),
+                    "queries": (old["queries"], row["queries"]),
+                    "regressed": row["queries"] > old["queries"] or growth > threshold,
+                }
+            )
+    return rows
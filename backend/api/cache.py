@@ -0,0 +1,168 @@
+"""
+Versioned response cache for the public catalog endpoints.
+
+Every cached response is keyed on a global catalog version. Catalog writes
+bump the version (see ``api.signals``), which orphans all previous entries at
+once instead of deleting them one by one.
+
+The version lives in ``CACHES["default"]``, and the in-process search and
+facet indexes rebuild when it changes. It must therefore be shared by every
+worker process (Redis, Memcached): with the default local-memory cache, a
+write on one worker is invisible to the others, which keep serving stale
+responses and indexes.
+
+Checkout moves stock far more often than anything else changes, so it bumps a
+separate stock version instead: the facet index re-reads only its in-stock
+bitmap when that one moves.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "catalog:version"
+STOCK_VERSION_KEY = "catalog:stock-version"
+MODIFIED_KEY = "catalog:modified"
+HITS_KEY = "catalog:cache:hits"
+MISSES_KEY = "catalog:cache:misses"
+PER_PROCESS_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def check_shared_cache() -> None:
+    """Refuse to start several workers on a per-process default cache."""
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.WEB_CONCURRENCY > 1 and backend in PER_PROCESS_BACKENDS:
+        raise ImproperlyConfigured(
+            f"WEB_CONCURRENCY={settings.WEB_CONCURRENCY} with the per-process cache {backend}: "
+            "catalog writes would not invalidate other workers. Set CACHE_URL to a shared cache."
+        )
+
+
+def get_catalog_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a cache flush never reuses an old version.
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        cache.add(MODIFIED_KEY, int(time.time()), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_catalog_modified() -> int:
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        get_catalog_version()
+        modified = cache.get(MODIFIED_KEY) or int(time.time())
+    return modified
+
+
+def bump_catalog_version() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+    cache.set(MODIFIED_KEY, int(time.time()), timeout=None)
+
+
+def get_stock_version() -> int:
+    version = cache.get(STOCK_VERSION_KEY)
+    if version is None:
+        cache.add(STOCK_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(STOCK_VERSION_KEY)
+    return version
+
+
+def bump_stock_version() -> None:
+    try:
+        cache.incr(STOCK_VERSION_KEY)
+    except ValueError:
+        get_stock_version()
+
+
+def _count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def cache_stats() -> dict:
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+def _request_digest(request) -> str:
+    params = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    raw = f"{request.path}?{params}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class CatalogCacheMixin:
+    """
+    Cache ``list``/``retrieve`` payloads of read-only catalog viewsets.
+
+    Adds ``ETag``/``Last-Modified`` headers, answers conditional requests with
+    304 and tags each response with ``X-Cache: HIT|MISS``.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        version = get_catalog_version()
+        modified = get_catalog_modified()
+        digest = _request_digest(request)
+        etag = f'W/"{version}-{digest[:16]}"'
+
+        if self._not_modified(request, etag, modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            return self._with_validators(response, etag, modified)
+
+        key = f"catalog:resp:{version}:{digest}"
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return self._with_validators(response, etag, modified)
+
+        _count(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+            self._with_validators(response, etag, modified)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def _not_modified(self, request, etag, modified) -> bool:
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        return since is not None and since >= modified
+
+    def _with_validators(self, response, etag, modified):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modified)
+        return response
@@ -0,0 +1,81 @@
+"""
+In-memory category hierarchy built from a single query.
+
+The tree is cached per catalog version (see ``api.cache``), so nested
+category payloads, breadcrumb paths and "category plus subcategories"
+product filters never walk ``parent``/``children`` in the database.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_catalog_version
+
+
+class CategoryTree:
+    def __init__(self, rows):
+        self.nodes = {row["id"]: row for row in rows}
+        self.by_slug = {row["slug"]: row["id"] for row in rows}
+        self.children = {}
+        for row in rows:
+            parent_id = row.get("parent_id")
+            if parent_id is not None and parent_id in self.nodes:
+                self.children.setdefault(parent_id, []).append(row["id"])
+
+    def children_data(self, category_id):
+        """Nested payload for the children of ``category_id``."""
+        return [self._serialize(child_id) for child_id in self.children.get(category_id, [])]
+
+    def descendant_ids(self, slug):
+        """Ids of the category with ``slug`` and all of its subcategories."""
+        root_id = self.by_slug.get(slug)
+        if root_id is None:
+            return set()
+        found = set()
+        stack = [root_id]
+        while stack:
+            node_id = stack.pop()
+            found.add(node_id)
+            stack.extend(self.children.get(node_id, []))
+        return found
+
+    def path(self, category_id):
+        """Breadcrumb from the root down to ``category_id``."""
+        path = []
+        node = self.nodes.get(category_id)
+        while node is not None and len(path) <= len(self.nodes):
+            path.append({"name": node["name"], "slug": node["slug"]})
+            node = self.nodes.get(node.get("parent_id"))
+        path.reverse()
+        return path
+
+    def _serialize(self, category_id):
+        node = self.nodes[category_id]
+        data = {"id": node["id"], "name": node["name"], "slug": node["slug"], "parent": node["parent_id"]}
+        for key in ("image_url", "is_active"):
+            if key in node:
+                data[key] = node[key]
+        data["children"] = self.children_data(category_id)
+        return data
+
+
+def get_category_tree(model) -> CategoryTree:
+    """
+    Return the cached tree for a category model (``api`` or ``catalog``).
+    Only active categories are included when the model has ``is_active``.
+    """
+    key = f"catalog:tree:{model._meta.label_lower}:{get_catalog_version()}"
+    tree = cache.get(key)
+    if tree is None:
+        field_names = {field.name for field in model._meta.concrete_fields}
+        fields = [
+            name
+            for name in ("id", "name", "slug", "image_url", "is_active")
+            if name in field_names
+        ]
+        qs = model._base_manager.all()
+        if "is_active" in field_names:
+            qs = qs.filter(is_active=True)
+        tree = CategoryTree(list(qs.order_by("name").values(*fields, "parent_id")))
+        cache.set(key, tree, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return tree
@@ -0,0 +1,60 @@
+"""Hot queries of the legacy product API, checked by ``audit_query_plans``."""
+
+import uuid
+from decimal import Decimal
+
+from django.utils import timezone
+
+from search.backends import rank_order
+
+from .models import Product
+from .query_audit import register, view_queryset
+from .views import ProductViewSet
+
+SOME_ID = uuid.UUID(int=1)
+
+
+@register("api.product_list_newest")
+def product_list_newest():
+    return view_queryset(ProductViewSet)
+
+
+@register("api.product_list_newest_after")
+def product_list_newest_after():
+    return view_queryset(ProductViewSet, "ordering=-created_at", after=(timezone.now(), SOME_ID))
+
+
+@register("api.product_list_by_price")
+def product_list_by_price():
+    return view_queryset(ProductViewSet, "ordering=price", after=(Decimal("999"), SOME_ID))
+
+
+@register("api.product_list_by_name")
+def product_list_by_name():
+    return view_queryset(ProductViewSet, "ordering=name&cursor=")
+
+
+@register("api.product_list_by_rating")
+def product_list_by_rating():
+    return view_queryset(ProductViewSet, "ordering=-rating&cursor=")
+
+
+@register("api.product_list_by_category")
+def product_list_by_category():
+    return view_queryset(ProductViewSet, where={"category_id__in": [SOME_ID]})
+
+
+@register("api.product_list_featured")
+def product_list_featured():
+    return view_queryset(ProductViewSet, "featured=true")
+
+
+@register("api.product_search")
+def product_search():
+    # ProductViewSet.get_queryset for ?search=: the ranked hits, best first.
+    ranked = [SOME_ID, uuid.UUID(int=2)]
+    return (
+        Product.objects.filter(is_active=True, pk__in=ranked)
+        .select_related("brand", "category")
+        .order_by(rank_order(Product, ranked), "pk")[:20]
+    )
@@ -0,0 +1,215 @@
+"""
+Synthetic catalog and order data for load and benchmark runs.
+
+Everything is written with ``bulk_create`` one batch at a time (one
+transaction per batch), so memory stays flat and the query count per batch is
+fixed whether the run makes a thousand products or a million. Generated rows
+are namespaced by ``prefix`` (slugs, SKUs, usernames) and runs are additive:
+``generate(products=1000)`` twice leaves 2000 load products.
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max, Min
+
+from api.cache import bump_catalog_version
+from catalog.models import Brand, Category, Product, ProductImage, ProductVariant
+from catalog.services import refresh_listing_summaries
+from orders.models import Order, OrderItem, Payment, create_default_shipments
+from search.backends import refresh_search_documents
+
+BRAND_COUNT = 50
+PARENT_CATEGORIES = 8
+CHILD_CATEGORIES = 5
+
+COLORS = ["Black", "White", "Blue", "Green", "Silver", "Gold", "Purple", "Red"]
+STORAGE = ["64GB", "128GB", "256GB", "512GB", "1TB"]
+RAM = ["4GB", "6GB", "8GB", "12GB", "16GB"]
+WORDS = ["Pro", "Max", "Ultra", "Lite", "Neo", "Plus", "Edge", "Prime", "Nova", "Turbo", "5G", "Mini"]
+
+# Order mix: (order status, payment status, weight)
+ORDER_MIX = [
+    (Order.Status.PAID, Payment.Status.PAID, 70),
+    (Order.Status.PENDING_PAYMENT, Payment.Status.CREATED, 20),
+    (Order.Status.CANCELLED, Payment.Status.FAILED, 10),
+]
+
+
+def _noop(message):
+    pass
+
+
+def _ensure_taxonomy(prefix: str) -> tuple[list, list]:
+    """Load brands and leaf categories (created once); returns their pks."""
+    Brand.objects.bulk_create(
+        [Brand(name=f"Brand {i}", slug=f"{prefix}-brand-{i}") for i in range(BRAND_COUNT)],
+        ignore_conflicts=True,
+    )
+    Category.objects.bulk_create(
+        [Category(name=f"Category {i}", slug=f"{prefix}-cat-{i}") for i in range(PARENT_CATEGORIES)],
+        ignore_conflicts=True,
+    )
+    parents = dict(Category.objects.filter(slug__startswith=f"{prefix}-cat-").values_list("slug", "pk"))
+    Category.objects.bulk_create(
+        [
+            Category(name=f"Category {i}.{j}", slug=f"{prefix}-cat-{i}-{j}", parent_id=parents[f"{prefix}-cat-{i}"])
+            for i in range(PARENT_CATEGORIES)
+            for j in range(CHILD_CATEGORIES)
+        ],
+        ignore_conflicts=True,
+    )
+    brands = list(Brand.objects.filter(slug__startswith=f"{prefix}-brand-").values_list("pk", flat=True))
+    leaves = list(
+        Category.objects.filter(slug__startswith=f"{prefix}-cat-", parent__isnull=False).values_list("pk", flat=True)
+    )
+    return brands, leaves
+
+
+def _product_batch(rng, prefix, start, stop, brands, leaves, variants_per, images_per):
+    products = [
+        Product(
+            title=f"{prefix.title()} Phone {index} {rng.choice(WORDS)}",
+            slug=f"{prefix}-p-{index}",
+            description=f"Synthetic product {index} for load testing.",
+            brand_id=rng.choice(brands),
+            category_id=rng.choice(leaves),
+        )
+        for index in range(start, stop)
+    ]
+    Product.objects.bulk_create(products)
+    if any(product.pk is None for product in products):
+        # Backends that cannot return ids from a bulk insert.
+        pks = dict(Product.objects.filter(slug__in=[p.slug for p in products]).values_list("slug", "pk"))
+        for product in products:
+            product.pk = pks[product.slug]
+
+    variants = []
+    images = []
+    for index, product in zip(range(start, stop), products):
+        base = Decimal(rng.randrange(5000, 150000, 500))
+        for j in range(variants_per):
+            price = base + 2000 * j
+            variants.append(
+                ProductVariant(
+                    product_id=product.pk,
+                    sku=f"{prefix}-{index}-{j}",
+                    price=price,
+                    mrp=(price * Decimal("1.1")).quantize(Decimal("1")),
+                    attributes={"color": rng.choice(COLORS), "storage": rng.choice(STORAGE), "ram": rng.choice(RAM)},
+                    stock_qty=rng.choice([0, rng.randint(1, 200)]) if j else rng.randint(1, 200),
+                )
+            )
+        images.extend(
+            ProductImage(
+                product_id=product.pk,
+                image_url=f"https://picsum.photos/seed/{prefix}-{index}-{i}/600/600",
+                sort_order=i,
+            )
+            for i in range(images_per)
+        )
+    ProductVariant.objects.bulk_create(variants)
+    ProductImage.objects.bulk_create(images)
+    refresh_listing_summaries([product.pk for product in products])
+    refresh_search_documents("catalog", [product.pk for product in products])
+    return len(products), len(variants)
+
+
+def _ensure_users(prefix: str, count: int) -> list:
+    User = get_user_model()
+    password = make_password(None)  # unusable; load users never log in
+    User.objects.bulk_create(
+        [User(username=f"{prefix}-user-{i}", password=password) for i in range(count)],
+        ignore_conflicts=True,
+    )
+    return list(User.objects.filter(username__startswith=f"{prefix}-user-").values_list("pk", flat=True)[:count])
+
+
+def _order_batch(rng, size, users, variant_range):
+    low, high = variant_range
+    wanted = [[rng.randint(low, high) for _ in range(rng.randint(1, 3))] for _ in range(size)]
+    prices = dict(
+        ProductVariant.objects.filter(pk__in={pk for lines in wanted for pk in lines}).values_list("pk", "price")
+    )
+
+    orders, items, payments = [], [], []
+    statuses = [mix[:2] for mix in ORDER_MIX]
+    weights = [mix[2] for mix in ORDER_MIX]
+    for lines in wanted:
+        lines = [pk for pk in dict.fromkeys(lines) if pk in prices]  # skip gaps in the pk range
+        if not lines:
+            continue
+        order_status, payment_status = rng.choices(statuses, weights)[0]
+        quantities = {pk: rng.randint(1, 2) for pk in lines}
+        subtotal = sum(prices[pk] * qty for pk, qty in quantities.items())
+        order = Order(user_id=rng.choice(users), status=order_status, subtotal=subtotal)
+        orders.append(order)
+        items.extend(
+            OrderItem(order=order, product_variant_id=pk, quantity=qty, price_snapshot=prices[pk])
+            for pk, qty in quantities.items()
+        )
+        payments.append(Payment(order=order, amount=subtotal, status=payment_status))
+
+    Order.objects.bulk_create(orders)
+    OrderItem.objects.bulk_create(items)
+    Payment.objects.bulk_create(payments)
+    create_default_shipments(order for order in orders if order.status == Order.Status.PAID)
+    return len(orders)
+
+
+def load_counts(prefix: str = "load") -> dict:
+    return {
+        "products": Product.objects.filter(slug__startswith=f"{prefix}-p-").count(),
+        "orders": Order.objects.filter(user__username__startswith=f"{prefix}-user-").count(),
+    }
+
+
+def generate(
+    products: int = 0,
+    variants_per: int = 3,
+    images_per: int = 2,
+    orders: int = 0,
+    users: int = 100,
+    batch_size: int = 2000,
+    prefix: str = "load",
+    seed: int = 0,
+    log=_noop,
+) -> dict:
+    """Add ``products`` products and ``orders`` orders; returns what was created."""
+    existing = load_counts(prefix)
+    rng = random.Random(f"{seed}-{existing['products']}-{existing['orders']}")
+    created = {"products": 0, "variants": 0, "orders": 0}
+
+    if products:
+        brands, leaves = _ensure_taxonomy(prefix)
+        start = existing["products"]
+        started = time.monotonic()
+        for batch_start in range(start, start + products, batch_size):
+            batch_stop = min(batch_start + batch_size, start + products)
+            with transaction.atomic():
+                made, variants = _product_batch(
+                    rng, prefix, batch_start, batch_stop, brands, leaves, variants_per, images_per
+                )
+            created["products"] += made
+            created["variants"] += variants
+            rate = created["products"] / max(time.monotonic() - started, 1e-6)
+            log(f"products {created['products']}/{products} ({rate:.0f}/s)")
+        bump_catalog_version()  # bulk_create sends no post_save
+
+    if orders:
+        user_ids = _ensure_users(prefix, users)
+        bounds = ProductVariant.objects.filter(sku__startswith=f"{prefix}-").aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            raise ValueError("No load variants yet; generate products before orders.")
+        started = time.monotonic()
+        while created["orders"] < orders:
+            size = min(batch_size, orders - created["orders"])
+            with transaction.atomic():
+                created["orders"] += _order_batch(rng, size, user_ids, (bounds["low"], bounds["high"]))
+            rate = created["orders"] / max(time.monotonic() - started, 1e-6)
+            log(f"orders {created['orders']}/{orders} ({rate:.0f}/s)")
+    return created
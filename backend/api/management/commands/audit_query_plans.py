@@ -0,0 +1,43 @@
+"""EXPLAIN the registered hot queries and fail on sequential scans of large tables."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.query_audit import audit
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on every registered hot query; exit non-zero on seq scans of large tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=10000,
+            help="Only tables with at least this many rows count as violations",
+        )
+        parser.add_argument("--query", action="append", dest="queries", help="Audit only this query (repeatable)")
+        parser.add_argument("--show-plans", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            results = audit(min_rows=options["min_rows"], names=options["queries"])
+        except NotImplementedError as exc:
+            raise CommandError(str(exc))
+
+        failed = 0
+        for result in results:
+            if result["violations"]:
+                failed += 1
+                tables = ", ".join(f"{table} (~{rows} rows)" for table, rows in result["violations"])
+                self.stdout.write(self.style.ERROR(f"FAIL {result['name']}: sequential scan on {tables}"))
+            elif result["seq_scans"]:
+                tables = ", ".join(result["seq_scans"])
+                self.stdout.write(f"ok   {result['name']} (seq scan on small table: {tables})")
+            else:
+                self.stdout.write(f"ok   {result['name']}")
+            if options["show_plans"]:
+                self.stdout.write(result["plan"])
+
+        if failed:
+            raise CommandError(f"{failed} of {len(results)} hot queries scan large tables sequentially")
+        self.stdout.write(self.style.SUCCESS(f"Done! {len(results)} query plans checked"))
@@ -0,0 +1,152 @@
+"""Benchmark every public read endpoint and store the results as JSON."""
+
+import json
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api import benchmark
+from api.loadgen import generate, load_counts
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure p50/p95 latency and query counts of the public endpoints, optionally at several "
+        "--scales (load products, generated as needed: use a dedicated database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            help="Comma-separated load-product counts, e.g. 1000,10000,100000; tops the data up before each run",
+        )
+        parser.add_argument("--variants-per", type=int, default=3)
+        parser.add_argument("--orders-per-product", type=float, default=1.0)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warm", action="store_true", help="Keep the cache between requests")
+        parser.add_argument("--endpoint", action="append", dest="endpoints", help="Only this endpoint (repeatable)")
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--output", help="JSON file (default: benchmarks/<timestamp>-<commit>.json)")
+        parser.add_argument("--compare", help="Earlier results file to diff against")
+        parser.add_argument("--threshold", type=float, default=0.2, help="p95 growth that counts as a regression")
+        parser.add_argument("--fail-on-regression", action="store_true")
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not ask before --scales writes load data into the configured database",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options["scales"].split(",")] if options["scales"] else [None]
+        except ValueError:
+            raise CommandError("--scales takes comma-separated integers")
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        if scales != [None] and options["interactive"]:
+            self._confirm_writes(max(scales))
+
+        runs = []
+        for scale in scales:
+            if scale is not None:
+                self._top_up(scale, options)
+            result = benchmark.run(
+                iterations=options["iterations"],
+                warm=options["warm"],
+                prefix=options["prefix"],
+                only=options["endpoints"],
+            )
+            runs.append(result)
+            self._print_run(result)
+
+        commit = _git_commit()
+        report = {
+            "commit": commit,
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "warm": options["warm"],
+            "runs": runs,
+        }
+        output = Path(
+            options["output"]
+            or settings.BASE_DIR / "benchmarks" / f"{timezone.now():%Y%m%d-%H%M%S}-{commit or 'nogit'}.json"
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(f"Results written to {output}")
+
+        if options["compare"]:
+            self._compare(options, runs)
+        self.stdout.write(self.style.SUCCESS("Done!"))
+
+    def _confirm_writes(self, scale):
+        name = connection.settings_dict["NAME"]
+        answer = input(
+            f"--scales adds up to {scale} load products (and their orders) to the {connection.vendor} "
+            f"database {name!s}, which is not rolled back. Use a dedicated database.\n"
+            "Type 'yes' to continue, or 'no' to cancel: "
+        )
+        if answer != "yes":
+            raise CommandError("Benchmark cancelled.")
+
+    def _top_up(self, scale, options):
+        have = load_counts(options["prefix"])
+        want_orders = int(scale * options["orders_per_product"])
+        products = max(scale - have["products"], 0)
+        orders = max(want_orders - have["orders"], 0)
+        if products or orders:
+            self.stdout.write(f"Generating {products} products and {orders} orders for scale {scale}...")
+            generate(
+                products=products,
+                orders=orders,
+                variants_per=options["variants_per"],
+                prefix=options["prefix"],
+            )
+
+    def _print_run(self, result):
+        scale = result["scale"]
+        self.stdout.write(
+            f"\n{scale['products']} products, {scale['variants']} variants, {scale['orders']} orders"
+        )
+        self.stdout.write(f"  {'endpoint':<36} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+        for row in result["endpoints"]:
+            self.stdout.write(
+                f"  {row['name']:<36} {row['status']:>6} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['queries']:>8}"
+            )
+
+    def _compare(self, options, runs):
+        try:
+            baseline = json.loads(Path(options["compare"]).read_text())["runs"]
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        rows = benchmark.compare(baseline, runs, threshold=options["threshold"])
+        self.stdout.write(f"\nCompared with {options['compare']}:")
+        for row in rows:
+            (old_p95, new_p95), (old_queries, new_queries) = row["p95_ms"], row["queries"]
+            line = (
+                f"  {row['scale']:>8} {row['name']:<36} p95 {old_p95:.2f} -> {new_p95:.2f} ms, "
+                f"queries {old_queries} -> {new_queries}"
+            )
+            self.stdout.write(self.style.ERROR(f"{line}  REGRESSION") if row["regressed"] else line)
+
+        regressions = sum(row["regressed"] for row in rows)
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{regressions} endpoint(s) regressed")
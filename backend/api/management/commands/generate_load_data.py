@@ -0,0 +1,44 @@
+"""Generate a large synthetic catalog and order history for load testing."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadgen import generate, load_counts
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert synthetic products, variants, images, users and orders (additive, namespaced by --prefix)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=0)
+        parser.add_argument("--variants-per", type=int, default=3)
+        parser.add_argument("--images-per", type=int, default=2)
+        parser.add_argument("--orders", type=int, default=0)
+        parser.add_argument("--users", type=int, default=100, help="Load users the orders are spread over")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--prefix", default="load", help="Slug/SKU/username prefix of generated rows")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            created = generate(
+                products=options["products"],
+                variants_per=options["variants_per"],
+                images_per=options["images_per"],
+                orders=options["orders"],
+                users=options["users"],
+                batch_size=options["batch_size"],
+                prefix=options["prefix"],
+                seed=options["seed"],
+                log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        totals = load_counts(options["prefix"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done! {created['products']} products, {created['variants']} variants, "
+                f"{created['orders']} orders created "
+                f"({totals['products']} load products, {totals['orders']} load orders in total)"
+            )
+        )
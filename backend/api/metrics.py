@@ -0,0 +1,321 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+``MetricsMiddleware`` records, per URL route and method: request counts by
+status, latency, SQL query count and time (through
+``connection.execute_wrapper``), response size and ``X-Cache`` outcomes.
+Each process aggregates in memory. With ``METRICS_DIR`` set, every process
+also writes its totals to ``<dir>/<host>-<pid>-<start time>.json`` at most
+every ``METRICS_FLUSH_SECONDS``, and ``/api/metrics/`` sums all of those
+files, so a scrape sees every gunicorn/uvicorn worker, not just the one that
+served it. A worker exiting normally folds its totals into
+``<dir>/retired.json`` and removes its own file, so counters never go
+backwards and the directory does not grow with worker restarts.
+"""
+
+import atexit
+import json
+import os
+import re
+import socket
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .cache import cache_stats
+
+try:
+    import fcntl
+except ImportError:  # Windows: retiring workers are not serialized
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+RETIRED_FILE = "retired.json"
+STARTED = int(time.time())  # tells apart files of processes that reused a pid
+
+# Router regexes: "(?P<slug>[^/.]+)" -> "<slug>".
+ROUTE_GROUP = re.compile(r"\(\?P<(\w+)>[^)]*\)")
+
+
+def _histogram(buckets) -> dict:
+    return {"buckets": [0] * len(buckets), "count": 0, "sum": 0}
+
+
+def _observe(histogram: dict, buckets, value) -> None:
+    # Per-bucket counts; cumulated when rendered.
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            histogram["buckets"][index] += 1
+            break
+    histogram["count"] += 1
+    histogram["sum"] += value
+
+
+def _new_route() -> dict:
+    return {
+        "status": {},
+        "cache": {},
+        "db_seconds": 0.0,
+        "duration": _histogram(LATENCY_BUCKETS),
+        "queries": _histogram(QUERY_BUCKETS),
+        "size": _histogram(SIZE_BUCKETS),
+    }
+
+
+def _merge(into, other):
+    """Sum ``other`` into ``into`` (nested dicts, lists and numbers)."""
+    for key, value in other.items():
+        if isinstance(value, dict):
+            _merge(into.setdefault(key, {}), value)
+        elif isinstance(value, list):
+            current = into.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            into[key] = into.get(key, 0) + value
+    return into
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._flushed = 0.0
+
+    def record(self, route, method, status, seconds, queries, db_seconds, size, cache_result=None):
+        with self._lock:
+            data = self._routes.get((route, method))
+            if data is None:
+                data = self._routes[(route, method)] = _new_route()
+            status_class = f"{status // 100}xx"
+            data["status"][status_class] = data["status"].get(status_class, 0) + 1
+            if cache_result:
+                data["cache"][cache_result] = data["cache"].get(cache_result, 0) + 1
+            data["db_seconds"] += db_seconds
+            _observe(data["duration"], LATENCY_BUCKETS, seconds)
+            _observe(data["queries"], QUERY_BUCKETS, queries)
+            if size is not None:
+                _observe(data["size"], SIZE_BUCKETS, size)
+        self._maybe_flush()
+
+    def snapshot(self) -> dict:
+        """``{"route method": data}``, a JSON-serializable deep copy."""
+        with self._lock:
+            return json.loads(json.dumps({f"{route} {method}": data for (route, method), data in self._routes.items()}))
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    # ── multi-process ──
+
+    def _path(self) -> Path | None:
+        directory = settings.METRICS_DIR
+        return Path(directory) / f"{socket.gethostname()}-{os.getpid()}-{STARTED}.json" if directory else None
+
+    def _maybe_flush(self):
+        if settings.METRICS_DIR and time.monotonic() - self._flushed >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        path = self._path()
+        if path is None:
+            return
+        self._flushed = time.monotonic()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        tmp.replace(path)  # atomic: readers never see a half-written file
+
+    def retire(self):
+        """At exit: fold this process's totals into the retired file and drop its own."""
+        path = self._path()
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        retired = path.parent / RETIRED_FILE
+        with open(path.parent / ".retired.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                totals = json.loads(retired.read_text())
+            except (OSError, ValueError):
+                totals = {}
+            tmp = retired.with_suffix(".tmp")
+            tmp.write_text(json.dumps(_merge(totals, self.snapshot())))
+            tmp.replace(retired)
+            path.unlink(missing_ok=True)
+
+    def collect(self) -> dict:
+        """This process's live totals plus every other process's last flush."""
+        merged = self.snapshot()
+        own = self._path()
+        if own is not None and own.parent.is_dir():
+            for path in own.parent.glob("*.json"):
+                if path == own:
+                    continue
+                try:
+                    _merge(merged, json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue  # being replaced or corrupt; next scrape picks it up
+        return merged
+
+
+registry = Registry()
+atexit.register(registry.retire)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times the SQL of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+    # The async path installs the wrapper on the view thread's connection.
+    def attach(self):
+        connection.execute_wrappers.append(self)
+
+    def detach(self):
+        if self in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self)
+
+
+def _route(request) -> str:
+    """The URL pattern, not the path, so labels stay few: ``/api/products/<slug>/``."""
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.route:
+        return "unmatched"
+    route = ROUTE_GROUP.sub(r"<\1>", match.route).replace("^", "").replace("$", "")
+    return f"/{route}"
+
+
+def _size(response):
+    if getattr(response, "streaming", False):
+        return None
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        await sync_to_async(recorder.attach)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.detach)()
+        self._record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    def _record(self, request, response, seconds, recorder):
+        registry.record(
+            _route(request),
+            request.method,
+            response.status_code,
+            seconds,
+            recorder.count,
+            recorder.seconds,
+            _size(response),
+            response.get("X-Cache"),
+        )
+
+
+# ── Prometheus text exposition ──
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _render_histogram(lines, name, buckets, histogram, labels):
+    running = 0
+    for bound, count in zip(buckets, histogram["buckets"]):
+        running += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {running}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram['count']}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram['count']}")
+
+
+def render(data: dict | None = None) -> str:
+    data = registry.collect() if data is None else data
+    routes = sorted((tuple(key.rsplit(" ", 1)), value) for key, value in data.items())
+    lines = []
+
+    lines += ["# HELP http_requests_total Requests by route, method and status class.", "# TYPE http_requests_total counter"]
+    for (route, method), value in routes:
+        for status, count in sorted(value["status"].items()):
+            lines.append(f"http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+
+    histograms = [
+        ("http_request_duration_seconds", "Request latency.", "duration", LATENCY_BUCKETS),
+        ("http_request_db_queries", "SQL queries per request.", "queries", QUERY_BUCKETS),
+        ("http_response_size_bytes", "Response body size (non-streaming).", "size", SIZE_BUCKETS),
+    ]
+    for name, help_text, field, buckets in histograms:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (route, method), value in routes:
+            _render_histogram(lines, name, buckets, value[field], {"route": route, "method": method})
+
+    lines += ["# HELP http_request_db_seconds_total Time spent in SQL.", "# TYPE http_request_db_seconds_total counter"]
+    for (route, method), value in routes:
+        lines.append(f"http_request_db_seconds_total{_labels(route=route, method=method)} {value['db_seconds']}")
+
+    lines += ["# HELP http_cache_responses_total Responses by X-Cache result.", "# TYPE http_cache_responses_total counter"]
+    for (route, method), value in routes:
+        for result, count in sorted(value["cache"].items()):
+            lines.append(f"http_cache_responses_total{_labels(route=route, method=method, result=result)} {count}")
+
+    stats = cache_stats()
+    lines += [
+        "# HELP catalog_cache_hits_total Catalog response cache hits.",
+        "# TYPE catalog_cache_hits_total counter",
+        f"catalog_cache_hits_total {stats['hits']}",
+        "# HELP catalog_cache_misses_total Catalog response cache misses.",
+        "# TYPE catalog_cache_misses_total counter",
+        f"catalog_cache_misses_total {stats['misses']}",
+    ]
+    if stats["hit_ratio"] is not None:
+        lines += [
+            "# HELP catalog_cache_hit_ratio Catalog cache hits / lookups.",
+            "# TYPE catalog_cache_hit_ratio gauge",
+            f"catalog_cache_hit_ratio {stats['hit_ratio']}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_rating_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_category_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='api_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price', 'id'], name='api_product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name', 'id'], name='api_product_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['rating', 'id'], name='api_product_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created_at'], name='api_product_category_idx'),
+        ),
+    ]
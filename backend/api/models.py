@@ -36,6 +36,9 @@ class Category(models.Model):
     class Meta:
         ordering = ["name"]
         verbose_name_plural = "categories"
+        indexes = [
+            models.Index(fields=["is_active", "name", "id"], name="api_category_keyset_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -67,6 +70,44 @@ class Product(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        # Keyset pagination: (<ordering>, id) over active products for each
+        # allowed ordering. Partial rather than led by is_active: SQLite
+        # renders is_active=True as a bare boolean term, which can match an
+        # index condition but not a leading index column.
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_active=True),
+                name="api_product_created_idx",
+            ),
+            models.Index(
+                fields=["price", "id"],
+                condition=models.Q(is_active=True),
+                name="api_product_price_idx",
+            ),
+            models.Index(
+                fields=["name", "id"],
+                condition=models.Q(is_active=True),
+                name="api_product_name_idx",
+            ),
+            models.Index(
+                fields=["rating", "id"],
+                condition=models.Q(is_active=True),
+                name="api_product_rating_idx",
+            ),
+            # Category (and subcategory) listings, newest first.
+            models.Index(
+                fields=["category", "-created_at"],
+                condition=models.Q(is_active=True),
+                name="api_product_category_idx",
+            ),
+            # ?featured=true: only the handful of featured rows are indexed.
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(is_active=True, is_featured=True),
+                name="api_product_featured_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
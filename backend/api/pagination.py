@@ -0,0 +1,156 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, keyset pagination when ``?cursor=`` is
+    present (empty value = first page).
+
+    Keyset mode orders by the queryset's first ordering term plus the primary
+    key as a tiebreaker and seeks past the last row, so there is no COUNT(*)
+    and no OFFSET however deep the client scrolls. Only ``next`` links are
+    produced; ``previous`` is always null.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.order_queryset(queryset, request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        rows = list(queryset[: page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = self.page_rows[-1]
+            self.next_cursor = self._encode_cursor(self._value_of(last, self.key), last.pk)
+        return self.page_rows
+
+    def order_queryset(self, queryset, request):
+        """
+        ``queryset`` in the order both modes page through and, in keyset mode,
+        seeked past the cursor. Nothing is executed, so ``api.query_audit`` can
+        EXPLAIN exactly what an endpoint runs.
+        """
+        # Both modes use the same total order (NULLs last for nullable keys, pk
+        # breaks ties), so rows are never repeated or skipped at page boundaries.
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        self.key, descending = self._ordering_key(queryset)
+        if self.key is None:
+            if not self.cursor_mode:
+                return queryset  # expression ordering, e.g. rank
+            self.key, descending = "pk", False
+        key = self.key
+        nullable = self._is_nullable(queryset.model, key)
+        if nullable:
+            first = F(key).desc(nulls_last=True) if descending else F(key).asc(nulls_last=True)
+        else:
+            # A plain ORDER BY matches the (key, id) keyset indexes; NULLS LAST would not.
+            first = f"-{key}" if descending else key
+        queryset = queryset.order_by(first, "-pk" if descending else "pk")
+
+        cursor = request.query_params.get(self.cursor_query_param) if self.cursor_mode else None
+        if cursor:
+            value, pk = self._decode_cursor(cursor)
+            try:
+                queryset = queryset.filter(self._seek(key, descending, nullable, value, pk))
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": None,
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    # ── helpers ──
+
+    def _ordering_key(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        term = ordering[0] if ordering else "pk"
+        if not isinstance(term, str):
+            return None, False
+        descending = term.startswith("-")
+        return term.lstrip("-"), descending
+
+    def _is_nullable(self, model, key):
+        if key == "pk":
+            return False
+        opts = model._meta
+        for part in key.split("__"):
+            try:
+                field = opts.get_field(part)
+            except FieldDoesNotExist:
+                return True  # annotation: assume it may be NULL
+            if field.null:
+                return True
+            if field.is_relation:
+                opts = field.related_model._meta
+        return False
+
+    def _value_of(self, obj, key):
+        if key == "pk":
+            return obj.pk
+        value = obj
+        for part in key.split("__"):
+            value = getattr(value, part, None)
+            if value is None:
+                return None
+        return value
+
+    def _seek(self, key, descending, nullable, value, pk):
+        op = "lt" if descending else "gt"
+        if value is None:
+            return Q(**{f"{key}__isnull": True, f"pk__{op}": pk})
+        condition = Q(**{f"{key}__{op}": value}) | Q(**{key: value, f"pk__{op}": pk})
+        if nullable:
+            condition |= Q(**{f"{key}__isnull": True})
+        return condition
+
+    def _encode_cursor(self, value, pk):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = value.isoformat()
+        elif value is not None and not isinstance(value, (int, float, str, bool)):
+            value = str(value)  # Decimal, UUID
+        payload = json.dumps([value, str(pk)], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def _decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
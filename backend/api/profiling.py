@@ -0,0 +1,217 @@
+"""
+On-demand profiling of a single request, for staff only.
+
+Add ``?__profile=1`` (or send ``X-Profile: 1``) as a staff user, by session or
+JWT. The request then runs under cProfile with every SQL statement recorded
+(timing, calling line in our code, repeated and duplicate statements). Two
+files are written to ``PROFILER_DIR``: ``<name>.prof`` (load it with pstats
+or snakeviz) and ``<name>.txt``, a readable report. The response carries
+``X-Profile-Report: <name>``. With ``?__profile=text`` the report is returned
+instead of the normal response body.
+"""
+
+import cProfile
+import io
+import pstats
+import re
+import threading
+import time
+import traceback
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+PARAM = "__profile"
+HEADER = "X-Profile"
+MIDDLEWARE_MODULES = ("api/metrics.py", "api/profiling.py")
+
+# Only one profiler can be active per interpreter.
+_profiler_lock = threading.Lock()
+
+
+def profile_mode(request) -> str | None:
+    """``"store"``, ``"text"`` or None when profiling was not asked for."""
+    value = request.GET.get(PARAM) or request.headers.get(HEADER)
+    if not value or value == "0":
+        return None
+    return "text" if value == "text" else "store"
+
+
+def is_profiler_user(request) -> bool:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    # API clients authenticate with JWT inside DRF views, after middleware.
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+class SQLTrace:
+    """``execute_wrapper`` that records each statement with its caller."""
+
+    def __init__(self):
+        self.queries = []
+        self.project_root = str(settings.BASE_DIR)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "sql": sql,
+                    "params": repr(params),
+                    "ms": (time.perf_counter() - start) * 1000,
+                    "caller": self._caller(),
+                }
+            )
+
+    def _caller(self) -> str:
+        # The innermost frame in our code (not Django, DRF or the middleware).
+        for frame, lineno in traceback.walk_stack(None):
+            filename = frame.f_code.co_filename
+            if not filename.startswith(self.project_root) or "site-packages" in filename:
+                continue
+            if filename.endswith(MIDDLEWARE_MODULES):
+                continue
+            path = Path(filename).relative_to(self.project_root)
+            return f"{path}:{lineno} in {frame.f_code.co_name}"
+        return "?"
+
+    def repeated(self) -> list[dict]:
+        """Statements run more than once with any params: the N+1 signature."""
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query["sql"]].append(query)
+        rows = [
+            {"sql": sql, "count": len(items), "ms": sum(q["ms"] for q in items), "caller": items[0]["caller"]}
+            for sql, items in groups.items()
+            if len(items) > 1
+        ]
+        return sorted(rows, key=lambda row: (-row["count"], -row["ms"]))
+
+    def duplicates(self) -> int:
+        """Statements repeated with identical params (pure waste)."""
+        seen = set()
+        dupes = 0
+        for query in self.queries:
+            key = (query["sql"], query["params"])
+            dupes += key in seen
+            seen.add(key)
+        return dupes
+
+
+def _shorten(sql: str, width: int = 160) -> str:
+    sql = re.sub(r"\s+", " ", sql)
+    return sql if len(sql) <= width else sql[: width - 3] + "..."
+
+
+def build_report(request, response, seconds, trace: SQLTrace, profiler) -> str:
+    sql_ms = sum(query["ms"] for query in trace.queries)
+    out = io.StringIO()
+    out.write(
+        f"{request.method} {request.get_full_path()}  {response.status_code}  {seconds * 1000:.1f} ms  "
+        f"{len(trace.queries)} queries ({sql_ms:.1f} ms)\n\n"
+    )
+
+    repeated = trace.repeated()
+    out.write(f"Repeated statements (N+1 suspects): {len(repeated)}; exact duplicates: {trace.duplicates()}\n")
+    for row in repeated:
+        out.write(f"  {row['count']:>5}x {row['ms']:>9.1f} ms  {row['caller']}\n         {_shorten(row['sql'])}\n")
+
+    out.write("\nAll statements:\n")
+    for index, query in enumerate(trace.queries, 1):
+        out.write(f"  {index:>4} {query['ms']:>9.2f} ms  {query['caller']}\n       {_shorten(query['sql'])}\n")
+
+    out.write("\nTop functions by cumulative time:\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.PROFILER_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def store_report(request, profiler, report: str) -> str:
+    directory = Path(settings.PROFILER_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = slugify(request.path.replace("/", "-"))[:60] or "root"
+    name = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{request.method.lower()}-{slug}-{uuid.uuid4().hex[:6]}"
+    profiler.dump_stats(directory / f"{name}.prof")
+    (directory / f"{name}.txt").write_text(report)
+    _prune(directory)
+    return name
+
+
+def _prune(directory: Path) -> None:
+    reports = sorted(directory.glob("*.txt"))
+    for old in reports[: max(len(reports) - settings.PROFILER_MAX_REPORTS, 0)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+class ProfilerMiddleware:
+    """Place after ``AuthenticationMiddleware``; inert unless asked for by staff."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._wanted(request):
+            return self.get_response(request)
+        return self._profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if profile_mode(request) is None or not await sync_to_async(self._wanted)(request):
+            return await self.get_response(request)
+        # Run the rest of the stack from one worker thread so cProfile and the
+        # SQL trace (both per thread) see the view, which runs in that thread too.
+        return await sync_to_async(self._profile)(request, async_to_sync(self.get_response))
+
+    def _wanted(self, request) -> bool:
+        return settings.PROFILER_ENABLED and profile_mode(request) is not None and is_profiler_user(request)
+
+    def _profile(self, request, get_response):
+        if not _profiler_lock.acquire(blocking=False):
+            response = get_response(request)
+            response["X-Profile-Report"] = "busy"
+            return response
+        try:
+            trace = SQLTrace()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            with connection.execute_wrapper(trace):
+                profiler.enable()
+                try:
+                    response = get_response(request)
+                finally:
+                    profiler.disable()
+            seconds = time.perf_counter() - start
+        finally:
+            _profiler_lock.release()
+
+        report = build_report(request, response, seconds, trace, profiler)
+        name = store_report(request, profiler, report)
+        if profile_mode(request) == "text":
+            response = HttpResponse(report, content_type="text/plain; charset=utf-8")
+        response["X-Profile-Report"] = name
+        return response
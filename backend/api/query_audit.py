@@ -0,0 +1,116 @@
+"""
+Registry of hot queries whose plans are checked by ``audit_query_plans``.
+
+Apps register queryset factories in a ``hot_queries`` module::
+
+    from api.query_audit import register
+
+    @register("orders.webhook_payment_lookup")
+    def webhook_payment_lookup():
+        return Payment.objects.filter(razorpay_order_id="order_x")
+
+Listing endpoints register ``view_queryset(ViewSet, "ordering=...")`` so the
+audited plan is the one the endpoint runs, pagination order included.
+
+The command runs ``EXPLAIN`` on each one and reports sequential scans over
+tables above a row threshold, where an index should have been used.
+"""
+
+import re
+
+from django.db import connection
+from django.http import HttpRequest, QueryDict
+from django.utils.module_loading import autodiscover_modules
+from rest_framework.request import Request
+
+HOT_QUERIES = {}
+
+# Full-table scans as they appear in EXPLAIN output, per backend.
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    # "SCAN t USING INDEX i" is an index walk; bare "SCAN t" reads the table.
+    # The \b stops \w+ from backtracking to a prefix ("SCAN fo") to dodge the lookahead.
+    "sqlite": re.compile(r"\bSCAN (\w+)\b(?! USING)"),
+}
+
+
+def register(name: str):
+    def decorator(factory):
+        HOT_QUERIES[name] = factory
+        return factory
+
+    return decorator
+
+
+def view_queryset(viewset_class, query: str = "", after=None, where=None):
+    """
+    The first page ``viewset_class`` lists for ``?query``, filtered, ordered
+    and sliced as its paginator would, without running it. ``after`` is a
+    ``(value, pk)`` keyset cursor to seek past. ``where`` stands in for filters
+    the view resolves from data, e.g. ``{"category_id__in": [1, 2]}`` for a
+    category slug.
+    """
+    http_request = HttpRequest()
+    http_request.method = "GET"
+    http_request.GET = QueryDict(query, mutable=True)
+    view = viewset_class(args=(), kwargs={}, action="list", format_kwarg=None)
+    paginator = view.paginator
+    if after is not None:
+        http_request.GET[paginator.cursor_query_param] = paginator._encode_cursor(*after)
+    view.request = request = Request(http_request)
+    queryset = view.filter_queryset(view.get_queryset())
+    if where:
+        queryset = queryset.filter(**where)
+    queryset = paginator.order_queryset(queryset, request)
+    return queryset[: paginator.get_page_size(request)]
+
+
+def discover() -> dict:
+    autodiscover_modules("hot_queries")
+    return HOT_QUERIES
+
+
+def table_sizes(tables) -> dict:
+    """Estimated row counts (planner statistics on PostgreSQL, COUNT(*) elsewhere)."""
+    tables = sorted(set(tables))
+    if not tables:
+        return {}
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(%s) AND relkind = 'r'",
+                [tables],
+            )
+            return dict(cursor.fetchall())
+        sizes = {}
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            sizes[table] = cursor.fetchone()[0]
+        return sizes
+
+
+def audit(min_rows: int = 10000, names=None) -> list[dict]:
+    """
+    EXPLAIN every registered query (or only ``names``) and return one result
+    per query: ``{name, plan, seq_scans, violations}`` where violations are
+    sequentially scanned tables with at least ``min_rows`` rows.
+    """
+    pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        raise NotImplementedError(f"Plan audit is not supported on {connection.vendor}")
+
+    known_tables = set(connection.introspection.table_names())
+    results = []
+    for name, factory in sorted(discover().items()):
+        if names and name not in names:
+            continue
+        plan = factory().explain()
+        scans = {table for table in pattern.findall(plan) if table in known_tables}
+        results.append({"name": name, "plan": plan, "seq_scans": sorted(scans)})
+
+    sizes = table_sizes(table for result in results for table in result["seq_scans"])
+    for result in results:
+        result["violations"] = [
+            (table, sizes.get(table, 0)) for table in result["seq_scans"] if sizes.get(table, 0) >= min_rows
+        ]
+    return results
@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from .category_tree import get_category_tree
 from .models import Brand, Category, Product
 
 
@@ -18,8 +19,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug", "parent", "image_url", "is_active", "children"]
 
     def get_children(self, obj):
-        children = obj.children.filter(is_active=True)
-        return CategorySerializer(children, many=True).data
+        return get_category_tree(Category).children_data(obj.pk)
 
 
 class ProductListSerializer(serializers.ModelSerializer):
@@ -49,6 +49,7 @@ class ProductListSerializer(serializers.ModelSerializer):
 class ProductDetailSerializer(serializers.ModelSerializer):
     brand = BrandSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
+    category_path = serializers.SerializerMethodField()
     sale_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
@@ -59,6 +60,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             "slug",
             "brand",
             "category",
+            "category_path",
             "description",
             "price",
             "discount_percent",
@@ -73,6 +75,9 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    def get_category_path(self, obj):
+        return get_category_tree(Category).path(obj.category_id)
+
 
 User = get_user_model()
 
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+
+from catalog import models as catalog_models
+
+from . import models as api_models
+from .cache import bump_catalog_version
+
+CATALOG_MODELS = [
+    api_models.Brand,
+    api_models.Category,
+    api_models.Product,
+    catalog_models.Brand,
+    catalog_models.Category,
+    catalog_models.Product,
+    catalog_models.ProductVariant,
+    catalog_models.ProductImage,
+]
+
+
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+for model in CATALOG_MODELS:
+    uid = f"catalog-version-{model._meta.label_lower}"
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f"{uid}-save")
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f"{uid}-delete")
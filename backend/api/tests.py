@@ -1,3 +1,458 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from catalog.models import Brand as CatalogBrand, Category as CatalogCategory
+from catalog.models import Product as CatalogProduct, ProductListingSummary, ProductVariant
+from catalog.services import refresh_listing_summaries
+from orders.models import Order, Shipment
+
+from . import benchmark
+from .cache import get_catalog_version
+from .category_tree import CategoryTree, get_category_tree
+from .loadgen import generate, load_counts
+from .metrics import registry
+from .pagination import PageNumberOrCursorPagination
+from .models import Brand, Category
+from .profiling import SQLTrace
+from .query_audit import SEQ_SCAN_PATTERNS, audit
+
+INDEXED_LOOKUPS = [
+    "cart.by_session",
+    "cart.lines",
+    "orders.webhook_payment_lookup",
+    "orders.latest_payment",
+    "orders.user_order_list",
+    "orders.tracking_timeline",
+    "orders.expired_reservations",
+    "api.product_list_newest",
+    "api.product_list_newest_after",
+    "api.product_list_by_price",
+    "api.product_list_by_name",
+    "api.product_list_by_rating",
+    "api.product_list_by_category",
+    "api.product_list_featured",
+    "api.product_search",
+    "catalog.product_list_newest",
+    "catalog.product_list_newest_after",
+    "catalog.product_list_by_title_after",
+    "catalog.product_list_by_price",
+    "catalog.product_list_by_category",
+    "catalog.product_search",
+]
+
+
+class QueryPlanAuditTests(TestCase):
+    def test_hot_lookups_use_indexes(self):
+        results = audit(min_rows=0, names=INDEXED_LOOKUPS)
+        self.assertEqual(sorted(result["name"] for result in results), sorted(INDEXED_LOOKUPS))
+        for result in results:
+            self.assertEqual(result["violations"], [], f"{result['name']}:\n{result['plan']}")
+
+    def test_sqlite_pattern_ignores_index_walks(self):
+        pattern = SEQ_SCAN_PATTERNS["sqlite"]
+        self.assertEqual(pattern.findall("SCAN foo USING INDEX foo_idx"), [])
+        self.assertEqual(pattern.findall("SCAN foo USING COVERING INDEX foo_idx"), [])
+        self.assertEqual(pattern.findall("SEARCH foo USING INDEX foo_idx (id=?)"), [])
+        self.assertEqual(pattern.findall("SCAN foo\nSCAN bar USING INDEX bar_idx\nSCAN baz"), ["foo", "baz"])
+
+
+class CatalogCacheTests(TestCase):
+    url = "/api/catalog/categories/"
+
+    def setUp(self):
+        cache.clear()
+        CatalogCategory.objects.create(name="Phones", slug="phones")
+
+    def test_catalog_writes_bump_the_version(self):
+        version = get_catalog_version()
+        brand = CatalogBrand.objects.create(name="Acme", slug="acme")
+        self.assertGreater(get_catalog_version(), version)
+        version = get_catalog_version()
+        brand.delete()
+        self.assertGreater(get_catalog_version(), version)
+
+    def test_hits_are_served_without_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second.json(), first.json())
+
+    def test_conditional_requests_get_304_until_a_write(self):
+        first = self.client.get(self.url)
+        etag = first["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304
+        )
+
+        CatalogCategory.objects.create(name="Tablets", slug="tablets")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.phones = CatalogCategory.objects.create(name="Phones", slug="phones")
+        self.android = CatalogCategory.objects.create(name="Android", slug="android", parent=self.phones)
+        self.foldable = CatalogCategory.objects.create(name="Foldable", slug="foldable", parent=self.android)
+        self.tablets = CatalogCategory.objects.create(name="Tablets", slug="tablets")
+
+    def test_built_from_one_query_and_cached(self):
+        with self.assertNumQueries(1):
+            get_category_tree(CatalogCategory)
+        with self.assertNumQueries(0):
+            tree = get_category_tree(CatalogCategory)
+        self.assertEqual(set(tree.by_slug), {"phones", "android", "foldable", "tablets"})
+
+    def test_descendants_include_every_level(self):
+        tree = get_category_tree(CatalogCategory)
+        self.assertEqual(tree.descendant_ids("phones"), {self.phones.pk, self.android.pk, self.foldable.pk})
+        self.assertEqual(tree.descendant_ids("foldable"), {self.foldable.pk})
+        self.assertEqual(tree.descendant_ids("missing"), set())
+
+    def test_path_runs_from_the_root(self):
+        tree = get_category_tree(CatalogCategory)
+        self.assertEqual([node["slug"] for node in tree.path(self.foldable.pk)], ["phones", "android", "foldable"])
+        self.assertEqual(tree.path(12345), [])
+
+    def test_path_survives_a_parent_cycle(self):
+        tree = CategoryTree(
+            [
+                {"id": 1, "name": "A", "slug": "a", "parent_id": 2},
+                {"id": 2, "name": "B", "slug": "b", "parent_id": 1},
+            ]
+        )
+        self.assertLessEqual(len(tree.path(1)), 3)
+
+    def test_category_writes_invalidate_the_tree(self):
+        get_category_tree(CatalogCategory)
+        self.foldable.parent = self.tablets
+        self.foldable.save()
+        tree = get_category_tree(CatalogCategory)
+        self.assertEqual([node["slug"] for node in tree.path(self.foldable.pk)], ["tablets", "foldable"])
+        self.assertNotIn(self.foldable.pk, tree.descendant_ids("phones"))
+
+        self.android.delete()
+        self.assertNotIn("android", get_category_tree(CatalogCategory).by_slug)
+
+    def test_inactive_categories_are_left_out_of_nested_payloads(self):
+        phones = Category.objects.create(name="Phones", slug="phones")
+        Category.objects.create(name="Android", slug="android", parent=phones)
+        Category.objects.create(name="Retired", slug="retired", parent=phones, is_active=False)
+        data = get_category_tree(Category).children_data(phones.pk)
+        self.assertEqual([child["slug"] for child in data], ["android"])
+        self.assertEqual(data[0]["children"], [])
+
+
+class PaginationTests(TestCase):
+    url = "/api/catalog/products/"
+
+    @classmethod
+    def setUpTestData(cls):
+        brand = CatalogBrand.objects.create(name="Acme", slug="acme")
+        category = CatalogCategory.objects.create(name="Phones", slug="phones")
+        # 45 products, titles in ties of three; every third one has no variant (NULL price).
+        products = CatalogProduct.objects.bulk_create(
+            CatalogProduct(title=f"Phone {i // 3:02}", slug=f"phone-{i}", brand=brand, category=category)
+            for i in range(45)
+        )
+        ProductVariant.objects.bulk_create(
+            ProductVariant(product=product, sku=f"SKU-{i}", price=1000 + (i % 5) * 100)
+            for i, product in enumerate(products)
+            if i % 3
+        )
+        refresh_listing_summaries()
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, query):
+        slugs = []
+        url = f"{self.url}?{query}&cursor="
+        pages = 0
+        while url:
+            body = self.client.get(url).json()
+            self.assertIsNone(body["previous"])
+            self.assertNotIn("count", body)
+            slugs += [item["slug"] for item in body["results"]]
+            url = body["next"]
+            pages += 1
+        return slugs, pages
+
+    def page_numbers(self, query):
+        slugs = []
+        url = f"{self.url}?{query}"
+        while url:
+            body = self.client.get(url).json()
+            slugs += [item["slug"] for item in body["results"]]
+            url = body["next"]
+        return slugs
+
+    def test_cursor_walk_matches_page_numbers_for_every_ordering(self):
+        for ordering in ["-created_at", "title", "-title", "price", "-price"]:
+            with self.subTest(ordering=ordering):
+                slugs, pages = self.walk(f"ordering={ordering}")
+                self.assertEqual(pages, 3)
+                self.assertEqual(len(slugs), 45)
+                self.assertEqual(len(set(slugs)), 45)
+                self.assertEqual(slugs, self.page_numbers(f"ordering={ordering}"))
+
+    def test_ties_on_the_ordering_key_break_on_pk(self):
+        slugs, _ = self.walk("ordering=title")
+        ids = dict(CatalogProduct.objects.values_list("slug", "pk"))
+        self.assertEqual(slugs[:3], sorted(slugs[:3], key=ids.get))
+        self.assertEqual([slugs[i] for i in (18, 19, 20)], sorted([slugs[i] for i in (18, 19, 20)], key=ids.get))
+
+    def test_null_prices_sort_last_in_both_directions(self):
+        for ordering in ["price", "-price"]:
+            slugs, _ = self.walk(f"ordering={ordering}")
+            unpriced = {f"phone-{i}" for i in range(0, 45, 3)}
+            self.assertEqual(set(slugs[-15:]), unpriced)
+
+    def test_only_nullable_keys_order_nulls_last(self):
+        def order_by_clause(query):
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(f"{self.url}?{query}")
+            sql = next(q["sql"] for q in captured if 'FROM "catalog_product"' in q["sql"] and "LIMIT" in q["sql"])
+            return sql.rsplit("ORDER BY", 1)[1]
+
+        for query in ["ordering=-created_at", "ordering=-created_at&cursor=", "ordering=title&cursor="]:
+            with self.subTest(query=query):
+                clause = order_by_clause(query)
+                self.assertNotIn("NULLS LAST", clause)
+                self.assertNotIn("IS NULL", clause)
+        clause = order_by_clause("ordering=price&cursor=")
+        self.assertTrue("NULLS LAST" in clause or "IS NULL" in clause, clause)
+
+    def test_invalid_cursors_are_404(self):
+        pagination = PageNumberOrCursorPagination()
+        cursors = [
+            "not-base64!",
+            "bm90IGpzb24",  # "not json"
+            pagination._encode_cursor("only-one", 1)[:-4],  # truncated
+            pagination._encode_cursor("yesterday", 1),  # wrong type for created_at
+            pagination._encode_cursor("2026-01-01T00:00:00+00:00", "abc"),  # wrong type for pk
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f"{self.url}?cursor={cursor}")
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()["detail"], "Invalid cursor")
+
+    def test_page_number_mode_is_the_default(self):
+        body = self.client.get(f"{self.url}?page=3").json()
+        self.assertEqual(body["count"], 45)
+        self.assertEqual(len(body["results"]), 5)
+        self.assertIsNone(body["next"])
+        self.assertIn("page=2", body["previous"])
+        self.assertEqual(self.client.get(f"{self.url}?page=4").status_code, 404)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client.force_login(User.objects.create_user("ops", password="pw", is_staff=True))
+
+    def scrape(self, **headers):
+        response = self.client.get("/api/metrics/", **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get("/api/products/")
+        self.client.get("/api/products/")
+        self.client.get("/api/products/missing-slug/")
+        body = self.scrape()
+
+        self.assertIn('http_requests_total{route="/api/products/",method="GET",status="2xx"} 2', body)
+        self.assertIn('http_requests_total{route="/api/products/<slug>/",method="GET",status="4xx"} 1', body)
+        self.assertIn('http_cache_responses_total{route="/api/products/",method="GET",result="HIT"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{route="/api/products/",method="GET"} 2', body)
+        self.assertIn('http_request_db_queries_bucket{route="/api/products/",method="GET",le="+Inf"} 2', body)
+        self.assertIn("catalog_cache_hits_total 1", body)
+
+        queries = registry.snapshot()["/api/products/ GET"]["queries"]
+        self.assertGreater(queries["sum"], 0)
+
+    def test_scrape_sums_every_process(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.client.get("/api/health/")
+            other = {"/api/health/ GET": {"status": {"2xx": 5}}}
+            Path(directory, "otherhost-1.json").write_text(json.dumps(other))
+            body = self.scrape()
+            self.assertTrue(any(Path(directory).glob("*-*.json")))
+
+        self.assertIn('http_requests_total{route="/api/health/",method="GET",status="2xx"} 6', body)
+
+    def test_exited_workers_are_folded_into_one_file(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.client.get("/api/health/")
+            registry.flush()
+            registry.retire()
+            registry.retire()  # a later worker exiting on the same directory
+            self.assertEqual([path.name for path in Path(directory).glob("*.json")], ["retired.json"])
+            registry.reset()
+            body = self.scrape()
+
+        self.assertIn('http_requests_total{route="/api/health/",method="GET",status="2xx"} 2', body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        self.scrape(HTTP_AUTHORIZATION="Bearer s3cret")
+
+    def test_only_staff_can_scrape_without_a_token(self):
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+        self.client.force_login(User.objects.create_user("shopper", password="pw"))
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reports = tempfile.TemporaryDirectory()
+        self.addCleanup(self.reports.cleanup)
+        self.staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.customer = User.objects.create_user("customer", password="pw")
+
+    def bearer(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+    def test_only_staff_can_profile(self):
+        with override_settings(PROFILER_DIR=self.reports.name):
+            anonymous = self.client.get("/api/products/?__profile=text")
+            customer = self.client.get("/api/products/?__profile=text", **self.bearer(self.customer))
+        for response in (anonymous, customer):
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertNotIn("X-Profile-Report", response)
+        self.assertEqual(list(Path(self.reports.name).iterdir()), [])
+
+    def test_staff_jwt_gets_text_report(self):
+        with override_settings(PROFILER_DIR=self.reports.name):
+            response = self.client.get("/api/products/?__profile=text", **self.bearer(self.staff))
+        report = response.content.decode()
+        self.assertTrue(report.startswith("GET /api/products/?__profile=text  200"))
+        self.assertIn("All statements:", report)
+        self.assertIn("api/pagination.py", report)
+        self.assertIn("Top functions by cumulative time:", report)
+
+    @override_settings(PROFILER_MAX_REPORTS=2)
+    def test_staff_session_stores_reports(self):
+        self.client.force_login(self.staff)
+        with override_settings(PROFILER_DIR=self.reports.name):
+            for _ in range(3):
+                response = self.client.get("/api/health/", HTTP_X_PROFILE="1")
+        self.assertEqual(response["Content-Type"], "application/json")
+        name = response["X-Profile-Report"]
+        self.assertTrue(Path(self.reports.name, f"{name}.prof").exists())
+        self.assertEqual(len(list(Path(self.reports.name).glob("*.txt"))), 2)
+
+    def test_trace_flags_repeated_and_duplicate_statements(self):
+        brands = [Brand.objects.create(name=f"B{i}", slug=f"b{i}") for i in range(3)]
+        trace = SQLTrace()
+        with connection.execute_wrapper(trace):
+            for brand in brands + brands[:1]:
+                Brand.objects.filter(pk=brand.pk).exists()
+        [row] = trace.repeated()
+        self.assertEqual(row["count"], 4)
+        self.assertIn("api/tests.py", row["caller"])
+        self.assertEqual(trace.duplicates(), 1)
+
+
+class LoadDataTests(TestCase):
+    def test_generated_rows_are_consistent(self):
+        created = generate(products=5, variants_per=2, images_per=1, orders=12, users=3, batch_size=2)
+        self.assertEqual(created, {"products": 5, "variants": 10, "orders": 12})
+        self.assertEqual(ProductListingSummary.objects.filter(product__slug__startswith="load-p-").count(), 5)
+        for order in Order.objects.prefetch_related("items", "payments"):
+            self.assertEqual(order.subtotal, sum(i.price_snapshot * i.quantity for i in order.items.all()))
+            self.assertEqual(len(order.payments.all()), 1)
+        paid = Order.objects.filter(status=Order.Status.PAID).count()
+        self.assertEqual(Shipment.objects.count(), paid)
+
+        # Additive: a second run continues the numbering.
+        generate(products=3, variants_per=1)
+        self.assertTrue(CatalogProduct.objects.filter(slug="load-p-7").exists())
+
+    def test_query_count_does_not_grow_with_batch_rows(self):
+        def queries_for(products):
+            with CaptureQueriesContext(connection) as captured:
+                generate(products=products, batch_size=100, prefix=f"q{products}")
+            return len(captured)
+
+        self.assertEqual(queries_for(3), queries_for(30))
+
+
+class BenchmarkTests(TestCase):
+    def test_every_endpoint_answers_and_results_are_saved(self):
+        generate(products=4, orders=4, users=2)
+        with tempfile.TemporaryDirectory() as directory:
+            first = Path(directory, "first.json")
+            second = Path(directory, "second.json")
+            call_command("benchmark_endpoints", iterations=2, output=str(first), stdout=io.StringIO())
+            out = io.StringIO()
+            call_command(
+                "benchmark_endpoints", iterations=2, output=str(second), compare=str(first), stdout=out
+            )
+            report = json.loads(second.read_text())
+
+        [run] = report["runs"]
+        self.assertEqual(run["scale"]["load_products"], 4)
+        names = {row["name"] for row in run["endpoints"]}
+        self.assertTrue({"catalog.products", "orders.list", "orders.tracking", "cart"} <= names)
+        for row in run["endpoints"]:
+            self.assertEqual(row["status"], 200, row)
+            self.assertLessEqual(row["p50_ms"], row["p95_ms"])
+        self.assertIn("Compared with", out.getvalue())
+
+    def test_iterations_must_be_positive(self):
+        with self.assertRaisesMessage(CommandError, "--iterations must be at least 1"):
+            call_command("benchmark_endpoints", iterations=0, stdout=io.StringIO())
+
+    def test_scales_ask_before_writing_load_data(self):
+        with mock.patch("builtins.input", return_value="no") as ask, self.assertRaisesMessage(
+            CommandError, "Benchmark cancelled."
+        ):
+            call_command("benchmark_endpoints", scales="2", stdout=io.StringIO())
+        self.assertIn(connection.vendor, ask.call_args.args[0])
+        self.assertEqual(load_counts("load")["products"], 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                "benchmark_endpoints",
+                scales="2",
+                iterations=1,
+                interactive=False,
+                output=str(Path(directory, "run.json")),
+                stdout=io.StringIO(),
+            )
+        self.assertEqual(load_counts("load")["products"], 2)
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 21))
+        self.assertEqual(benchmark.percentile(values, 50), 10)
+        self.assertEqual(benchmark.percentile(values, 95), 19)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
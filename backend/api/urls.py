@@ -10,6 +10,7 @@ router.register(r"products", views.ProductViewSet, basename="product")
 
 urlpatterns = [
     path("health/", views.health, name="health"),
+    path("metrics/", views.metrics, name="metrics"),
     path("auth/register/", views.register, name="auth-register"),
     path("", include(router.urls)),
 ]
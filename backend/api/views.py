@@ -1,7 +1,17 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from search.backends import rank_order, search_ids
+
+from .cache import CatalogCacheMixin, cache_stats
+from .category_tree import get_category_tree
+from .metrics import render as render_metrics
 from .models import Brand, Category, Product
 from .serializers import (
     BrandSerializer,
@@ -15,16 +25,30 @@ from .serializers import (
 
 @api_view(["GET"])
 def health(request):
-    return Response({"status": "ok", "service": "mobile-shop-api"})
+    return Response(
+        {"status": "ok", "service": "mobile-shop-api", "catalog_cache": cache_stats()}
+    )
+
 
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint (see ``api.metrics``); staff sessions only without METRICS_TOKEN."""
+    token = settings.METRICS_TOKEN
+    if token:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse(status=401)
+    elif not request.user.is_staff:
+        return HttpResponse(status=403)
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
-class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+
+class BrandViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Brand.objects.filter(is_active=True)
     serializer_class = BrandSerializer
     lookup_field = "slug"
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     lookup_field = "slug"
 
@@ -32,16 +56,16 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         return Category.objects.filter(is_active=True, parent__isnull=True)
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     lookup_field = "slug"
 
     def get_queryset(self):
         qs = Product.objects.filter(is_active=True).select_related("brand", "category")
 
-        # Filter by category slug
+        # Filter by category slug (including its subcategories)
         category = self.request.query_params.get("category")
         if category:
-            qs = qs.filter(category__slug=category)
+            qs = qs.filter(category_id__in=get_category_tree(Category).descendant_ids(category))
 
         # Filter by brand slug
         brand = self.request.query_params.get("brand")
@@ -53,13 +77,18 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         if featured == "true":
             qs = qs.filter(is_featured=True)
 
-        # Search by name
+        # Search by name/brand/category/description via the search index
         search = self.request.query_params.get("search")
+        ranked = None
         if search:
-            qs = qs.filter(name__icontains=search)
-
-        # Ordering
-        ordering = self.request.query_params.get("ordering", "-created_at")
+            ranked = search_ids("api", search)
+            qs = qs.filter(pk__in=ranked)
+
+        # Ordering: best match first when searching, unless asked otherwise
+        ordering = self.request.query_params.get("ordering")
+        if ranked is not None and not ordering:
+            return qs.order_by(rank_order(Product, ranked), "pk")
+        ordering = ordering or "-created_at"
         allowed = {"price", "-price", "rating", "-rating", "name", "-name", "-created_at"}
         if ordering in allowed:
             qs = qs.order_by(ordering)
@@ -0,0 +1,17 @@
+"""Hot cart queries, checked by ``audit_query_plans``."""
+
+import uuid
+
+from api.query_audit import register
+
+from .models import Cart, CartItem
+
+
+@register('cart.by_session')
+def cart_by_session():
+    return Cart.objects.filter(cart_session_id='audit-session')
+
+
+@register('cart.lines')
+def cart_lines():
+    return CartItem.objects.filter(cart_id=uuid.UUID(int=0)).order_by('pk')
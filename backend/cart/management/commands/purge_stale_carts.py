@@ -0,0 +1,41 @@
+"""Delete abandoned guest carts in small primary-key batches."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cart.services import purge_stale_carts, stale_guest_carts
+
+
+class Command(BaseCommand):
+    help = "Delete guest carts untouched for --days (empty ones after --empty-days)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CART_STALE_DAYS)
+        parser.add_argument("--empty-days", type=int, default=settings.CART_EMPTY_STALE_DAYS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        thresholds = {"stale_days": options["days"], "empty_days": options["empty_days"]}
+        if options["dry_run"]:
+            count = stale_guest_carts(**thresholds).count()
+            self.stdout.write(f"{count} carts would be deleted")
+            return
+
+        def progress(pks, stats):
+            self.stdout.write(f"Batch {stats.batches + 1}: {len(pks)} carts ({stats.rows} deleted so far)")
+
+        stats = purge_stale_carts(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            on_batch=progress,
+            **thresholds,
+        )
+        metrics = stats.as_dict()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done! {metrics['rows']} carts and {metrics['related_rows']} cart items deleted "
+                f"in {metrics['batches']} batches ({metrics['seconds']}s, {metrics['rows_per_second']} carts/s)"
+            )
+        )
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """
+    Blank session ids become NULL, then duplicate carts per user / session are
+    folded into the most recently updated one: orders are re-pointed and lines
+    for variants the surviving cart lacks are moved over.
+    """
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    Order = apps.get_model('orders', 'Order')
+
+    Cart.objects.filter(cart_session_id='').update(cart_session_id=None)
+
+    for field in ('user', 'cart_session_id'):
+        duplicates = (
+            Cart.objects.exclude(**{f'{field}__isnull': True})
+            .values(field)
+            .annotate(n=Count('id'))
+            .filter(n__gt=1)
+            .values_list(field, flat=True)
+        )
+        for value in list(duplicates):
+            keeper, *others = Cart.objects.filter(**{field: value}).order_by('-updated_at', 'pk')
+            other_ids = [cart.pk for cart in others]
+            Order.objects.filter(cart_id__in=other_ids).update(cart=keeper)
+            held = set(keeper.items.values_list('product_variant_id', flat=True))
+            for item in CartItem.objects.filter(cart_id__in=other_ids).order_by('-updated_at'):
+                if item.product_variant_id not in held:
+                    held.add(item.product_variant_id)
+                    CartItem.objects.filter(pk=item.pk).update(cart=keeper)
+            Cart.objects.filter(pk__in=other_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cart',
+            name='cart_cart_cart_se_7e8240_idx',
+        ),
+        migrations.AlterField(
+            model_name='cart',
+            name='cart_session_id',
+            field=models.CharField(blank=True, default=None, max_length=64, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,33 @@
 import uuid
+from decimal import Decimal
 
 from django.conf import settings
 from django.db import models
+from django.utils.functional import cached_property
 
-from catalog.models import ProductVariant
+from catalog.models import ProductImage, ProductVariant
+
+
+def cart_lines_prefetch() -> models.Prefetch:
+    """Cart items with variant and product in one query, their images in a second."""
+    return models.Prefetch(
+        "items",
+        queryset=CartItem.objects.select_related(
+            "product_variant__product",
+        )
+        .prefetch_related(
+            models.Prefetch(
+                "product_variant__product__images",
+                queryset=ProductImage.objects.order_by("sort_order", "pk"),
+            )
+        )
+        .order_by("pk"),
+    )
+
+
+class CartQuerySet(models.QuerySet):
+    def with_lines(self):
+        return self.prefetch_related(cart_lines_prefetch())
 
 
 class Cart(models.Model):
@@ -21,31 +45,39 @@ class Cart(models.Model):
         on_delete=models.CASCADE,
         related_name="carts",
     )
-    cart_session_id = models.CharField(max_length=64, db_index=True, blank=True, default="")
+    cart_session_id = models.CharField(max_length=64, null=True, blank=True, default=None)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
-        indexes = [
-            models.Index(fields=["cart_session_id"]),
+        constraints = [
+            models.UniqueConstraint(fields=["user"], name="cart_cart_unique_user"),
+            models.UniqueConstraint(fields=["cart_session_id"], name="cart_cart_unique_session"),
         ]
 
     def __str__(self) -> str:
         ident = self.user or self.cart_session_id or self.pk
         return f"Cart({ident})"
 
+    @cached_property
+    def totals(self) -> tuple[int, Decimal]:
+        """``(item_count, subtotal)`` from a single pass over the items."""
+        count = 0
+        total = Decimal("0.00")
+        for item in self.items.all():
+            count += item.quantity
+            total += item.quantity * item.price_snapshot
+        return count, total
+
     @property
     def item_count(self) -> int:
-        return sum(item.quantity for item in self.items.all())
+        return self.totals[0]
 
     @property
-    def subtotal(self):
-        from decimal import Decimal
-
-        total = Decimal("0.00")
-        for item in self.items.all():
-            total += item.quantity * item.price_snapshot
-        return total
+    def subtotal(self) -> Decimal:
+        return self.totals[1]
 
 
 class CartItem(models.Model):
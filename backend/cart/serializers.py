@@ -5,6 +5,7 @@ from rest_framework import serializers
 from catalog.models import ProductVariant
 
 from .models import Cart, CartItem
+from .services import add_items
 
 
 class ProductVariantMiniSerializer(serializers.ModelSerializer):
@@ -20,6 +21,8 @@ class CartItemSerializer(serializers.ModelSerializer):
         queryset=ProductVariant.objects.all(),
         write_only=True,
     )
+    product_title = serializers.CharField(source='product_variant.product.title', read_only=True)
+    image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = CartItem
@@ -27,6 +30,8 @@ class CartItemSerializer(serializers.ModelSerializer):
             'id',
             'product_variant',
             'product_variant_id',
+            'product_title',
+            'image_url',
             'quantity',
             'price_snapshot',
             'mrp_snapshot',
@@ -35,6 +40,11 @@ class CartItemSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['price_snapshot', 'mrp_snapshot', 'created_at', 'updated_at']
 
+    def get_image_url(self, obj) -> str:
+        # Images are prefetched in sort order (see cart_lines_prefetch).
+        images = obj.product_variant.product.images.all()
+        return images[0].image_url if images else ''
+
     def validate_quantity(self, value: int) -> int:
         if value <= 0:
             raise serializers.ValidationError('Quantity must be at least 1.')
@@ -47,6 +57,42 @@ class CartItemSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class CartLineSerializer(serializers.Serializer):
+    product_variant_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartBulkAddSerializer(serializers.Serializer):
+    """
+    Adds many lines at once. Every variant id and its stock is checked with a
+    single ``in_bulk`` query; repeated variant ids are summed.
+    """
+
+    items = CartLineSerializer(many=True, allow_empty=False, max_length=100)
+
+    def create(self, validated_data):
+        cart = validated_data['cart']
+        quantities = {}
+        for line in validated_data['items']:
+            variant_id = line['product_variant_id']
+            quantities[variant_id] = quantities.get(variant_id, 0) + line['quantity']
+
+        variants = ProductVariant.objects.only('id', 'price', 'mrp', 'stock_qty').in_bulk(list(quantities))
+        unknown = sorted(set(quantities) - set(variants))
+        if unknown:
+            raise serializers.ValidationError(
+                {'detail': 'Unknown product variant.', 'product_variant_ids': unknown}
+            )
+        for variant_id in sorted(quantities):
+            if variants[variant_id].stock_qty < quantities[variant_id]:
+                raise serializers.ValidationError(
+                    {'detail': 'Insufficient stock.', 'product_variant_id': variant_id}
+                )
+
+        add_items(cart, quantities, variants)
+        return cart
+
+
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     item_count = serializers.IntegerField(read_only=True)
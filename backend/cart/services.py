@@ -0,0 +1,190 @@
+"""
+Cart resolution and mutation.
+
+A cart is identified by its user or by a guest ``cart_session_id``; both are
+unique at the database level. Resolution is a single
+``INSERT ... ON CONFLICT DO UPDATE ... RETURNING`` (which also touches
+``updated_at``). Only the resolved cart's pk is cached per user/session, so
+repeat requests skip that write and read the cart by pk; a cart deleted since
+(e.g. by purge_stale_carts) is simply resolved again.
+"""
+
+import hashlib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from api.batching import delete_in_batches
+
+from .models import Cart, CartItem
+
+SESSION_ID_MAX_LENGTH = Cart._meta.get_field('cart_session_id').max_length
+
+
+def _cache_key(user_id=None, session_id=None) -> str:
+    if user_id is not None:
+        return f'cart:resolve:user:{user_id}'
+    digest = hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:32]
+    return f'cart:resolve:session:{digest}'
+
+
+def _upsert(column: str, value) -> Cart:
+    opts = Cart._meta
+    now = timezone.now()
+    field = opts.get_field(column)
+    qn = connection.ops.quote_name
+    columns = [f.column for f in opts.concrete_fields]
+    sql = (
+        f'INSERT INTO {qn(opts.db_table)} ({qn(opts.pk.column)}, {qn(field.column)}, '
+        f'{qn("created_at")}, {qn("updated_at")}) VALUES (%s, %s, %s, %s) '
+        f'ON CONFLICT ({qn(field.column)}) DO UPDATE SET {qn("updated_at")} = EXCLUDED.{qn("updated_at")} '
+        f'RETURNING {", ".join(qn(c) for c in columns)}'
+    )
+    params = [
+        opts.pk.get_db_prep_value(uuid.uuid4(), connection),
+        field.get_db_prep_value(value, connection),
+        opts.get_field('created_at').get_db_prep_value(now, connection),
+        opts.get_field('updated_at').get_db_prep_value(now, connection),
+    ]
+    # RawQuerySet applies the field converters (UUIDs, datetimes) to the row.
+    return list(Cart.objects.raw(sql, params))[0]
+
+
+def _get_or_create(**lookup) -> Cart:
+    try:
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(**lookup)
+    except IntegrityError:
+        cart = Cart.objects.get(**lookup)
+    return cart
+
+
+def _lookup(user=None, session_id=None):
+    if user is not None:
+        return _cache_key(user_id=user.pk), 'user', user.pk
+    return _cache_key(session_id=session_id), 'cart_session_id', session_id
+
+
+def _fetch(cart_id) -> Cart | None:
+    """The cart a cached pk points at, if it still exists (sweepers delete carts)."""
+    if cart_id is None:
+        return None
+    return Cart.objects.filter(pk=cart_id).first()
+
+
+def resolve_cart(user=None, session_id: str | None = None) -> Cart:
+    """Return the cart for ``user`` (if given) or guest ``session_id``, creating it once."""
+    key, column, value = _lookup(user, session_id)
+    cart = _fetch(cache.get(key))
+    if cart is not None:
+        return cart
+
+    if connection.features.supports_update_conflicts_with_target:
+        cart = _upsert(column, value)
+    else:
+        cart = _get_or_create(**{Cart._meta.get_field(column).attname: value})
+    cache.set(key, cart.pk, timeout=settings.CART_RESOLVE_CACHE_TIMEOUT)
+    return cart
+
+
+def find_cart(user=None, session_id: str | None = None) -> Cart | None:
+    """Like resolve_cart, but a read: returns None instead of creating the cart."""
+    key, column, value = _lookup(user, session_id)
+    cart = _fetch(cache.get(key))
+    if cart is None:
+        # Not cached when missing: the cart may be created by another process
+        # at any moment, and must show up on the very next read.
+        cart = Cart.objects.filter(**{column: value}).first()
+        if cart is not None:
+            cache.set(key, cart.pk, timeout=settings.CART_RESOLVE_CACHE_TIMEOUT)
+    return cart
+
+
+def forget_carts(carts) -> None:
+    """Drop cached resolutions, e.g. after carts were deleted."""
+    keys = []
+    for user_id, session_id in carts:
+        if user_id is not None:
+            keys.append(_cache_key(user_id=user_id))
+        if session_id:
+            keys.append(_cache_key(session_id=session_id))
+    if keys:
+        cache.delete_many(keys)
+
+
+def add_items(cart: Cart, quantities: dict, variants: dict) -> None:
+    """
+    Add ``quantities`` (``{variant_id: n}``) to ``cart`` in two statements:
+    an upsert that makes sure every line exists (new lines start at zero and
+    snapshot the variant price) and one ``quantity = quantity + n`` update.
+    Both run in one transaction, so concurrent adds never lose an increment.
+    """
+    variant_ids = sorted(quantities)
+    now = timezone.now()
+    with transaction.atomic():
+        CartItem.objects.bulk_create(
+            [
+                CartItem(
+                    cart=cart,
+                    product_variant_id=variant_id,
+                    quantity=0,
+                    price_snapshot=variants[variant_id].price,
+                    mrp_snapshot=variants[variant_id].mrp,
+                )
+                for variant_id in variant_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['cart', 'product_variant'],
+            update_fields=['updated_at'],
+        )
+        increment = Case(
+            *[When(product_variant_id=variant_id, then=Value(quantities[variant_id])) for variant_id in variant_ids],
+            output_field=IntegerField(),
+        )
+        CartItem.objects.filter(cart=cart, product_variant_id__in=variant_ids).update(
+            quantity=F('quantity') + increment,
+            updated_at=now,
+        )
+
+
+def increment_item(cart: Cart, variant_id: int, quantity: int) -> int:
+    """Atomically add ``quantity`` to an existing line; returns rows updated."""
+    return CartItem.objects.filter(cart=cart, product_variant_id=variant_id).update(
+        quantity=F('quantity') + quantity,
+        updated_at=timezone.now(),
+    )
+
+
+def stale_guest_carts(now=None, stale_days: int | None = None, empty_days: int | None = None):
+    """
+    Guest carts nobody has touched for ``stale_days``, or empty ones untouched
+    for ``empty_days``. Carts referenced by an order are kept, since guests
+    look their orders up through the cart session.
+    """
+    now = now or timezone.now()
+    stale_days = settings.CART_STALE_DAYS if stale_days is None else stale_days
+    empty_days = settings.CART_EMPTY_STALE_DAYS if empty_days is None else empty_days
+    from orders.models import Order
+
+    has_items = Exists(CartItem.objects.filter(cart=OuterRef('pk')))
+    has_orders = Exists(Order.objects.filter(cart=OuterRef('pk')))
+    return Cart.objects.filter(user__isnull=True).filter(~has_orders).filter(
+        Q(updated_at__lt=now - timedelta(days=stale_days))
+        | Q(~has_items, updated_at__lt=now - timedelta(days=empty_days))
+    )
+
+
+def purge_stale_carts(batch_size: int = 1000, pause: float = 0.0, on_batch=None, **thresholds):
+    """Delete stale guest carts (and their lines) in pk-range batches."""
+
+    def forget(pks, stats):
+        forget_carts(Cart.objects.filter(pk__in=pks).values_list('user_id', 'cart_session_id'))
+        if on_batch:
+            on_batch(pks, stats)
+
+    return delete_in_batches(stale_guest_carts(**thresholds), batch_size, pause=pause, on_batch=forget)
@@ -1,3 +1,207 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from catalog.models import Brand, Category, Product, ProductImage, ProductVariant
+
+from .models import Cart, CartItem
+from .services import purge_stale_carts, resolve_cart
+
+
+def fill_cart(session_id, line_count):
+    brand, _ = Brand.objects.get_or_create(slug='acme', defaults={'name': 'Acme'})
+    category, _ = Category.objects.get_or_create(slug='phones', defaults={'name': 'Phones'})
+    cart = Cart.objects.create(cart_session_id=session_id)
+    for position in range(line_count):
+        sku = f'{session_id}-{position}'
+        product = Product.objects.create(title=f'Phone {sku}', slug=sku, brand=brand, category=category)
+        variant = ProductVariant.objects.create(product=product, sku=sku, price=Decimal('500.00'), stock_qty=5)
+        for sort_order in (2, 1):
+            ProductImage.objects.create(
+                product=product, image_url=f'https://img.example.com/{sku}/{sort_order}.jpg', sort_order=sort_order
+            )
+        CartItem.objects.create(cart=cart, product_variant=variant, quantity=2, price_snapshot=variant.price)
+    return cart
+
+
+class CartReadQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get_cart(self, session_id):
+        return self.client.get('/api/cart/', HTTP_X_CART_SESSION=session_id)
+
+    def test_query_count_is_independent_of_cart_size(self):
+        fill_cart('small', 1)
+        fill_cart('large', 10)
+        # After the first request of a session the cart is read by its cached pk.
+        self.get_cart('small')
+        self.get_cart('large')
+        with self.assertNumQueries(3):
+            response = self.get_cart('small')
+        self.assertEqual(response.json()['item_count'], 2)
+        with self.assertNumQueries(3):
+            response = self.get_cart('large')
+
+        data = response.json()
+        self.assertEqual(data['item_count'], 20)
+        self.assertEqual(Decimal(data['subtotal']), Decimal('10000.00'))
+        self.assertEqual(data['items'][0]['product_title'], 'Phone large-0')
+        self.assertEqual(data['items'][0]['image_url'], 'https://img.example.com/large-0/1.jpg')
+
+
+class CartResolutionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_session_cart_is_created_once(self):
+        with self.assertNumQueries(1):
+            first = resolve_cart(session_id='guest-1')
+        cache.clear()
+        second = resolve_cart(session_id='guest-1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Cart.objects.filter(cart_session_id='guest-1').count(), 1)
+        # Cached: a read by pk instead of the upsert.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(resolve_cart(session_id='guest-1').pk, first.pk)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('SELECT'))
+
+    def test_swept_cart_is_not_handed_out(self):
+        swept = resolve_cart(session_id='guest-1')
+        Cart.objects.filter(pk=swept.pk).update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(purge_stale_carts().rows, 1)
+        cart = resolve_cart(session_id='guest-1')
+        self.assertNotEqual(cart.pk, swept.pk)
+        self.assertTrue(Cart.objects.filter(pk=cart.pk).exists())
+
+        # Deleted behind the cache's back, e.g. by another process.
+        Cart.objects.filter(pk=cart.pk).delete()
+        self.assertTrue(Cart.objects.filter(pk=resolve_cart(session_id='guest-1').pk).exists())
+
+    def test_user_cart_is_created_once(self):
+        user = get_user_model().objects.create_user('buyer', 'buyer@example.com', 'secret-pass-1')
+        first = resolve_cart(user=user)
+        cache.clear()
+        self.assertEqual(resolve_cart(user=user).pk, first.pk)
+        self.assertIsNone(first.cart_session_id)
+        self.assertEqual(Cart.objects.filter(user=user).count(), 1)
+
+
+class CartBulkAddTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post_bulk(self, lines):
+        return self.client.post(
+            '/api/cart/items/bulk/', {'items': lines}, content_type='application/json', HTTP_X_CART_SESSION='bulk'
+        )
+
+    def test_bulk_add_inserts_and_increments(self):
+        cart = fill_cart('bulk', 1)
+        existing = cart.items.get()
+        other = fill_cart('other', 3)
+        variant_ids = list(other.items.values_list('product_variant_id', flat=True))
+        lines = [{'product_variant_id': existing.product_variant_id, 'quantity': 1}]
+        lines += [{'product_variant_id': variant_id, 'quantity': 2} for variant_id in variant_ids]
+        lines.append({'product_variant_id': variant_ids[0]})
+
+        response = self.post_bulk(lines)
+        self.assertEqual(response.status_code, 200)
+        quantities = dict(cart.items.values_list('product_variant_id', 'quantity'))
+        self.assertEqual(quantities[existing.product_variant_id], 3)
+        self.assertEqual(quantities[variant_ids[0]], 3)
+        self.assertEqual(quantities[variant_ids[1]], 2)
+        self.assertEqual(response.json()['item_count'], 10)
+
+    def test_bulk_add_query_count_is_constant(self):
+        fill_cart('bulk', 0)
+        few = list(fill_cart('few', 1).items.values_list('product_variant_id', flat=True))
+        many = list(fill_cart('many', 10).items.values_list('product_variant_id', flat=True))
+        self.post_bulk([{'product_variant_id': pk} for pk in few])
+        with CaptureQueriesContext(connection) as small:
+            self.post_bulk([{'product_variant_id': pk} for pk in few])
+        with CaptureQueriesContext(connection) as large:
+            self.post_bulk([{'product_variant_id': pk} for pk in many])
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_add_rejects_unknown_variants_and_short_stock(self):
+        cart = fill_cart('bulk', 1)
+        variant_id = cart.items.get().product_variant_id
+
+        response = self.post_bulk([{'product_variant_id': variant_id}, {'product_variant_id': 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['product_variant_ids'], ['999999'])
+
+        response = self.post_bulk([{'product_variant_id': variant_id, 'quantity': 6}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['product_variant_id'], str(variant_id))
+        self.assertEqual(cart.items.get().quantity, 2)
+
+
+class PurgeStaleCartsTests(TestCase):
+    def test_purges_only_abandoned_guest_carts(self):
+        from orders.models import Order
+
+        user = get_user_model().objects.create_user('keeper', 'keeper@example.com', 'secret-pass-1')
+        old = timezone.now() - timedelta(days=40)
+        abandoned = fill_cart('abandoned', 2)
+        empty = Cart.objects.create(cart_session_id='empty')
+        fresh = fill_cart('fresh', 1)
+        ordered = Cart.objects.create(cart_session_id='ordered')
+        Order.objects.create(cart=ordered, subtotal=Decimal('0.00'))
+        users_cart = Cart.objects.create(user=user)
+        Cart.objects.exclude(pk=fresh.pk).update(updated_at=old)
+        Cart.objects.filter(pk=empty.pk).update(updated_at=timezone.now() - timedelta(days=2))
+
+        stats = purge_stale_carts(batch_size=1)
+        self.assertEqual(stats.rows, 2)
+        self.assertEqual(stats.related_rows, 2)
+        self.assertEqual(stats.batches, 2)
+        remaining = set(Cart.objects.values_list('pk', flat=True))
+        self.assertEqual(remaining, {fresh.pk, ordered.pk, users_cart.pk})
+        self.assertNotIn(abandoned.pk, remaining)
+
+
+class VirtualCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reading_an_unknown_cart_writes_nothing(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['id'])
+        self.assertEqual(response.json()['items'], [])
+        self.assertTrue(response.cookies['cart_session'].value)
+
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.client.get('/api/cart/', HTTP_X_CART_SESSION='visitor')
+        self.assertFalse(Cart.objects.exists())
+
+    def test_cart_created_elsewhere_shows_up_on_the_next_read(self):
+        self.assertIsNone(self.client.get('/api/cart/', HTTP_X_CART_SESSION='visitor').json()['id'])
+        # Created by another worker, whose cache writes this one may never see.
+        cart = fill_cart('visitor', 1)
+        data = self.client.get('/api/cart/', HTTP_X_CART_SESSION='visitor').json()
+        self.assertEqual(data['id'], str(cart.pk))
+        self.assertEqual(data['item_count'], 2)
 
-# Create your tests here.
+    def test_first_add_persists_the_cart(self):
+        variant_id = fill_cart('seed', 1).items.get().product_variant_id
+        self.client.get('/api/cart/', HTTP_X_CART_SESSION='visitor')
+        response = self.client.post(
+            '/api/cart/items/', {'product_variant_id': variant_id}, content_type='application/json',
+            HTTP_X_CART_SESSION='visitor',
+        )
+        self.assertEqual(response.status_code, 201)
+        data = self.client.get('/api/cart/', HTTP_X_CART_SESSION='visitor').json()
+        self.assertEqual(data['id'], str(Cart.objects.get(cart_session_id='visitor').pk))
+        self.assertEqual(data['item_count'], 1)
@@ -5,11 +5,13 @@ from .views import CartViewSet
 
 cart_list = CartViewSet.as_view({'get': 'list'})
 cart_add_item = CartViewSet.as_view({'post': 'add_item'})
+cart_add_items = CartViewSet.as_view({'post': 'add_items'})
 cart_update_item = CartViewSet.as_view({'patch': 'update_item', 'delete': 'delete_item'})
 
 urlpatterns = [
     path('', cart_list, name='cart-detail'),
     path('items/', cart_add_item, name='cart-add-item'),
+    path('items/bulk/', cart_add_items, name='cart-add-items'),
     path('items/<int:pk>/', cart_update_item, name='cart-update-item'),
 ]
 
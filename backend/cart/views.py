@@ -1,32 +1,50 @@
+from django.db import IntegrityError, transaction
+from django.db.models import prefetch_related_objects
 from django.utils.crypto import get_random_string
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Cart, CartItem
-from .serializers import CartItemSerializer, CartSerializer
+from .models import Cart, CartItem, cart_lines_prefetch
+from .serializers import CartBulkAddSerializer, CartItemSerializer, CartSerializer
+from .services import SESSION_ID_MAX_LENGTH, find_cart, increment_item, resolve_cart
 
 
-def _get_or_create_cart(request) -> Cart:
+def _get_or_create_cart(request, create: bool = True) -> Cart | None:
     """
     Resolve the current cart for the request.
     - If user is authenticated, use (or create) user cart.
     - Else, use cart_session_id from header X-Cart-Session or cookie cart_session.
+    With ``create=False`` nothing is written and None means "no cart yet".
     """
     user = request.user if request.user.is_authenticated else None
 
     if user:
-        cart, _ = Cart.objects.get_or_create(user=user)
-        return cart
+        return resolve_cart(user=user) if create else find_cart(user=user)
 
     session_id = request.headers.get('X-Cart-Session') or request.COOKIES.get('cart_session')
-    if not session_id:
+    is_new = not session_id or len(session_id) > SESSION_ID_MAX_LENGTH
+    if is_new:
         session_id = get_random_string(32)
-
-    cart, _ = Cart.objects.get_or_create(cart_session_id=session_id)
     request.cart_session_id = session_id  # type: ignore[attr-defined]
-    return cart
+
+    if create:
+        return resolve_cart(session_id=session_id)
+    # A brand-new session cannot have a cart yet.
+    return None if is_new else find_cart(session_id=session_id)
+
+
+def _empty_cart_data() -> dict:
+    """Payload of a cart that has not been persisted (nothing added yet)."""
+    return {
+        'id': None,
+        'item_count': 0,
+        'subtotal': '0.00',
+        'items': [],
+        'created_at': None,
+        'updated_at': None,
+    }
 
 
 class CartViewSet(viewsets.ViewSet):
@@ -34,14 +52,20 @@ class CartViewSet(viewsets.ViewSet):
     Simple cart API:
     - GET /api/cart/ → current cart
     - POST /api/cart/items/ → add/update item
+    - POST /api/cart/items/bulk/ → add many items at once
     - PATCH /api/cart/items/<id>/ → update quantity
     - DELETE /api/cart/items/<id>/ → remove item
     """
 
     def list(self, request):
-        cart = _get_or_create_cart(request)
-        serializer = CartSerializer(cart)
-        response = Response(serializer.data)
+        # Read-only: a visitor who never added anything gets a virtual empty
+        # cart, and the row is only created by the first mutation.
+        cart = _get_or_create_cart(request, create=False)
+        if cart is None:
+            response = Response(_empty_cart_data())
+        else:
+            prefetch_related_objects([cart], cart_lines_prefetch())
+            response = Response(CartSerializer(cart).data)
         # For guests, ensure session cookie is set
         session_id = getattr(request, 'cart_session_id', None)
         if session_id:
@@ -51,31 +75,23 @@ class CartViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'], url_path='items')
     def add_item(self, request):
         cart = _get_or_create_cart(request)
-        payload = request.data.copy()
-        payload['cart'] = str(cart.id)
-
-        existing = CartItem.objects.filter(
-            cart=cart,
-            product_variant_id=payload.get('product_variant_id'),
-        ).first()
+        serializer = CartItemSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        variant = serializer.validated_data['product_variant']
+        quantity = serializer.validated_data.get('quantity', 1)
 
-        if existing:
+        status_code = status.HTTP_200_OK
+        if not increment_item(cart, variant.pk, quantity):
             try:
-                delta = int(payload.get('quantity', 1))
-            except (TypeError, ValueError):
-                delta = 1
-            existing.quantity += max(delta, 1)
-            existing.save(update_fields=['quantity', 'updated_at'])
-            serializer = CartItemSerializer(existing, context={'request': request})
-            status_code = status.HTTP_200_OK
-        else:
-            serializer = CartItemSerializer(
-                data=payload,
-                context={'request': request},
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save(cart=cart)
-            status_code = status.HTTP_201_CREATED
+                with transaction.atomic():
+                    serializer.save(cart=cart)
+                status_code = status.HTTP_201_CREATED
+            except IntegrityError:
+                # A concurrent request created the line first; add to it instead.
+                increment_item(cart, variant.pk, quantity)
+        if status_code == status.HTTP_200_OK:
+            item = cart.items.get(product_variant=variant)
+            serializer = CartItemSerializer(item, context={'request': request})
 
         response = Response(serializer.data, status=status_code)
         session_id = getattr(request, 'cart_session_id', None)
@@ -83,11 +99,25 @@ class CartViewSet(viewsets.ViewSet):
             response.set_cookie('cart_session', session_id, httponly=False, samesite='Lax')
         return response
 
+    @action(detail=False, methods=['post'], url_path='items/bulk')
+    def add_items(self, request):
+        cart = _get_or_create_cart(request)
+        serializer = CartBulkAddSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(cart=cart)
+
+        prefetch_related_objects([cart], cart_lines_prefetch())
+        response = Response(CartSerializer(cart).data)
+        session_id = getattr(request, 'cart_session_id', None)
+        if session_id:
+            response.set_cookie('cart_session', session_id, httponly=False, samesite='Lax')
+        return response
+
     @action(detail=True, methods=['patch'], url_path='items')
     def update_item(self, request, pk=None):
-        cart = _get_or_create_cart(request)
+        cart = _get_or_create_cart(request, create=False)
         try:
-            item = cart.items.get(pk=pk)
+            item = CartItem.objects.get(cart=cart, pk=pk)
         except CartItem.DoesNotExist:
             return Response({'detail': 'Item not found.'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -103,9 +133,9 @@ class CartViewSet(viewsets.ViewSet):
 
     @action(detail=True, methods=['delete'], url_path='items')
     def delete_item(self, request, pk=None):
-        cart = _get_or_create_cart(request)
+        cart = _get_or_create_cart(request, create=False)
         try:
-            item = cart.items.get(pk=pk)
+            item = CartItem.objects.get(cart=cart, pk=pk)
         except CartItem.DoesNotExist:
             return Response({'detail': 'Item not found.'}, status=status.HTTP_404_NOT_FOUND)
 
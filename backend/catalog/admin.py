@@ -1,3 +1,88 @@
+import io
+
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .importer import FORMATS, format_for, import_catalog
+from .models import Brand, Category, Product, ProductImage, ProductVariant
+
+
+@admin.register(Brand)
+class BrandAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'created_at']
+    prepopulated_fields = {'slug': ('name',)}
+    search_fields = ['name']
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'parent', 'created_at']
+    prepopulated_fields = {'slug': ('name',)}
+    list_filter = ['parent']
+    search_fields = ['name']
+
+
+class ProductVariantInline(admin.TabularInline):
+    model = ProductVariant
+    extra = 0
+
+
+class ProductImageInline(admin.TabularInline):
+    model = ProductImage
+    extra = 0
+
+
+class CatalogImportForm(forms.Form):
+    feed = forms.FileField(help_text='CSV or JSONL, one record per variant. See catalog/importer.py for the columns.')
+    format = forms.ChoiceField(
+        choices=[('', 'From file name')] + [(fmt, fmt.upper()) for fmt in FORMATS],
+        required=False,
+    )
+    dry_run = forms.BooleanField(required=False, initial=True, help_text='Report the diff without writing.')
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ['title', 'brand', 'category', 'is_active', 'updated_at']
+    prepopulated_fields = {'slug': ('title',)}
+    list_filter = ['is_active', 'category', 'brand']
+    list_select_related = ['brand', 'category']
+    search_fields = ['title', 'slug', 'variants__sku']
+    readonly_fields = ['created_at', 'updated_at']
+    inlines = [ProductVariantInline, ProductImageInline]
+    change_list_template = 'admin/catalog/product/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='catalog_product_import',
+            ),
+        ]
+        return urls + super().get_urls()
 
-# Register your models here.
+    def import_view(self, request):
+        """Upload a feed and run it synchronously; large feeds belong to ``manage.py import_catalog``."""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        report = None
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['feed']
+            fmt = form.cleaned_data['format'] or format_for(upload.name)
+            # Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to disk,
+            # and the importer reads line by line either way.
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            report = import_catalog(stream, fmt, dry_run=form.cleaned_data['dry_run']).as_dict()
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import catalog feed',
+            'form': form,
+            'report': report,
+        }
+        return TemplateResponse(request, 'admin/catalog/product/import.html', context)
@@ -0,0 +1,352 @@
+"""
+Bitmap facet index over product variants.
+
+Each (facet, value) pair maps to a Python int used as a bitset over variant
+positions. Variants are laid out grouped by product, so a product's variants
+occupy one contiguous bit range. Bitmaps are built once per value from
+position lists (linear in the catalog), and a variant mask is projected onto
+products with a few whole-int shifts (``product_ends``), so a product count is
+one ``int.bit_count()`` rather than a walk over the set bits. Neither
+filtering nor counting touches the ``attributes`` JSON column per request.
+
+The index is cached per process and keyed on the catalog version. The version
+lives in the default cache, which ``api.cache.check_shared_cache`` requires to
+be shared whenever the server runs several worker processes, so a write on one
+worker invalidates the index on all of them. After a write the previous index
+keeps serving while one background thread per process builds the next.
+Checkout only moves the stock version (``api.cache.get_stock_version``), on
+which just the in-stock bitmap is re-read.
+
+Price ranges resolve against the variant prices sorted once at build time: a
+bisect finds the range and prefix masks taken every ``PRICE_CHECKPOINT``
+prices leave at most that many bits to set per bound.
+"""
+
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, InvalidOperation
+
+from django.db import close_old_connections, connection
+
+from api.cache import get_catalog_version, get_stock_version
+from api.category_tree import get_category_tree
+
+from .models import Category, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTE_FACETS = ('ram', 'storage', 'color')
+PRICE_BUCKETS = [0, 10000, 20000, 30000, 50000, 100000, None]
+PRICE_CHECKPOINT = 256
+
+
+def _range_mask(start: int, end: int) -> int:
+    return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+
+def _mask_from_positions(positions, size: int) -> int:
+    """One bitset from many positions: a byte buffer, converted once."""
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _iter_bits(mask: int):
+    bits = bin(mask)[:1:-1]  # lowest bit first
+    position = bits.find('1')
+    while position != -1:
+        yield position
+        position = bits.find('1', position + 1)
+
+
+def _parse_price(value):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+class FacetIndex:
+    def __init__(self, rows):
+        self.variant_product = []
+        self.variant_price = []
+        self.variant_positions = {}
+        self.product_ranges = {}
+        self.stock_version = None
+        self.labels = {'brand': {}}
+        positions = {}  # facet -> {value: [position, ...]}
+        in_stock = []
+
+        def add(facet, value, position):
+            positions.setdefault(facet, {}).setdefault(value, []).append(position)
+
+        for position, row in enumerate(rows):
+            variant_id, product_id, price, attributes, stock_qty, brand_slug, brand_name, category_id = row
+            self.variant_positions[variant_id] = position
+            self.variant_product.append(product_id)
+            self.variant_price.append(price)
+            start, _ = self.product_ranges.get(product_id, (position, position))
+            self.product_ranges[product_id] = (start, position + 1)
+
+            if stock_qty > 0:
+                in_stock.append(position)
+            if brand_slug:
+                add('brand', brand_slug, position)
+                self.labels['brand'][brand_slug] = brand_name
+            if category_id is not None:
+                add('category', category_id, position)
+            if isinstance(attributes, dict):
+                for key in ATTRIBUTE_FACETS:
+                    value = attributes.get(key)
+                    if value not in (None, ''):
+                        add(key, str(value), position)
+            add('price', self._bucket(price), position)
+
+        self.size = len(self.variant_product)
+        self.all = _range_mask(0, self.size)
+        self.bitmaps = {
+            facet: {value: _mask_from_positions(found, self.size) for value, found in values.items()}
+            for facet, values in positions.items()
+        }
+        self.in_stock = _mask_from_positions(in_stock, self.size)
+        self._build_product_spread()
+        self._build_price_prefixes()
+        # Counts with no filter applied, the common facet request.
+        self.unfiltered_counts = {
+            facet: {value: self.product_count(bitmap) for value, bitmap in values.items()}
+            for facet, values in self.bitmaps.items()
+        }
+
+    def refresh_stock(self, stock_version):
+        """Re-read which variants are sold out, usually a short list."""
+        sold_out = ProductVariant.objects.filter(stock_qty=0).values_list('pk', flat=True)
+        positions = self.variant_positions
+        self.in_stock = self.all & ~_mask_from_positions(
+            (positions[pk] for pk in sold_out.iterator() if pk in positions), self.size
+        )
+        self.stock_version = stock_version
+
+    def _build_product_spread(self):
+        """
+        ``product_ends`` has the last bit of every product range. ``spread``
+        lists ``(k, can_reach)`` doubling steps: OR-ing ``(mask << k) &
+        can_reach`` for each carries any set bit to the end of its product
+        without crossing into the next one.
+        """
+        self.product_ends = _mask_from_positions((end - 1 for _, end in self.product_ranges.values()), self.size)
+        starts = _mask_from_positions((start for start, _ in self.product_ranges.values()), self.size)
+        longest = max((end - start for start, end in self.product_ranges.values()), default=0)
+        self.spread = []
+        can_reach = self.all & ~starts  # bits whose left neighbour is in the same product
+        step = 1
+        while step < longest:
+            self.spread.append((step, can_reach))
+            can_reach &= can_reach << step
+            step *= 2
+
+    def _build_price_prefixes(self):
+        order = sorted(range(len(self.variant_price)), key=self.variant_price.__getitem__)
+        self.sorted_prices = [self.variant_price[position] for position in order]
+        self.sorted_positions = order
+        # price_prefixes[k] has the bits of the k * PRICE_CHECKPOINT cheapest variants.
+        self.price_prefixes = [0]
+        buffer = bytearray((len(order) + 7) // 8)
+        for count, position in enumerate(order, start=1):
+            buffer[position >> 3] |= 1 << (position & 7)
+            if count % PRICE_CHECKPOINT == 0:
+                self.price_prefixes.append(int.from_bytes(buffer, 'little'))
+
+    def _cheapest_mask(self, count: int) -> int:
+        """Mask of the ``count`` cheapest variants."""
+        checkpoint = count // PRICE_CHECKPOINT
+        rest = self.sorted_positions[checkpoint * PRICE_CHECKPOINT:count]
+        return self.price_prefixes[checkpoint] | _mask_from_positions(rest, self.size)
+
+    def price_mask(self, price_min=None, price_max=None) -> int:
+        """Variants priced within ``[price_min, price_max]`` (either bound optional)."""
+        low = 0 if price_min is None else bisect_left(self.sorted_prices, price_min)
+        high = len(self.sorted_prices) if price_max is None else bisect_right(self.sorted_prices, price_max)
+        if low >= high:
+            return 0
+        return self._cheapest_mask(high) ^ self._cheapest_mask(low)
+
+    def _bucket(self, price):
+        for low, high in zip(PRICE_BUCKETS, PRICE_BUCKETS[1:]):
+            if high is None or price < high:
+                return low
+        return PRICE_BUCKETS[-2]
+
+    # ── filtering ──
+
+    def filter_masks(self, params, category_ids=None, product_ids=None) -> dict:
+        """One variant mask per active filter, keyed by facet name."""
+        masks = {}
+        brand = params.get('brand')
+        if brand:
+            masks['brand'] = self.bitmaps.get('brand', {}).get(brand, 0)
+        if category_ids is not None:
+            categories = self.bitmaps.get('category', {})
+            masks['category'] = 0
+            for category_id in category_ids:
+                masks['category'] |= categories.get(category_id, 0)
+        for key in ATTRIBUTE_FACETS:
+            values = params.getlist(key) if hasattr(params, 'getlist') else [params.get(key)]
+            values = [value for value in values if value]
+            if values:
+                masks[key] = 0
+                for value in values:
+                    masks[key] |= self.bitmaps.get(key, {}).get(value, 0)
+
+        price_min = _parse_price(params.get('price_min'))
+        price_max = _parse_price(params.get('price_max'))
+        if price_min is not None or price_max is not None:
+            masks['price'] = self.price_mask(price_min, price_max)
+        if params.get('in_stock') == 'true':
+            masks['in_stock'] = self.in_stock
+        if product_ids is not None:
+            masks['search'] = self.products_mask(product_ids)
+        return masks
+
+    def products_mask(self, product_ids) -> int:
+        ranges = (self.product_ranges.get(product_id) for product_id in product_ids)
+        return _mask_from_positions(
+            (position for bounds in ranges if bounds for position in range(*bounds)), self.size
+        )
+
+    def combine(self, masks, exclude=None) -> int:
+        result = self.all
+        for facet, mask in masks.items():
+            if facet != exclude:
+                result &= mask
+        return result
+
+    def _product_ends(self, mask) -> int:
+        """The ``product_ends`` bit of every product with a bit set in ``mask``."""
+        for step, can_reach in self.spread:
+            mask |= (mask << step) & can_reach
+        return mask & self.product_ends
+
+    def product_count(self, mask) -> int:
+        return self._product_ends(mask).bit_count()
+
+    def products(self, mask) -> set:
+        return {self.variant_product[position] for position in _iter_bits(self._product_ends(mask))}
+
+    # ── counting ──
+
+    def counts(self, masks) -> dict:
+        """
+        Product counts per facet value. A facet's own filter is ignored when
+        counting that facet, so selecting ``ram=8GB`` still shows 12GB counts.
+        """
+        category_nodes = get_category_tree(Category).nodes
+        result = {}
+        for facet, values in self.bitmaps.items():
+            base = self.combine(masks, exclude=facet)
+            unfiltered = self.unfiltered_counts[facet] if base == self.all else None
+            entries = []
+            for value, bitmap in values.items():
+                count = unfiltered[value] if unfiltered is not None else self.product_count(base & bitmap)
+                if not count:
+                    continue
+                entry = {'value': value, 'count': count}
+                if facet == 'brand':
+                    entry['label'] = self.labels['brand'].get(value, value)
+                elif facet == 'category':
+                    node = category_nodes.get(value)
+                    if node is None:
+                        continue
+                    entry = {'value': node['slug'], 'label': node['name'], 'count': count}
+                elif facet == 'price':
+                    position = PRICE_BUCKETS.index(value)
+                    entry = {'min': value, 'max': PRICE_BUCKETS[position + 1], 'count': count}
+                entries.append(entry)
+            if facet == 'price':
+                entries.sort(key=lambda entry: entry['min'])
+            else:
+                entries.sort(key=lambda entry: (-entry['count'], str(entry.get('value'))))
+            result[facet] = entries
+        return result
+
+
+_lock = threading.Lock()
+_cached = None
+_rebuilding = None  # background rebuild thread, while one runs
+
+
+def _build_index() -> FacetIndex:
+    stock_version = get_stock_version()
+    rows = (
+        ProductVariant.objects.filter(product__is_active=True)
+        .order_by('product_id', 'price', 'pk')
+        .values_list(
+            'pk',
+            'product_id',
+            'price',
+            'attributes',
+            'stock_qty',
+            'product__brand__slug',
+            'product__brand__name',
+            'product__category_id',
+        )
+    )
+    index = FacetIndex(rows.iterator())
+    index.stock_version = stock_version
+    return index
+
+
+def _rebuild(version):
+    global _cached, _rebuilding
+    close_old_connections()
+    try:
+        index = _build_index()
+        with _lock:
+            _cached = (version, index)
+    except Exception:
+        logger.exception('Facet index rebuild failed; serving the previous index')
+    finally:
+        connection.close()
+        with _lock:
+            _rebuilding = None
+
+
+def get_facet_index() -> FacetIndex:
+    """
+    The index for the current catalog version, with an in-stock bitmap no
+    older than the stock version.
+    """
+    index = _current_index()
+    stock_version = get_stock_version()
+    if index.stock_version != stock_version:
+        index.refresh_stock(stock_version)
+    return index
+
+
+def _current_index() -> FacetIndex:
+    """
+    Only the first build in a process runs on the request path; after a write
+    the previous index is returned while a background thread builds the next.
+    """
+    global _cached, _rebuilding
+    version = get_catalog_version()
+    cached = _cached
+    if cached and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _cached
+        if cached and cached[0] == version:
+            return cached[1]
+        # Inside a transaction the caller's own uncommitted writes would be
+        # invisible to another connection, so that build stays inline.
+        if cached and not connection.in_atomic_block:
+            if _rebuilding is None:
+                _rebuilding = threading.Thread(target=_rebuild, args=(version,), name='facet-index', daemon=True)
+                _rebuilding.start()
+            return cached[1]
+        index = _build_index()
+        _cached = (version, index)
+        return index
@@ -0,0 +1,56 @@
+"""Hot catalog queries, checked by ``audit_query_plans``."""
+
+from django.utils import timezone
+
+from api.query_audit import register, view_queryset
+from search.backends import rank_order
+
+from .models import Product, ProductListingSummary, ProductVariant
+from .views import ProductViewSet
+
+
+@register('catalog.product_list_newest')
+def product_list_newest():
+    return view_queryset(ProductViewSet)
+
+
+@register('catalog.product_list_newest_after')
+def product_list_newest_after():
+    return view_queryset(ProductViewSet, 'ordering=-created_at', after=(timezone.now(), 1))
+
+
+@register('catalog.product_list_by_title_after')
+def product_list_by_title_after():
+    return view_queryset(ProductViewSet, 'ordering=title', after=('Phone', 1))
+
+
+@register('catalog.product_list_by_price')
+def product_list_by_price():
+    # min_price is nullable: NULLS LAST keyset order.
+    return view_queryset(ProductViewSet, 'ordering=price&cursor=')
+
+
+@register('catalog.product_list_by_category')
+def product_list_by_category():
+    return view_queryset(ProductViewSet, where={'category_id__in': [1, 2, 3]})
+
+
+@register('catalog.product_search')
+def product_search():
+    # ProductViewSet.get_queryset for ?search=: the ranked hits, best first.
+    ranked = [3, 1, 2]
+    return (
+        Product.objects.filter(is_active=True, pk__in=ranked)
+        .select_related('brand', 'category', 'listing_summary')
+        .order_by(rank_order(Product, ranked), 'pk')[:20]
+    )
+
+
+@register('catalog.summary_in_stock_by_price')
+def summary_in_stock_by_price():
+    return ProductListingSummary.objects.filter(in_stock=True).order_by('min_price')[:20]
+
+
+@register('catalog.product_variants')
+def product_variants():
+    return ProductVariant.objects.filter(product_id=1)
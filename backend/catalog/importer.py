@@ -0,0 +1,375 @@
+"""
+Streaming catalog import from CSV or JSONL supplier feeds.
+
+One record per variant, with its product's fields repeated::
+
+    product_slug,title,brand,category,description,sku,price,mrp,stock_qty,attributes,images
+    pixel-9,Pixel 9,google,flagship,,GOO-PX9-128,79999,84999,40,"{""color"": ""Obsidian""}",https://a.jpg|https://b.jpg
+
+``attr_<name>`` columns are merged into ``attributes`` (or, without an
+``attributes`` column, into the variant's stored attributes); ``images`` is
+``|``-separated (a list in JSONL). A JSONL line may instead carry the product
+once with a ``variants`` list. Omitted columns keep their current values.
+
+The feed is read lazily and written in chunks: each chunk costs a fixed
+number of queries (lookups by slug/SKU, one ``bulk_create(update_conflicts=
+True)`` per model, image replacement, listing-summary refresh) in its own
+transaction, and only rows that differ from the database are written. No
+per-row signals fire: summaries are refreshed and the catalog version bumped
+once per chunk that changed something. Brands
+and categories resolve through slug maps loaded once; unknown brands are
+created, unknown categories are reported as row errors.
+"""
+
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from api.cache import bump_catalog_version
+from search.backends import refresh_search_documents
+
+from .models import Brand, Category, Product, ProductImage, ProductVariant
+from .services import refresh_listing_summaries
+
+FORMATS = ('csv', 'jsonl')
+PRODUCT_FIELDS = ('title', 'description', 'brand_id', 'category_id', 'is_active')
+VARIANT_FIELDS = ('product_id', 'price', 'mrp', 'stock_qty', 'attributes')
+MAX_REPORTED_ERRORS = 100
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class Counts:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = False
+    rows: int = 0
+    chunks: int = 0
+    products: Counts = field(default_factory=Counts)
+    variants: Counts = field(default_factory=Counts)
+    images_replaced: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    def error(self, line, sku, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'sku': sku, 'error': message})
+
+    def as_dict(self) -> dict:
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'products': vars(self.products),
+            'variants': vars(self.variants),
+            'images_replaced': self.images_replaced,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(time.monotonic() - self.started, 3),
+        }
+
+
+# ── parsing ──
+
+
+def read_records(stream, fmt: str):
+    """Yield ``(line, record)`` from a text stream without loading it whole."""
+    if fmt == 'csv':
+        for line, record in enumerate(csv.DictReader(stream), start=2):
+            yield line, record
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            yield line, RowError(f'Invalid JSON: {exc}')
+            continue
+        if isinstance(record, dict) and isinstance(record.get('variants'), list):
+            variants = record.pop('variants')
+            for variant in variants:
+                yield line, {**record, **variant}
+        else:
+            yield line, record
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _decimal(value, name):
+    try:
+        return Decimal(str(value).strip()).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f'{name} is not a number: {value!r}')
+
+
+def _int(value, name):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise RowError(f'{name} is not an integer: {value!r}')
+
+
+def parse_record(record) -> tuple[dict, dict, list | None]:
+    """Split a feed record into product fields, variant fields and images."""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise RowError('Record is not an object')
+    sku = str(record.get('sku') or '').strip()
+    if not sku:
+        raise RowError('sku is required')
+    title = str(record.get('title') or '').strip()
+    slug = slugify(record.get('product_slug') or record.get('slug') or title)
+    if not slug:
+        raise RowError('product_slug or title is required')
+
+    product = {'slug': slug}
+    if title:
+        product['title'] = title
+    for name in ('brand', 'category'):
+        if not _blank(record.get(name)):
+            product[name] = slugify(record[name])
+    if record.get('description') is not None:
+        product['description'] = str(record['description'])
+    if not _blank(record.get('is_active')):
+        product['is_active'] = str(record['is_active']).strip().lower() in TRUE_VALUES
+
+    variant = {'sku': sku}
+    if not _blank(record.get('price')):
+        variant['price'] = _decimal(record['price'], 'price')
+    if not _blank(record.get('mrp')):
+        variant['mrp'] = _decimal(record['mrp'], 'mrp')
+    if not _blank(record.get('stock_qty')):
+        variant['stock_qty'] = _int(record['stock_qty'], 'stock_qty')
+        if variant['stock_qty'] < 0:
+            raise RowError('stock_qty must not be negative')
+    attributes = record.get('attributes')
+    if isinstance(attributes, str):
+        try:
+            attributes = json.loads(attributes) if attributes.strip() else None
+        except ValueError:
+            raise RowError('attributes is not valid JSON')
+    extra = {key[5:]: value for key, value in record.items() if key.startswith('attr_') and not _blank(value)}
+    if attributes is not None:
+        if not isinstance(attributes, dict):
+            raise RowError('attributes must be an object')
+        variant['attributes'] = {**attributes, **extra}
+    elif extra:
+        variant['attribute_updates'] = extra  # merged into the stored attributes
+
+    images = record.get('images')
+    if isinstance(images, str):
+        images = [url.strip() for url in images.split('|') if url.strip()] if images.strip() else None
+    return product, variant, images
+
+
+# ── import ──
+
+
+class CatalogImporter:
+    def __init__(self, chunk_size: int = 1000, dry_run: bool = False, log=None):
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+        self.report = ImportReport(dry_run=dry_run)
+        self.brands = dict(Brand.objects.values_list('slug', 'pk'))
+        self.categories = dict(Category.objects.values_list('slug', 'pk'))
+        self.previous_slugs = set()  # a product's rows may straddle two chunks
+
+    def run(self, stream, fmt: str) -> ImportReport:
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown format {fmt!r}; expected one of {", ".join(FORMATS)}')
+        records = read_records(stream, fmt)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.report.rows += len(chunk)
+            self.report.chunks += 1
+            with transaction.atomic():
+                changed = self._import_chunk(chunk)
+            if changed and not self.report.dry_run:
+                bump_catalog_version()  # bulk writes send no post_save
+            self.log(f'{self.report.rows} rows, {self.report.error_count} errors')
+        return self.report
+
+    def _import_chunk(self, chunk):
+        products, variants, images = {}, {}, {}
+        for line, record in chunk:
+            try:
+                product, variant, urls = parse_record(record)
+                self._resolve(product)
+            except RowError as exc:
+                sku = record.get('sku') if isinstance(record, dict) else None
+                self.report.error(line, sku, str(exc))
+                continue
+            products.setdefault(product['slug'], {'line': line}).update(product)
+            variant['product_slug'] = product['slug']
+            variants[variant['sku']] = variant
+            if urls is not None:
+                images[product['slug']] = urls
+
+        product_ids, touched = self._upsert_products(products)
+        touched |= self._upsert_variants(variants, product_ids)
+        touched |= self._replace_images(images, product_ids)
+        touched.discard(None)
+        if touched and not self.report.dry_run:
+            refresh_listing_summaries(touched)
+            refresh_search_documents('catalog', touched)
+        return bool(touched)
+
+    def _resolve(self, product):
+        brand = product.pop('brand', None)
+        if brand is not None:
+            if brand not in self.brands:
+                if self.report.dry_run:
+                    self.brands[brand] = f'new:{brand}'  # placeholder; nothing is written
+                else:
+                    created = Brand.objects.create(name=brand.replace('-', ' ').title(), slug=brand)
+                    self.brands[brand] = created.pk
+            product['brand_id'] = self.brands[brand]
+        category = product.pop('category', None)
+        if category is not None:
+            if category not in self.categories:
+                raise RowError(f'Unknown category {category!r}')
+            product['category_id'] = self.categories[category]
+
+    def _upsert_products(self, products) -> tuple[dict, set]:
+        existing = {
+            row['slug']: row
+            for row in Product.objects.filter(slug__in=list(products)).values('pk', 'slug', *PRODUCT_FIELDS)
+        }
+        ids = {slug: row['pk'] for slug, row in existing.items()}
+        writes = []
+        for slug, incoming in products.items():
+            current = existing.get(slug)
+            if current is None:
+                if not incoming.get('title') or not incoming.get('brand_id') or not incoming.get('category_id'):
+                    self.report.error(incoming['line'], None, f'New product {slug!r} needs title, brand and category')
+                    continue
+                self.report.products.created += 1
+                values = {'title': incoming['title'], 'description': '', 'is_active': True}
+            elif any(name in incoming and incoming[name] != current[name] for name in PRODUCT_FIELDS):
+                self.report.products.updated += 1
+                values = {name: current[name] for name in PRODUCT_FIELDS}
+            else:
+                self.report.products.unchanged += slug not in self.previous_slugs
+                continue
+            values.update({name: incoming[name] for name in PRODUCT_FIELDS if name in incoming})
+            writes.append(Product(slug=slug, **values))
+        self.previous_slugs = set(products)
+
+        if writes and not self.report.dry_run:
+            Product.objects.bulk_create(
+                writes,
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=[*PRODUCT_FIELDS, 'updated_at'],
+            )
+            if any(product.pk is None for product in writes):
+                # Backends that cannot return ids from an upsert.
+                ids.update(Product.objects.filter(slug__in=[p.slug for p in writes]).values_list('slug', 'pk'))
+            else:
+                ids.update((product.slug, product.pk) for product in writes)
+        return ids, {ids.get(product.slug) for product in writes}
+
+    def _upsert_variants(self, variants, product_ids) -> set:
+        existing = {
+            row['sku']: row
+            for row in ProductVariant.objects.filter(sku__in=list(variants)).values('sku', *VARIANT_FIELDS)
+        }
+        writes = []
+        touched = set()
+        for sku, incoming in variants.items():
+            product_id = product_ids.get(incoming.pop('product_slug'))
+            if product_id is None and not self.report.dry_run:
+                continue  # its product row was rejected
+            incoming['product_id'] = product_id
+            current = existing.get(sku)
+            updates = incoming.pop('attribute_updates', None)
+            if updates:
+                stored = current['attributes'] if current and isinstance(current['attributes'], dict) else {}
+                incoming['attributes'] = {**stored, **updates}
+            if current is None:
+                if 'price' not in incoming:
+                    self.report.error(None, sku, 'New variant needs a price')
+                    continue
+                self.report.variants.created += 1
+                values = {'mrp': None, 'stock_qty': 0, 'attributes': {}}
+            elif any(name in incoming and incoming[name] != current[name] for name in VARIANT_FIELDS):
+                self.report.variants.updated += 1
+                values = {name: current[name] for name in VARIANT_FIELDS}
+                touched.add(current['product_id'])  # a variant may move between products
+            else:
+                self.report.variants.unchanged += 1
+                continue
+            values.update({name: incoming[name] for name in VARIANT_FIELDS if name in incoming})
+            writes.append(ProductVariant(sku=sku, **values))
+            touched.add(product_id)
+
+        if writes and not self.report.dry_run:
+            ProductVariant.objects.bulk_create(
+                writes,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=[*VARIANT_FIELDS, 'updated_at'],
+            )
+        return touched
+
+    def _replace_images(self, images, product_ids) -> set:
+        wanted = {product_ids[slug]: urls for slug, urls in images.items() if slug in product_ids}
+        current = {}
+        for product_id, url in (
+            ProductImage.objects.filter(product_id__in=list(wanted))
+            .order_by('product_id', 'sort_order', 'pk')
+            .values_list('product_id', 'image_url')
+        ):
+            current.setdefault(product_id, []).append(url)
+        changed = {product_id for product_id, urls in wanted.items() if current.get(product_id, []) != urls}
+        self.report.images_replaced += len(changed)
+
+        if changed and not self.report.dry_run:
+            # Plain SQL DELETE: QuerySet.delete() would send post_delete per image,
+            # refreshing the summary and bumping the catalog version each time;
+            # the importer does both once per chunk instead. No table references images.
+            table = connection.ops.quote_name(ProductImage._meta.db_table)
+            column = connection.ops.quote_name(ProductImage._meta.get_field('product').column)
+            ids = sorted(changed)
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(ids))})', ids)
+            ProductImage.objects.bulk_create(
+                [
+                    ProductImage(product_id=product_id, image_url=url, sort_order=position)
+                    for product_id in changed
+                    for position, url in enumerate(wanted[product_id])
+                ]
+            )
+        return changed
+
+
+def import_catalog(stream, fmt: str, chunk_size: int = 1000, dry_run: bool = False, log=None) -> ImportReport:
+    return CatalogImporter(chunk_size=chunk_size, dry_run=dry_run, log=log).run(stream, fmt)
+
+
+def format_for(filename: str) -> str:
+    """Guess the feed format from a file name (``.jsonl``/``.ndjson`` or CSV)."""
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
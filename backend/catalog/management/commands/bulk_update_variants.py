@@ -0,0 +1,73 @@
+"""Apply a warehouse stock/price export to product variants."""
+
+import json
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from catalog.importer import FORMATS, format_for, read_records
+from catalog.serializers import VariantStockRowSerializer
+from catalog.services import bulk_update_variants
+
+MAX_LISTED = 20
+
+
+class Command(BaseCommand):
+    help = "Stream (sku, stock_qty, price, mrp) rows from CSV/JSONL and update only the variants that changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed file, or - for stdin")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to jsonl for .jsonl/.ndjson files, else csv")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--results", action="store_true", help="Print one JSON result line per SKU")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or format_for(path)
+        self.errors = []
+        try:
+            if path == "-":
+                counts, not_found = self._sync(sys.stdin, fmt, options)
+            else:
+                with open(path, newline="", encoding="utf-8-sig") as stream:
+                    counts, not_found = self._sync(stream, fmt, options)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line, error in self.errors[:MAX_LISTED]:
+            self.stderr.write(f"line {line}: {error}")
+        if not_found:
+            self.stderr.write(f"Unknown SKUs: {', '.join(not_found[:MAX_LISTED])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done! {counts['updated']} updated, {counts['unchanged']} unchanged, "
+                f"{counts['not_found']} not found, {len(self.errors)} invalid rows"
+            )
+        )
+
+    def _sync(self, stream, fmt, options):
+        counts = Counter()
+        not_found = []
+        for result in bulk_update_variants(self._rows(stream, fmt), options["chunk_size"]):
+            counts[result["status"]] += 1
+            if result["status"] == "not_found" and len(not_found) < MAX_LISTED:
+                not_found.append(result["sku"])
+            if options["results"]:
+                self.stdout.write(json.dumps(result))
+        return counts, not_found
+
+    def _rows(self, stream, fmt):
+        # One serializer for every row: building its fields per row costs more than the update.
+        serializer = VariantStockRowSerializer()
+        for line, record in read_records(stream, fmt):
+            if not isinstance(record, dict):
+                self.errors.append((line, str(record) if isinstance(record, Exception) else "Record is not an object"))
+                continue
+            # Blank CSV cells mean "leave as is".
+            data = {key: value for key, value in record.items() if value != ""}
+            try:
+                yield serializer.run_validation(data)
+            except ValidationError as exc:
+                self.errors.append((line, json.dumps(exc.detail)))
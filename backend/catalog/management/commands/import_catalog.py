@@ -0,0 +1,50 @@
+"""Import or sync products, variants and images from a CSV/JSONL feed."""
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import FORMATS, format_for, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSONL catalog feed into the database with chunked upserts on slug/SKU"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed file, or - for stdin")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to jsonl for .jsonl/.ndjson files, else csv")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+        parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or format_for(path)
+        log = None if options["json"] else self.stdout.write
+        try:
+            if path == "-":
+                report = import_catalog(sys.stdin, fmt, options["chunk_size"], options["dry_run"], log)
+            else:
+                with open(path, newline="", encoding="utf-8-sig") as stream:
+                    report = import_catalog(stream, fmt, options["chunk_size"], options["dry_run"], log)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        result = report.as_dict()
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        for error in result["errors"]:
+            self.stderr.write(f"line {error['line']} sku {error['sku']}: {error['error']}")
+        products, variants = result["products"], result["variants"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{'Dry run' if report.dry_run else 'Done'}! {result['rows']} rows in {result['seconds']}s. "
+                f"Products: {products['created']} created, {products['updated']} updated, "
+                f"{products['unchanged']} unchanged. "
+                f"Variants: {variants['created']} created, {variants['updated']} updated, "
+                f"{variants['unchanged']} unchanged. "
+                f"Images replaced for {result['images_replaced']} products. {result['error_count']} errors."
+            )
+        )
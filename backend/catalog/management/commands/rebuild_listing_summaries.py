@@ -0,0 +1,30 @@
+"""Rebuild the denormalized product listing summary table."""
+
+from django.core.management.base import BaseCommand
+
+from catalog.models import Product
+from catalog.services import refresh_listing_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute ProductListingSummary rows for every product in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ids = Product.objects.order_by("pk").values_list("pk", flat=True)
+
+        total = 0
+        last_pk = None
+        while True:
+            batch_qs = ids if last_pk is None else ids.filter(pk__gt=last_pk)
+            batch = list(batch_qs[:batch_size])
+            if not batch:
+                break
+            total += refresh_listing_summaries(batch)
+            last_pk = batch[-1]
+            self.stdout.write(f"Refreshed {total} summaries...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done! {total} summaries rebuilt"))
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery, Sum
+
+
+def backfill_summaries(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    ProductImage = apps.get_model('catalog', 'ProductImage')
+    ProductListingSummary = apps.get_model('catalog', 'ProductListingSummary')
+
+    cover = ProductImage.objects.filter(product=OuterRef('pk')).order_by('sort_order', 'pk')
+    rows = Product.objects.annotate(
+        min_price=Min('variants__price'),
+        max_price=Max('variants__price'),
+        min_mrp=Min('variants__mrp'),
+        total_stock=Sum('variants__stock_qty', default=0),
+        variant_count=Count('variants'),
+        cover_image_url=Subquery(cover.values('image_url')[:1]),
+    ).values('pk', 'min_price', 'max_price', 'min_mrp', 'total_stock', 'variant_count', 'cover_image_url')
+    ProductListingSummary.objects.bulk_create(
+        [
+            ProductListingSummary(
+                product_id=row['pk'],
+                min_price=row['min_price'],
+                max_price=row['max_price'],
+                min_mrp=row['min_mrp'],
+                total_stock=row['total_stock'],
+                in_stock=row['total_stock'] > 0,
+                cover_image_url=row['cover_image_url'] or '',
+                variant_count=row['variant_count'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListingSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing_summary', serialize=False, to='catalog.product')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('min_mrp', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('total_stock', models.PositiveIntegerField(default=0)),
+                ('in_stock', models.BooleanField(default=False)),
+                ('cover_image_url', models.URLField(blank=True, default='', max_length=1024)),
+                ('variant_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product listing summaries',
+                'indexes': [models.Index(fields=['min_price'], name='catalog_summary_price_idx'), models.Index(fields=['in_stock', 'min_price'], name='catalog_summary_stock_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_productlistingsummary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productlistingsummary',
+            name='catalog_summary_price_idx',
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['name', 'id'], name='catalog_category_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'created_at', 'id'], name='catalog_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'title', 'id'], name='catalog_product_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlistingsummary',
+            index=models.Index(fields=['min_price', 'product'], name='catalog_summary_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'category', '-created_at'], name='catalog_product_category_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:20
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_from_mrp(apps, schema_editor):
+    ProductListingSummary = apps.get_model('catalog', 'ProductListingSummary')
+    ProductVariant = apps.get_model('catalog', 'ProductVariant')
+    cheapest = ProductVariant.objects.filter(product=OuterRef('product')).order_by('price', 'pk')
+    ProductListingSummary.objects.update(from_mrp=Subquery(cheapest.values('mrp')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='productlistingsummary',
+            old_name='min_mrp',
+            new_name='from_mrp',
+        ),
+        migrations.RunPython(fill_from_mrp, migrations.RunPython.noop),
+    ]
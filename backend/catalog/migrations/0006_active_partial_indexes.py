@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_rename_min_mrp_from_mrp'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='catalog_product_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='catalog_product_title_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='catalog_product_category_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='catalog_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['title', 'id'], name='catalog_product_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created_at'], name='catalog_product_category_idx'),
+        ),
+    ]
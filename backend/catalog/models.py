@@ -22,6 +22,9 @@ class Category(TimeStampedModel):
 
     class Meta:
         verbose_name_plural = 'Categories'
+        indexes = [
+            models.Index(fields=['name', 'id'], name='catalog_category_keyset_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -35,6 +38,21 @@ class Brand(TimeStampedModel):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_listing_fields(self):
+        """
+        Annotate the "from" price/MRP (cheapest variant) and the cover image
+        so list serializers never have to touch ``variants`` or ``images``.
+        """
+        cheapest = ProductVariant.objects.filter(product=models.OuterRef('pk')).order_by('price', 'pk')
+        cover = ProductImage.objects.filter(product=models.OuterRef('pk')).order_by('sort_order', 'pk')
+        return self.annotate(
+            from_price=models.Subquery(cheapest.values('price')[:1]),
+            from_mrp=models.Subquery(cheapest.values('mrp')[:1]),
+            cover_image_url=models.Subquery(cover.values('image_url')[:1]),
+        )
+
+
 class Product(TimeStampedModel):
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
@@ -51,6 +69,32 @@ class Product(TimeStampedModel):
     )
     is_active = models.BooleanField(default=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Keyset pagination: (<ordering>, id) over active products for each
+        # allowed ordering. Partial rather than led by is_active: SQLite
+        # renders is_active=True as a bare boolean term, which can match an
+        # index condition but not a leading index column.
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_active=True),
+                name='catalog_product_created_idx',
+            ),
+            models.Index(
+                fields=['title', 'id'],
+                condition=models.Q(is_active=True),
+                name='catalog_product_title_idx',
+            ),
+            # Category (and subcategory) listings, newest first.
+            models.Index(
+                fields=['category', '-created_at'],
+                condition=models.Q(is_active=True),
+                name='catalog_product_category_idx',
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.title
 
@@ -82,3 +126,35 @@ class ProductImage(TimeStampedModel):
 
     def __str__(self) -> str:
         return f'Image for {self.product.slug} ({self.sort_order})'
+
+
+class ProductListingSummary(models.Model):
+    """
+    Denormalized per-product listing row, kept in sync by catalog.services.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='listing_summary',
+    )
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # MRP of the cheapest variant, so it always pairs with min_price.
+    from_mrp = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    total_stock = models.PositiveIntegerField(default=0)
+    in_stock = models.BooleanField(default=False)
+    cover_image_url = models.URLField(max_length=1024, blank=True, default='')
+    variant_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Product listing summaries'
+        indexes = [
+            models.Index(fields=['min_price', 'product'], name='catalog_summary_keyset_idx'),
+            models.Index(fields=['in_stock', 'min_price'], name='catalog_summary_stock_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Listing summary for {self.product_id}'
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from api.category_tree import get_category_tree
+
 from .models import Brand, Category, Product, ProductImage, ProductVariant
 
 
@@ -38,22 +40,25 @@ class ProductListSerializer(serializers.ModelSerializer):
         model = Product
         fields = ['id', 'title', 'slug', 'brand', 'category', 'is_active', 'price', 'mrp', 'image_url']
 
+    # price/mrp/image_url are read from the select_related listing_summary row
+
     def get_price(self, obj):
-        variant = obj.variants.first()
-        return float(variant.price) if variant else None
+        summary = getattr(obj, 'listing_summary', None)
+        return float(summary.min_price) if summary and summary.min_price is not None else None
 
     def get_mrp(self, obj):
-        variant = obj.variants.first()
-        return float(variant.mrp) if variant and variant.mrp else None
+        summary = getattr(obj, 'listing_summary', None)
+        return float(summary.from_mrp) if summary and summary.from_mrp else None
 
     def get_image_url(self, obj):
-        image = obj.images.order_by('sort_order').first()
-        return image.image_url if image else None
+        summary = getattr(obj, 'listing_summary', None)
+        return summary.cover_image_url or None if summary else None
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
     brand = BrandSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
+    category_path = serializers.SerializerMethodField()
     variants = ProductVariantSerializer(many=True, read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
 
@@ -66,8 +71,24 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'description',
             'brand',
             'category',
+            'category_path',
             'is_active',
             'variants',
             'images',
         ]
 
+    def get_category_path(self, obj):
+        return get_category_tree(Category).path(obj.category_id)
+
+
+class VariantStockRowSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=64)
+    stock_qty = serializers.IntegerField(min_value=0, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    mrp = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True)
+
+
+class VariantBulkUpdateSerializer(serializers.Serializer):
+    """Omitted fields are left alone; ``mrp: null`` clears the MRP."""
+
+    items = VariantStockRowSerializer(many=True, allow_empty=False, max_length=10000)
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Sum, Value, When
+from django.utils import timezone
+
+from api.cache import bump_catalog_version
+
+from .models import Product, ProductListingSummary, ProductVariant
+
+SUMMARY_FIELDS = [
+    'min_price',
+    'max_price',
+    'from_mrp',
+    'total_stock',
+    'in_stock',
+    'cover_image_url',
+    'variant_count',
+    'updated_at',
+]
+
+
+def refresh_listing_summaries(product_ids=None) -> int:
+    """
+    Recompute ProductListingSummary rows for the given products (all when None)
+    with one aggregate query and one upsert.
+    """
+    qs = Product.objects.all()
+    if product_ids is not None:
+        qs = qs.filter(pk__in=list(product_ids))
+    rows = qs.with_listing_fields().annotate(
+        min_price=Min('variants__price'),
+        max_price=Max('variants__price'),
+        total_stock=Sum('variants__stock_qty', default=0),
+        variant_count=Count('variants'),
+    ).values(
+        'pk',
+        'min_price',
+        'max_price',
+        'from_mrp',
+        'total_stock',
+        'variant_count',
+        'cover_image_url',
+    )
+
+    now = timezone.now()
+    summaries = [
+        ProductListingSummary(
+            product_id=row['pk'],
+            min_price=row['min_price'],
+            max_price=row['max_price'],
+            from_mrp=row['from_mrp'],
+            total_stock=row['total_stock'],
+            in_stock=row['total_stock'] > 0,
+            cover_image_url=row['cover_image_url'] or '',
+            variant_count=row['variant_count'],
+            updated_at=now,
+        )
+        for row in rows
+    ]
+    if summaries:
+        ProductListingSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=SUMMARY_FIELDS,
+        )
+    return len(summaries)
+
+
+STOCK_FIELDS = ['stock_qty', 'price', 'mrp']
+
+
+def _case_by_value(field: str, values: dict) -> Case:
+    """``CASE`` setting ``field`` to ``values[pk]``, one ``WHEN pk IN (...)`` per distinct value."""
+    pks_by_value = defaultdict(list)
+    for pk, value in values.items():
+        pks_by_value[value].append(pk)
+    return Case(
+        *[When(pk__in=pks, then=Value(value)) for value, pks in pks_by_value.items()],
+        default=F(field),
+        output_field=ProductVariant._meta.get_field(field),
+    )
+
+
+def update_variant_chunk(rows) -> tuple[list[dict], set]:
+    """
+    Apply ``{'sku', 'stock_qty'?, 'price'?, 'mrp'?}`` rows in one transaction:
+    lock the variants in id order, then write only the ones that differ with a
+    single ``UPDATE`` (a ``CASE`` per changed field). Returns per-SKU results
+    and the ids of products whose listing data changed.
+
+    ``stock_qty`` is the warehouse's on-hand count. Units held by unpaid
+    checkouts (active StockReservations) are already taken out of the stored
+    stock and are returned to it if the hold is released, so they are
+    subtracted from the incoming figure rather than counted twice.
+    """
+    from orders.models import StockReservation
+
+    wanted = {row['sku']: row for row in rows}  # a repeated SKU: last row wins
+    results = []
+    updates = {name: {} for name in STOCK_FIELDS}
+    touched = set()
+    with transaction.atomic():
+        found = {
+            sku: (pk, product_id, values)
+            for pk, sku, product_id, *values in ProductVariant.objects.select_for_update()
+            .filter(sku__in=list(wanted))
+            .order_by('pk')
+            .values_list('pk', 'sku', 'product_id', *STOCK_FIELDS)
+        }
+        held = {}
+        if any('stock_qty' in row for row in wanted.values()):
+            # Read under the variant locks, so no checkout can add a hold meanwhile.
+            held = dict(
+                StockReservation.objects.filter(
+                    product_variant_id__in=[pk for pk, _, _ in found.values()],
+                    status=StockReservation.Status.ACTIVE,
+                )
+                .values('product_variant_id')
+                .annotate(quantity=Sum('quantity'))
+                .values_list('product_variant_id', 'quantity')
+            )
+        for sku, row in wanted.items():
+            if sku not in found:
+                results.append({'sku': sku, 'status': 'not_found'})
+                continue
+            pk, product_id, current = found[sku]
+            if 'stock_qty' in row and held.get(pk):
+                row = {**row, 'stock_qty': max(row['stock_qty'] - held[pk], 0)}
+            diff = [name for name, value in zip(STOCK_FIELDS, current) if name in row and row[name] != value]
+            if not diff:
+                results.append({'sku': sku, 'status': 'unchanged'})
+                continue
+            for name in diff:
+                updates[name][pk] = row[name]
+            touched.add(product_id)
+            results.append({'sku': sku, 'status': 'updated', 'fields': diff})
+
+        changed_pks = {pk for values in updates.values() for pk in values}
+        if changed_pks:
+            ProductVariant.objects.filter(pk__in=changed_pks).update(
+                updated_at=timezone.now(),
+                **{name: _case_by_value(name, values) for name, values in updates.items() if values},
+            )
+            refresh_listing_summaries(touched)
+    return results, touched
+
+
+def bulk_update_variants(rows, chunk_size: int = 1000):
+    """
+    Yield per-SKU results for an iterable of stock/price rows, ``chunk_size``
+    at a time. The catalog version is bumped once, after the last chunk.
+    """
+    rows = iter(rows)
+    changed = False
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            results, touched = update_variant_chunk(chunk)
+            changed |= bool(touched)
+            yield from results
+    finally:
+        if changed:
+            bump_catalog_version()  # bulk_update sends no post_save
@@ -0,0 +1,32 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Product, ProductImage, ProductVariant
+from .services import refresh_listing_summaries
+
+
+def _deleting_product(origin) -> bool:
+    # Cascades from a product delete must not resurrect its summary row.
+    if isinstance(origin, QuerySet):
+        return origin.model is Product
+    return isinstance(origin, Product)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    if created:
+        refresh_listing_summaries([instance.pk])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+def listing_child_saved(sender, instance, **kwargs):
+    refresh_listing_summaries([instance.product_id])
+
+
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_delete, sender=ProductImage)
+def listing_child_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):
+        refresh_listing_summaries([instance.product_id])
@@ -0,0 +1,11 @@
+"""Background catalog maintenance (run by ``manage.py run_worker``)."""
+
+from tasks.registry import task
+
+from .services import refresh_listing_summaries
+
+
+@task
+def refresh_summaries(product_ids: list) -> None:
+    """Recompute listing summaries (stock figures) after checkout or restock."""
+    refresh_listing_summaries(product_ids)
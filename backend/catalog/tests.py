@@ -1,3 +1,442 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import bump_catalog_version, get_catalog_version
+
+from . import facets
+from .importer import import_catalog
+from .models import Brand, Category, Product, ProductImage, ProductListingSummary, ProductVariant
+
+
+def make_product(brand, category, index, variants=2, images=2):
+    product = Product.objects.create(
+        title=f'Phone {index}',
+        slug=f'phone-{index}',
+        brand=brand,
+        category=category,
+    )
+    for v in range(variants):
+        ProductVariant.objects.create(
+            product=product,
+            sku=f'PH-{index}-{v}',
+            price=Decimal(1000 + index * 10 + v),
+            mrp=Decimal(1200 + index * 10 + v),
+            stock_qty=5,
+        )
+    for i in range(images):
+        ProductImage.objects.create(
+            product=product,
+            image_url=f'https://img.example.com/{index}/{i}.jpg',
+            sort_order=images - i,
+        )
+    return product
+
+
+class ProductListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.brand = Brand.objects.create(name='Acme', slug='acme')
+        cls.category = Category.objects.create(name='Phones', slug='phones')
+
+    def test_list_query_count_is_constant(self):
+        for index in range(3):
+            make_product(self.brand, self.category, index)
+        with self.assertNumQueries(2):
+            self.client.get('/api/catalog/products/')
+
+        for index in range(3, 20):
+            make_product(self.brand, self.category, index)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/catalog/products/')
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_list_uses_cheapest_variant_and_first_image(self):
+        make_product(self.brand, self.category, 1)
+        item = self.client.get('/api/catalog/products/').json()['results'][0]
+        self.assertEqual(item['price'], 1010.0)
+        self.assertEqual(item['mrp'], 1210.0)
+        self.assertEqual(item['image_url'], 'https://img.example.com/1/1.jpg')
+
+    def test_price_ordering(self):
+        make_product(self.brand, self.category, 2)
+        make_product(self.brand, self.category, 1)
+        results = self.client.get('/api/catalog/products/?ordering=price').json()['results']
+        self.assertEqual([r['slug'] for r in results], ['phone-1', 'phone-2'])
+
+
+class FacetIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.brand = Brand.objects.create(name='Acme', slug='acme')
+        cls.category = Category.objects.create(name='Phones', slug='phones')
+        for index in range(12):
+            make_product(cls.brand, cls.category, index, variants=3, images=0)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_price_mask_matches_a_scan_of_every_variant(self):
+        index = facets.get_facet_index()
+        bounds = [None, Decimal(0), Decimal(1000), Decimal('1042'), Decimal('1055.5'), Decimal(1112), Decimal(5000)]
+        for checkpoint in (1, 4, 256):
+            with self.subTest(checkpoint=checkpoint), mock.patch.object(facets, 'PRICE_CHECKPOINT', checkpoint):
+                index._build_price_prefixes()
+                for price_min in bounds:
+                    for price_max in bounds:
+                        expected = 0
+                        for position, price in enumerate(index.variant_price):
+                            if (price_min is None or price >= price_min) and (price_max is None or price <= price_max):
+                                expected |= 1 << position
+                        self.assertEqual(index.price_mask(price_min, price_max), expected, (price_min, price_max))
+
+    def test_listing_price_filter(self):
+        results = self.client.get('/api/catalog/products/?price_min=1040&price_max=1060&ordering=price').json()['results']
+        self.assertEqual([r['slug'] for r in results], ['phone-4', 'phone-5', 'phone-6'])
+
+    def test_index_follows_the_shared_catalog_version(self):
+        index = facets.get_facet_index()
+        self.assertIs(facets.get_facet_index(), index)
+        # Bulk writes send no signals; another worker's bump reaches this one through the cache.
+        ProductVariant.objects.filter(product__slug='phone-0').update(price=Decimal(9))
+        self.assertIs(facets.get_facet_index(), index)
+        bump_catalog_version()
+        rebuilt = facets.get_facet_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(len(rebuilt.products(rebuilt.price_mask(price_max=Decimal(10)))), 1)
+
+
+    def test_product_projection_matches_a_scan_of_every_variant(self):
+        rng = random.Random(7)
+        rows, position = [], 0
+        for product_id in range(1, 60):
+            for _ in range(rng.choice([1, 1, 2, 3, 5, 9])):
+                color = rng.choice(['Black', 'Blue', 'Red'])
+                rows.append((position, product_id, Decimal(rng.randrange(100)), {'color': color}, 1, 'acme', 'Acme', 1))
+                position += 1
+        index = facets.FacetIndex(rows)
+        for _ in range(50):
+            mask = rng.getrandbits(index.size) & rng.getrandbits(index.size)
+            expected = {index.variant_product[p] for p in range(index.size) if mask >> p & 1}
+            self.assertEqual(index.products(mask), expected)
+            self.assertEqual(index.product_count(mask), len(expected))
+        counts = {entry['value']: entry['count'] for entry in index.counts({})['color']}
+        for color, bitmap in index.bitmaps['color'].items():
+            self.assertEqual(counts[color], len({index.variant_product[p] for p in range(index.size) if bitmap >> p & 1}))
+
+
+class FacetRebuildTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        facets._cached = None
+        brand = Brand.objects.create(name='Acme', slug='acme')
+        category = Category.objects.create(name='Phones', slug='phones')
+        for index in range(3):
+            make_product(brand, category, index, variants=2, images=0)
+
+    def test_previous_index_serves_while_the_next_one_builds(self):
+        index = facets.get_facet_index()
+        ProductVariant.objects.filter(product__slug='phone-0').update(price=Decimal(9))
+        bump_catalog_version()
+        self.assertIs(facets.get_facet_index(), index)
+        rebuilding = facets._rebuilding
+        if rebuilding is not None:
+            rebuilding.join(timeout=10)
+        rebuilt = facets.get_facet_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.products(rebuilt.price_mask(price_max=Decimal(10))), {Product.objects.get(slug='phone-0').pk})
+
+
+class ListingSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.brand = Brand.objects.create(name='Acme', slug='acme')
+        cls.category = Category.objects.create(name='Phones', slug='phones')
+
+    def summary(self, product):
+        return ProductListingSummary.objects.get(product=product)
+
+    def test_mrp_belongs_to_the_cheapest_variant(self):
+        product = make_product(self.brand, self.category, 1, variants=0, images=0)
+        ProductVariant.objects.create(product=product, sku='A', price=Decimal('500'), mrp=Decimal('900'))
+        ProductVariant.objects.create(product=product, sku='B', price=Decimal('700'), mrp=Decimal('750'))
+        summary = self.summary(product)
+        self.assertEqual((summary.min_price, summary.max_price), (Decimal('500'), Decimal('700')))
+        self.assertEqual(summary.from_mrp, Decimal('900'))
+
+    def test_variant_writes_refresh_the_summary(self):
+        product = make_product(self.brand, self.category, 1, variants=0, images=0)
+        self.assertEqual((self.summary(product).variant_count, self.summary(product).in_stock), (0, False))
+
+        variant = ProductVariant.objects.create(product=product, sku='A', price=Decimal('500'), stock_qty=3)
+        self.assertEqual((self.summary(product).min_price, self.summary(product).total_stock), (Decimal('500'), 3))
+
+        variant.price = Decimal('450')
+        variant.stock_qty = 0
+        variant.save()
+        summary = self.summary(product)
+        self.assertEqual((summary.min_price, summary.total_stock, summary.in_stock), (Decimal('450'), 0, False))
+
+        variant.delete()
+        summary = self.summary(product)
+        self.assertEqual((summary.min_price, summary.variant_count), (None, 0))
+
+    def test_image_writes_refresh_the_cover(self):
+        product = make_product(self.brand, self.category, 1, variants=1, images=0)
+        second = ProductImage.objects.create(product=product, image_url='https://img.example.com/2.jpg', sort_order=2)
+        self.assertEqual(self.summary(product).cover_image_url, 'https://img.example.com/2.jpg')
+        ProductImage.objects.create(product=product, image_url='https://img.example.com/1.jpg', sort_order=1)
+        self.assertEqual(self.summary(product).cover_image_url, 'https://img.example.com/1.jpg')
+        ProductImage.objects.filter(sort_order=1).first().delete()
+        self.assertEqual(self.summary(product).cover_image_url, second.image_url)
+
+    def test_product_delete_removes_the_summary(self):
+        product = make_product(self.brand, self.category, 1)
+        product.delete()
+        self.assertFalse(ProductListingSummary.objects.exists())
+
+
+FEED = """product_slug,title,brand,category,sku,price,mrp,stock_qty,attr_color,images
+pixel-9,Pixel 9,Google,phones,GOO-PX9-128,79999,84999,40,Obsidian,https://img.example.com/a.jpg|https://img.example.com/b.jpg
+pixel-9,Pixel 9,Google,phones,GOO-PX9-256,89999,94999,10,Porcelain,
+phone-1,Phone 1,acme,phones,PH-1-0,999,1200,5,,
+"""
+
+
+class CatalogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.brand = Brand.objects.create(name='Acme', slug='acme')
+        cls.category = Category.objects.create(name='Phones', slug='phones')
+
+    def setUp(self):
+        cache.clear()
+        make_product(self.brand, self.category, 1, variants=1)
+
+    def run_import(self, text, fmt='csv', **kwargs):
+        return import_catalog(io.StringIO(text), fmt, **kwargs).as_dict()
+
+    def test_creates_updates_and_reports_diff(self):
+        report = self.run_import(FEED)
+        self.assertEqual(report['products'], {'created': 1, 'updated': 0, 'unchanged': 1})
+        self.assertEqual(report['variants'], {'created': 2, 'updated': 1, 'unchanged': 0})
+        self.assertEqual(report['images_replaced'], 1)
+        self.assertEqual(report['error_count'], 0)
+
+        product = Product.objects.get(slug='pixel-9')
+        self.assertEqual(product.brand.slug, 'google')  # unknown brands are created
+        self.assertEqual(
+            list(product.images.order_by('sort_order').values_list('image_url', flat=True)),
+            ['https://img.example.com/a.jpg', 'https://img.example.com/b.jpg'],
+        )
+        variant = ProductVariant.objects.get(sku='GOO-PX9-128')
+        self.assertEqual((variant.price, variant.stock_qty), (Decimal('79999'), 40))
+        self.assertEqual(variant.attributes, {'color': 'Obsidian'})
+        self.assertEqual(ProductVariant.objects.get(sku='PH-1-0').price, Decimal('999'))
+        self.assertEqual(product.listing_summary.min_price, Decimal('79999'))
+
+        # Re-importing the same feed writes nothing.
+        with self.assertNumQueries(7):
+            report = self.run_import(FEED)
+        self.assertEqual(report['products'], {'created': 0, 'updated': 0, 'unchanged': 2})
+        self.assertEqual(report['variants'], {'created': 0, 'updated': 0, 'unchanged': 3})
+        self.assertEqual(report['images_replaced'], 0)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        rows = [f'bulk-{i},Bulk {i},acme,phones,BULK-{i},{100 + i},,1,,' for i in range(50)]
+        header = FEED.splitlines()[0]
+        with self.assertNumQueries(10):
+            self.run_import('\n'.join([header, *rows[:5]]))
+        with self.assertNumQueries(10):
+            self.run_import('\n'.join([header, *rows[5:]]))
+        self.assertEqual(Product.objects.filter(slug__startswith='bulk-').count(), 50)
+
+    def test_attr_columns_merge_into_stored_attributes(self):
+        ProductVariant.objects.filter(sku='PH-1-0').update(attributes={'color': 'Black', 'storage': '128GB'})
+        feed = 'sku,product_slug,attr_color\nPH-1-0,phone-1,Blue\n'
+        self.assertEqual(self.run_import(feed)['variants']['updated'], 1)
+        self.assertEqual(ProductVariant.objects.get(sku='PH-1-0').attributes, {'color': 'Blue', 'storage': '128GB'})
+
+        # An attributes column still replaces the whole object.
+        self.run_import('sku,product_slug,attributes,attr_ram\nPH-1-0,phone-1,"{""color"": ""Red""}",8GB\n')
+        self.assertEqual(ProductVariant.objects.get(sku='PH-1-0').attributes, {'color': 'Red', 'ram': '8GB'})
+
+    def test_image_replacement_sends_no_per_image_signals(self):
+        make_product(self.brand, self.category, 2, variants=1, images=3)
+        feed = '\n'.join(
+            ['sku,product_slug,images', *(f'PH-{i}-0,phone-{i},https://img.example.com/n{i}.jpg' for i in (1, 2))]
+        )
+        with (
+            mock.patch('catalog.signals.refresh_listing_summaries') as per_row_refresh,
+            mock.patch('api.signals.bump_catalog_version') as per_row_bump,
+            mock.patch('catalog.importer.bump_catalog_version') as chunk_bump,
+        ):
+            report = self.run_import(feed, chunk_size=1)
+        self.assertEqual(report['images_replaced'], 2)
+        per_row_refresh.assert_not_called()
+        per_row_bump.assert_not_called()
+        self.assertEqual(chunk_bump.call_count, 2)
+        self.assertEqual(
+            Product.objects.get(slug='phone-2').listing_summary.cover_image_url, 'https://img.example.com/n2.jpg'
+        )
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import(FEED, dry_run=True)
+        self.assertEqual(report['products']['created'], 1)
+        self.assertEqual(report['variants']['created'], 2)
+        self.assertFalse(Product.objects.filter(slug='pixel-9').exists())
+        self.assertFalse(Brand.objects.filter(slug='google').exists())
+        self.assertEqual(ProductVariant.objects.get(sku='PH-1-0').price, Decimal('1010'))
+
+    def test_row_errors_are_reported_and_skipped(self):
+        feed = FEED.splitlines()[0] + '\nx,X,acme,tablets,X-1,10,,1,,\ny,Y,acme,phones,Y-1,abc,,1,,\n'
+        report = self.run_import(feed)
+        self.assertEqual(report['error_count'], 2)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3])
+        self.assertIn("Unknown category 'tablets'", report['errors'][0]['error'])
+        self.assertFalse(Product.objects.filter(slug__in=['x', 'y']).exists())
+
+    def test_jsonl_with_nested_variants(self):
+        line = {
+            'slug': 'tab-1',
+            'title': 'Tab 1',
+            'brand': 'acme',
+            'category': 'phones',
+            'images': ['https://img.example.com/t.jpg'],
+            'variants': [
+                {'sku': 'TAB-1-A', 'price': 500, 'attributes': {'storage': '64GB'}},
+                {'sku': 'TAB-1-B', 'price': '550.50', 'stock_qty': 3},
+            ],
+        }
+        report = self.run_import(json.dumps(line) + '\n\nnot json\n', 'jsonl', chunk_size=1)
+        self.assertEqual(report['chunks'], 3)
+        self.assertEqual(report['variants']['created'], 2)
+        self.assertEqual(report['errors'][0]['line'], 3)
+        self.assertEqual(ProductVariant.objects.get(sku='TAB-1-B').price, Decimal('550.50'))
+
+    def test_admin_upload(self):
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        response = self.client.post(
+            '/admin/catalog/product/import/',
+            {'feed': SimpleUploadedFile('feed.csv', FEED.encode()), 'format': '', 'dry_run': ''},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report']['variants']['created'], 2)
+        self.assertTrue(Product.objects.filter(slug='pixel-9').exists())
+
+
+class VariantBulkUpdateTests(TestCase):
+    url = '/api/catalog/variants/bulk-update/'
+
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name='Acme', slug='acme')
+        category = Category.objects.create(name='Phones', slug='phones')
+        for index in range(3):
+            make_product(brand, category, index, variants=2, images=0)
+        cls.staff = get_user_model().objects.create_user('staff', password='pw', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, items, user=None):
+        user = user or self.staff
+        return self.client.post(
+            self.url,
+            {'items': items},
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}' if user.pk else '',
+        )
+
+    def test_stock_held_by_pending_checkouts_is_not_counted_twice(self):
+        from orders.inventory import release_reservations, reserve_stock
+        from orders.models import Order, StockReservation
+
+        variant = ProductVariant.objects.get(sku='PH-0-0')  # 5 in stock
+        with transaction.atomic():
+            reserve_stock(Order.objects.create(subtotal=variant.price), [(variant.pk, 2)])
+
+        # The warehouse still has all 5 on hand; 2 of them are held.
+        response = self.post([{'sku': 'PH-0-0', 'stock_qty': 5}])
+        self.assertEqual(response.json()['results'][0]['status'], 'unchanged')
+        self.post([{'sku': 'PH-0-0', 'stock_qty': 12}])
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_qty, 10)
+
+        release_reservations(StockReservation.objects.values_list('pk', flat=True))
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_qty, 12)
+
+    def test_requires_staff(self):
+        shopper = get_user_model().objects.create_user('shopper', password='pw')
+        self.assertEqual(self.post([{'sku': 'PH-0-0', 'stock_qty': 1}], user=shopper).status_code, 403)
+        response = self.client.post(self.url, {'items': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_updates_only_changed_rows_in_one_statement(self):
+        version = get_catalog_version()
+        items = [
+            {'sku': 'PH-0-0', 'stock_qty': 0},
+            {'sku': 'PH-1-1', 'price': '999.00', 'mrp': None},
+            {'sku': 'PH-2-0', 'stock_qty': 5, 'price': '1020'},
+            {'sku': 'NOPE', 'stock_qty': 1},
+        ]
+        # user, savepoint, lock + read, held stock, one UPDATE ... CASE, summary read + upsert, release.
+        with self.assertNumQueries(8):
+            response = self.post(items)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['updated'], body['unchanged'], body['not_found']), (2, 1, 1))
+        self.assertEqual(
+            body['results'],
+            [
+                {'sku': 'PH-0-0', 'status': 'updated', 'fields': ['stock_qty']},
+                {'sku': 'PH-1-1', 'status': 'updated', 'fields': ['price', 'mrp']},
+                {'sku': 'PH-2-0', 'status': 'unchanged'},
+                {'sku': 'NOPE', 'status': 'not_found'},
+            ],
+        )
+        variant = ProductVariant.objects.get(sku='PH-1-1')
+        self.assertEqual((variant.price, variant.mrp, variant.stock_qty), (Decimal('999'), None, 5))
+        self.assertEqual(Product.objects.get(slug='phone-1').listing_summary.min_price, Decimal('999'))
+        self.assertEqual(Product.objects.get(slug='phone-0').listing_summary.total_stock, 5)
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_nothing_changed_does_not_invalidate(self):
+        version = get_catalog_version()
+        body = self.post([{'sku': 'PH-0-0', 'stock_qty': 5}]).json()
+        self.assertEqual(body['unchanged'], 1)
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_invalid_rows_reject_the_request(self):
+        response = self.post([{'sku': 'PH-0-0', 'stock_qty': -1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProductVariant.objects.get(sku='PH-0-0').stock_qty, 5)
+
+    def test_command(self):
+        path = self.tmp_feed('sku,stock_qty,price,mrp\nPH-0-0,7,,\nPH-0-1,x,,\nNOPE,1,,\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('bulk_update_variants', path, '--chunk-size', '1', stdout=out, stderr=err)
+        self.assertIn('1 updated, 0 unchanged, 1 not found, 1 invalid rows', out.getvalue())
+        self.assertIn('line 3', err.getvalue())
+        self.assertEqual(ProductVariant.objects.get(sku='PH-0-0').stock_qty, 7)
+        self.assertEqual(ProductVariant.objects.get(sku='PH-0-0').price, Decimal('1000'))
+
+    def tmp_feed(self, text):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(text)
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
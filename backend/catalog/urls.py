@@ -1,13 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import CategoryViewSet, ProductViewSet
+from .views import CategoryViewSet, ProductViewSet, variant_bulk_update
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'products', ProductViewSet, basename='product')
 
 urlpatterns = [
+    path('variants/bulk-update/', variant_bulk_update, name='variant-bulk-update'),
     path('', include(router.urls)),
 ]
 
@@ -1,27 +1,40 @@
+from collections import Counter
+
+from django.db.models import Prefetch
 from rest_framework import viewsets
-from rest_framework import filters
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from api.cache import CatalogCacheMixin
+from api.category_tree import get_category_tree
+from search.backends import rank_order, search_ids
 
-from .models import Category, Product
+from .facets import ATTRIBUTE_FACETS, get_facet_index
+from .models import Category, Product, ProductImage
 from .serializers import (
     CategorySerializer,
     ProductDetailSerializer,
     ProductListSerializer,
+    VariantBulkUpdateSerializer,
 )
+from .services import bulk_update_variants
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
     lookup_field = 'slug'
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(is_active=True).select_related(
         'brand',
         'category',
-    ).prefetch_related('variants', 'images')
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['title']
+    ).prefetch_related(
+        'variants',
+        Prefetch('images', queryset=ProductImage.objects.order_by('sort_order')),
+    )
     lookup_field = 'slug'
 
     def get_serializer_class(self):
@@ -33,12 +46,91 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         qs = super().get_queryset()
         category_slug = self.request.query_params.get('category')
         if category_slug:
-            qs = qs.filter(category__slug=category_slug)
+            # Parent category slugs include every subcategory.
+            qs = qs.filter(category_id__in=get_category_tree(Category).descendant_ids(category_slug))
         brand_slug = self.request.query_params.get('brand')
         if brand_slug:
             qs = qs.filter(brand__slug=brand_slug)
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        allowed = {'price', '-price', 'title', '-title', '-created_at'}
+        ranked = None
+        search = self.request.query_params.get('search')
+        if search:
+            ranked = search_ids('catalog', search)
+            qs = qs.filter(pk__in=ranked)
+        if self.action != 'list':
+            return qs
+
+        # Variant attribute / price filters resolve through the facet bitmaps.
+        params = self.request.query_params
+        if any(params.get(key) for key in (*ATTRIBUTE_FACETS, 'price_min', 'price_max')):
+            index = get_facet_index()
+            product_ids = index.products(index.combine(index.filter_masks(params)))
+            qs = qs.filter(pk__in=product_ids)
+
+        # Listing reads price/MRP/cover image/stock from the summary table.
+        qs = qs.prefetch_related(None).select_related('listing_summary')
+        in_stock = self.request.query_params.get('in_stock')
+        if in_stock == 'true':
+            qs = qs.filter(listing_summary__in_stock=True)
+        ordering = self.request.query_params.get('ordering')
+        if ranked is not None and not ordering:
+            return qs.order_by(rank_order(Product, ranked), 'pk')  # best match first
+        ordering = ordering or '-created_at'
+        allowed = {
+            'price': 'listing_summary__min_price',
+            '-price': '-listing_summary__min_price',
+            'title': 'title',
+            '-title': '-title',
+            '-created_at': '-created_at',
+        }
+        if ordering in ('price', '-price'):
+            # Every product has a summary row. An inner join lets the planner
+            # walk the summary price index instead of sorting every product.
+            qs = qs.filter(listing_summary__isnull=False)
         if ordering in allowed:
-            qs = qs.order_by(ordering)
+            qs = qs.order_by(allowed[ordering])
         return qs
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request):
+        """
+        Facet counts (brand, category, ram, storage, color, price buckets) for
+        the products matching the same filters as the list endpoint.
+        """
+        return self._cached_response(self._facet_counts, request)
+
+    def _facet_counts(self, request):
+        params = request.query_params
+        category_ids = None
+        if params.get('category'):
+            category_ids = get_category_tree(Category).descendant_ids(params['category'])
+        product_ids = search_ids('catalog', params['search']) if params.get('search') else None
+        index = get_facet_index()
+        masks = index.filter_masks(params, category_ids=category_ids, product_ids=product_ids)
+        return Response(
+            {
+                'count': len(index.products(index.combine(masks))),
+                'facets': index.counts(masks),
+            }
+        )
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def variant_bulk_update(request):
+    """
+    Staff-only stock/price sync: ``{"items": [{"sku", "stock_qty"?, "price"?,
+    "mrp"?}, ...]}``. Only changed variants are written; see
+    ``catalog.services.bulk_update_variants``.
+    """
+    serializer = VariantBulkUpdateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    results = list(bulk_update_variants(serializer.validated_data['items']))
+    counts = Counter(result['status'] for result in results)
+    return Response(
+        {
+            'updated': counts['updated'],
+            'unchanged': counts['unchanged'],
+            'not_found': counts['not_found'],
+            'results': results,
+        }
+    )
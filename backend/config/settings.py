@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 
 import environ
@@ -54,15 +55,19 @@ INSTALLED_APPS = [
     'catalog',
     'cart',
     'orders',
+    'search',
+    'tasks',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,6 +103,71 @@ DATABASES = {
 }
 
 
+# Cache (LocMem by default; set CACHE_URL for file/redis/memcached backends)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Worker processes (gunicorn and uvicorn read the same variable). Startup is
+# refused when it is above 1 and the default cache above is per-process.
+WEB_CONCURRENCY = env.int('WEB_CONCURRENCY', default=1)
+
+# Seconds a cached catalog response lives; catalog writes invalidate it earlier.
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=300)
+
+# Product search: 'auto' (postgres on PostgreSQL, else in-memory), 'memory',
+# 'postgres' or a dotted path to a BaseSearchBackend subclass.
+SEARCH_BACKEND = env('SEARCH_BACKEND', default='auto')
+# Search-filtered listings keep only this many best matches.
+SEARCH_MAX_RESULTS = env.int('SEARCH_MAX_RESULTS', default=1000)
+
+# Minutes a PENDING_PAYMENT order holds its stock before it is released.
+STOCK_RESERVATION_TTL_MINUTES = env.int('STOCK_RESERVATION_TTL_MINUTES', default=30)
+
+# Seconds a resolved cart's id (per user / guest session) is cached.
+CART_RESOLVE_CACHE_TIMEOUT = env.int('CART_RESOLVE_CACHE_TIMEOUT', default=300)
+
+# Sweepers (purge_stale_carts / expire_pending_orders): guest carts untouched
+# for CART_STALE_DAYS (empty ones after CART_EMPTY_STALE_DAYS) are deleted;
+# unpaid orders without a live reservation are cancelled after
+# PENDING_ORDER_TTL_HOURS.
+CART_STALE_DAYS = env.int('CART_STALE_DAYS', default=30)
+CART_EMPTY_STALE_DAYS = env.int('CART_EMPTY_STALE_DAYS', default=1)
+PENDING_ORDER_TTL_HOURS = env.int('PENDING_ORDER_TTL_HOURS', default=24)
+
+# Background tasks (tasks app, `manage.py run_worker`). Failed tasks retry with
+# exponential backoff; RUNNING tasks whose lease (renewed by their worker every
+# third of it) has expired are requeued.
+TASKS_WORKER_CONCURRENCY = env.int('TASKS_WORKER_CONCURRENCY', default=4)
+TASKS_MAX_ATTEMPTS = env.int('TASKS_MAX_ATTEMPTS', default=5)
+TASKS_RETRY_BACKOFF_SECONDS = env.int('TASKS_RETRY_BACKOFF_SECONDS', default=10)
+TASKS_RETRY_BACKOFF_MAX_SECONDS = env.int('TASKS_RETRY_BACKOFF_MAX_SECONDS', default=3600)
+TASKS_LEASE_SECONDS = env.int('TASKS_LEASE_SECONDS', default=300)
+
+# Request metrics served at /api/metrics/. Set METRICS_DIR to a directory
+# shared by the server's worker processes so a scrape sums all of them;
+# with METRICS_TOKEN set, scrapers must send "Authorization: Bearer <token>",
+# without it only staff sessions may read the endpoint.
+METRICS_DIR = env('METRICS_DIR', default=None)
+METRICS_FLUSH_SECONDS = env.float('METRICS_FLUSH_SECONDS', default=5.0)
+METRICS_TOKEN = env('METRICS_TOKEN', default=None)
+
+# Staff-only request profiler (?__profile=1, see api.profiling); reports go
+# to PROFILER_DIR, oldest pruned beyond PROFILER_MAX_REPORTS.
+PROFILER_ENABLED = env.bool('PROFILER_ENABLED', default=True)
+PROFILER_DIR = env('PROFILER_DIR', default=str(Path(tempfile.gettempdir()) / 'mobile-shop-profiles'))
+PROFILER_MAX_REPORTS = env.int('PROFILER_MAX_REPORTS', default=200)
+PROFILER_TOP_FUNCTIONS = env.int('PROFILER_TOP_FUNCTIONS', default=40)
+
+# Tracking SSE stream: one shared database poll per process per tick.
+TRACKING_STREAM_POLL_SECONDS = env.float('TRACKING_STREAM_POLL_SECONDS', default=2.0)
+TRACKING_STREAM_HEARTBEAT_SECONDS = env.float('TRACKING_STREAM_HEARTBEAT_SECONDS', default=15.0)
+TRACKING_STREAM_RETRY_MS = env.int('TRACKING_STREAM_RETRY_MS', default=5000)
+# Each poll re-reads this far back for rows that committed late (see orders.streams).
+TRACKING_STREAM_OVERLAP_SECONDS = env.float('TRACKING_STREAM_OVERLAP_SECONDS', default=30.0)
+TRACKING_STREAM_MAX_SECONDS = env.float('TRACKING_STREAM_MAX_SECONDS', default=600.0)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -156,7 +226,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberOrCursorPagination',
     'PAGE_SIZE': 20,
 }
 
@@ -0,0 +1,42 @@
+"""Hot order queries, checked by ``audit_query_plans``."""
+
+import uuid
+
+from django.utils import timezone
+
+from api.query_audit import register
+
+from .models import Order, Payment, StockReservation, TrackingEvent
+
+
+@register('orders.webhook_payment_lookup')
+def webhook_payment_lookup():
+    return Payment.objects.filter(razorpay_order_id='order_audit')[:1]
+
+
+@register('orders.latest_payment')
+def latest_payment():
+    return Payment.objects.filter(order_id=uuid.UUID(int=0)).order_by('-created_at')[:1]
+
+
+@register('orders.user_order_list')
+def user_order_list():
+    return Order.objects.filter(user_id=1).order_by('-created_at')[:20]
+
+
+@register('orders.guest_order_list')
+def guest_order_list():
+    return Order.objects.filter(cart_id=uuid.UUID(int=0)).order_by('-created_at')[:20]
+
+
+@register('orders.expired_reservations')
+def expired_reservations():
+    return StockReservation.objects.filter(
+        status=StockReservation.Status.ACTIVE,
+        expires_at__lte=timezone.now(),
+    )
+
+
+@register('orders.tracking_timeline')
+def tracking_timeline():
+    return TrackingEvent.objects.filter(shipment_id=uuid.UUID(int=0)).order_by('occurred_at')
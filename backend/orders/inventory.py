@@ -0,0 +1,231 @@
+"""
+Stock reservation at checkout.
+
+Affected variants are locked in ascending id order (so concurrent checkouts
+touching the same variants always lock them in the same order) and then
+decremented with one conditional ``UPDATE ... WHERE stock_qty >= n``. Each
+decrement is recorded as a StockReservation that is consumed when the order is
+paid or released (stock returned) when it expires unpaid.
+
+On PostgreSQL the row locks make a competing checkout wait for ours. SQLite
+ignores ``SELECT ... FOR UPDATE``: it locks the whole database for writing
+instead, and a competing writer gets ``OperationalError`` ("database is
+locked") rather than waiting, so callers there must retry. Either way the
+conditional ``UPDATE`` is what finally refuses a decrement below zero, even
+when the stock read before it has gone stale.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Value, When
+from django.utils import timezone
+
+from api.batching import delete_in_batches, iter_pk_batches
+from api.cache import bump_stock_version
+from catalog.models import ProductVariant
+from catalog.tasks import refresh_summaries
+
+from .models import Address, Order, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, variant_id, requested):
+        self.variant_id = variant_id
+        self.requested = requested
+        super().__init__(f"Insufficient stock for variant {variant_id} (requested {requested})")
+
+
+def _queue_summary_refresh(product_ids, stock_flipped=False):
+    # Listing summaries follow stock; refreshed by a background task queued in
+    # this transaction. The catalog cache version is deliberately not bumped
+    # per checkout, so cached stock figures may lag by its timeout. When a
+    # variant sold out or came back, the stock version moves on commit so the
+    # facet index re-reads its in-stock bitmap.
+    refresh_summaries.enqueue(sorted(set(product_ids)))
+    if stock_flipped:
+        transaction.on_commit(bump_stock_version)
+
+
+def reserve_stock(order: Order, lines) -> list[StockReservation]:
+    """
+    Decrement stock for ``lines`` (``(variant_id, quantity)`` pairs) and record
+    reservations for ``order``. Must run inside ``transaction.atomic``; raises
+    InsufficientStock (leaving the caller to roll back) if any variant is short.
+
+    Costs three queries whatever the number of lines: lock + read, one
+    conditional ``UPDATE`` with a ``CASE`` per variant, one reservation insert.
+    """
+    wanted = Counter()
+    for variant_id, quantity in lines:
+        wanted[variant_id] += quantity
+    variant_ids = sorted(wanted)
+
+    locked = {
+        pk: (stock_qty, product_id)
+        for pk, stock_qty, product_id in ProductVariant.objects.select_for_update()
+        .filter(pk__in=variant_ids)
+        .order_by("pk")
+        .values_list("pk", "stock_qty", "product_id")
+    }
+    for variant_id in variant_ids:
+        if variant_id not in locked or locked[variant_id][0] < wanted[variant_id]:
+            raise InsufficientStock(variant_id, wanted[variant_id])
+
+    delta = Case(
+        *[When(pk=variant_id, then=Value(wanted[variant_id])) for variant_id in variant_ids],
+        output_field=IntegerField(),
+    )
+    # Guard against a stale read where SELECT ... FOR UPDATE is a no-op (SQLite).
+    # All or nothing: if any variant is short no row is decremented, so the
+    # stock left behind still shows which one it was.
+    short = ProductVariant.objects.filter(pk__in=variant_ids, stock_qty__lt=delta)
+    updated = (
+        ProductVariant.objects.filter(pk__in=variant_ids)
+        .filter(~Exists(short))
+        .update(stock_qty=F("stock_qty") - delta)
+    )
+    if updated != len(variant_ids):
+        remaining = set(ProductVariant.objects.filter(pk__in=variant_ids).values_list("pk", flat=True))
+        remaining -= set(short.values_list("pk", flat=True))
+        variant_id = next((pk for pk in variant_ids if pk not in remaining), variant_ids[0])
+        raise InsufficientStock(variant_id, wanted[variant_id])
+
+    expires_at = timezone.now() + timedelta(minutes=settings.STOCK_RESERVATION_TTL_MINUTES)
+    reservations = StockReservation.objects.bulk_create(
+        [
+            StockReservation(
+                order=order,
+                product_variant_id=variant_id,
+                quantity=wanted[variant_id],
+                expires_at=expires_at,
+            )
+            for variant_id in variant_ids
+        ]
+    )
+    sold_out = any(locked[variant_id][0] == wanted[variant_id] for variant_id in variant_ids)
+    _queue_summary_refresh((product_id for _, product_id in locked.values()), stock_flipped=sold_out)
+    return reservations
+
+
+def consume_reservations(order: Order) -> int:
+    """Mark an order's active reservations as consumed once it is paid."""
+    return StockReservation.objects.filter(
+        order=order,
+        status=StockReservation.Status.ACTIVE,
+    ).update(status=StockReservation.Status.CONSUMED, updated_at=timezone.now())
+
+
+def release_reservations(reservation_ids) -> int:
+    """Return stock for the given active reservations. Runs in its own transaction."""
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update()
+            .filter(pk__in=list(reservation_ids), status=StockReservation.Status.ACTIVE)
+            .order_by("product_variant_id", "pk")
+        )
+        if not reservations:
+            return 0
+
+        returned = Counter()
+        for reservation in reservations:
+            returned[reservation.product_variant_id] += reservation.quantity
+        restock = Case(
+            *[When(pk=variant_id, then=Value(returned[variant_id])) for variant_id in sorted(returned)],
+            output_field=IntegerField(),
+        )
+        ProductVariant.objects.filter(pk__in=sorted(returned)).update(stock_qty=F("stock_qty") + restock)
+
+        StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(
+            status=StockReservation.Status.RELEASED,
+            updated_at=timezone.now(),
+        )
+        # Returned stock may put a sold-out variant back on sale.
+        _queue_summary_refresh(
+            ProductVariant.objects.filter(pk__in=list(returned)).values_list("product_id", flat=True),
+            stock_flipped=True,
+        )
+    return len(reservations)
+
+
+def release_expired_reservations(batch_size: int = 500, now=None) -> tuple[int, int]:
+    """
+    Cancel PENDING_PAYMENT orders whose reservations have expired and return
+    their stock, ``batch_size`` orders per transaction.
+
+    Returns ``(orders_cancelled, reservations_released)``.
+    """
+    now = now or timezone.now()
+    cancelled = released = 0
+    while True:
+        order_ids = list(
+            StockReservation.objects.filter(
+                status=StockReservation.Status.ACTIVE,
+                expires_at__lte=now,
+                order__status=Order.Status.PENDING_PAYMENT,
+            )
+            .values_list("order_id", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not order_ids:
+            break
+        with transaction.atomic():
+            # Lock the orders so a payment landing concurrently wins or waits.
+            locked = list(
+                Order.objects.select_for_update()
+                .filter(pk__in=order_ids, status=Order.Status.PENDING_PAYMENT)
+                .values_list("pk", flat=True)
+            )
+            cancelled += Order.objects.filter(pk__in=locked).update(
+                status=Order.Status.CANCELLED,
+                updated_at=now,
+            )
+            reservation_ids = StockReservation.objects.filter(
+                order_id__in=locked,
+                status=StockReservation.Status.ACTIVE,
+            ).values_list("pk", flat=True)
+            released += release_reservations(reservation_ids)
+    return cancelled, released
+
+
+def expire_pending_orders(batch_size: int = 500, now=None, ttl_hours: int | None = None) -> tuple[int, int]:
+    """
+    Release expired reservations (see above), then cancel PENDING_PAYMENT
+    orders older than ``ttl_hours`` that hold no active reservation (e.g. ones
+    placed before reservations existed).
+
+    Returns ``(orders_cancelled, reservations_released)``.
+    """
+    now = now or timezone.now()
+    ttl_hours = settings.PENDING_ORDER_TTL_HOURS if ttl_hours is None else ttl_hours
+    cancelled, released = release_expired_reservations(batch_size=batch_size, now=now)
+
+    holds_stock = Exists(
+        StockReservation.objects.filter(order=OuterRef("pk"), status=StockReservation.Status.ACTIVE)
+    )
+    stale = Order.objects.filter(
+        status=Order.Status.PENDING_PAYMENT,
+        created_at__lt=now - timedelta(hours=ttl_hours),
+    ).filter(~holds_stock)
+    for order_ids in iter_pk_batches(stale, batch_size):
+        with transaction.atomic():
+            locked = list(
+                stale.select_for_update().filter(pk__in=order_ids).values_list("pk", flat=True)
+            )
+            cancelled += Order.objects.filter(pk__in=locked).update(
+                status=Order.Status.CANCELLED,
+                updated_at=now,
+            )
+    return cancelled, released
+
+
+def purge_orphan_addresses(batch_size: int = 1000, now=None, older_than_days: int = 1, on_batch=None):
+    """Delete guest addresses no order points at (any more), in pk-range batches."""
+    now = now or timezone.now()
+    orphans = Address.objects.filter(
+        user__isnull=True,
+        created_at__lt=now - timedelta(days=older_than_days),
+    ).filter(~Exists(Order.objects.filter(shipping_address=OuterRef("pk"))))
+    return delete_in_batches(orphans, batch_size, on_batch=on_batch)
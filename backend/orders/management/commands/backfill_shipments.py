@@ -0,0 +1,46 @@
+"""Create the missing shipments of orders placed before shipments existed."""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.batching import BatchStats, iter_pk_batches
+from orders.models import Order, create_default_shipments
+
+
+class Command(BaseCommand):
+    help = "Create shipments (with their seed tracking events) for orders that have none, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status",
+            action="append",
+            choices=Order.Status.values,
+            help="Order status to backfill; repeatable (default: PAID)",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        statuses = options["status"] or [Order.Status.PAID]
+        missing = Order.objects.filter(status__in=statuses, shipment__isnull=True)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{missing.count()} orders without a shipment")
+            return
+
+        stats = BatchStats()
+        for pks in iter_pk_batches(missing, options["batch_size"]):
+            with transaction.atomic():
+                stats.rows += create_default_shipments(missing.filter(pk__in=pks))
+            stats.batches += 1
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        summary = stats.as_dict()
+        self.stdout.write(
+            f"{summary['rows']} shipments created in {summary['batches']} batches ({summary['seconds']}s)"
+        )
+        self.stdout.write(self.style.SUCCESS("Done!"))
@@ -0,0 +1,28 @@
+"""Cancel abandoned unpaid orders and clean up addresses nothing points at."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.inventory import expire_pending_orders, purge_orphan_addresses
+
+
+class Command(BaseCommand):
+    help = "Cancel PENDING_PAYMENT orders past their reservation or --hours TTL and purge orphan addresses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=settings.PENDING_ORDER_TTL_HOURS)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--skip-addresses", action="store_true")
+
+    def handle(self, *args, **options):
+        cancelled, released = expire_pending_orders(
+            batch_size=options["batch_size"],
+            ttl_hours=options["hours"],
+        )
+        self.stdout.write(f"{cancelled} orders cancelled, {released} reservations released")
+
+        if not options["skip_addresses"]:
+            stats = purge_orphan_addresses(batch_size=options["batch_size"]).as_dict()
+            self.stdout.write(f"{stats['rows']} orphan addresses deleted in {stats['batches']} batches")
+
+        self.stdout.write(self.style.SUCCESS("Done!"))
@@ -0,0 +1,18 @@
+"""Cancel unpaid orders whose stock reservations expired and return the stock."""
+
+from django.core.management.base import BaseCommand
+
+from orders.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Release stock held by PENDING_PAYMENT orders past their reservation TTL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        cancelled, released = release_expired_reservations(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Done! {cancelled} orders cancelled, {released} reservations released")
+        )
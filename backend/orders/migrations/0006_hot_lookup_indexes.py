@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['razorpay_order_id'], name='orders_payment_rzp_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['order', '-created_at'], name='orders_payment_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trackingevent',
+            index=models.Index(fields=['shipment', 'occurred_at'], name='orders_event_timeline_idx'),
+        ),
+    ]
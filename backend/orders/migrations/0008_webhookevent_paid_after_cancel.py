@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webhookevent',
+            name='status',
+            field=models.CharField(choices=[('RECEIVED', 'Received'), ('PROCESSED', 'Processed'), ('IGNORED', 'Ignored'), ('PAID_AFTER_CANCEL', 'Paid after cancel'), ('FAILED', 'Failed')], default='RECEIVED', max_length=32),
+        ),
+    ]
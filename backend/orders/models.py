@@ -31,6 +31,24 @@ class Address(models.Model):
         return f"{self.full_name} - {self.city}"
 
 
+class OrderQuerySet(models.QuerySet):
+    def for_display(self):
+        """
+        Everything OrderSerializer renders in a fixed number of queries: the
+        latest payment status as an annotation, address and shipment joined,
+        items (with variants) and tracking events prefetched.
+        """
+        latest_payment = Payment.objects.filter(order=models.OuterRef("pk")).order_by("-created_at", "-pk")
+        return (
+            self.annotate(latest_payment_status=models.Subquery(latest_payment.values("status")[:1]))
+            .select_related("shipping_address", "shipment")
+            .prefetch_related(
+                models.Prefetch("items", OrderItem.objects.select_related("product_variant").order_by("pk")),
+                models.Prefetch("shipment__events", TrackingEvent.objects.order_by("occurred_at", "pk")),
+            )
+        )
+
+
 class Order(models.Model):
     class Status(models.TextChoices):
         PENDING_PAYMENT = "PENDING_PAYMENT", "Pending payment"
@@ -69,6 +87,15 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        # Order listing (and its keyset pagination) per user / guest cart.
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="orders_order_user_keyset_idx"),
+            models.Index(fields=["cart", "created_at", "id"], name="orders_order_cart_keyset_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Order {self.id}"
 
@@ -97,6 +124,47 @@ class OrderItem(models.Model):
         return f"{self.product_variant.sku} x {self.quantity}"
 
 
+class StockReservation(models.Model):
+    """Stock held for a pending order; released back if payment never arrives."""
+
+    class Status(models.TextChoices):
+        ACTIVE = "ACTIVE", "Active"
+        CONSUMED = "CONSUMED", "Consumed"
+        RELEASED = "RELEASED", "Released"
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+    )
+    product_variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.PROTECT,
+        related_name="reservations",
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.ACTIVE,
+    )
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(status="ACTIVE"),
+                name="orders_reservation_active_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.quantity} x {self.product_variant_id} for order {self.order_id} ({self.status})"
+
+
 class Payment(models.Model):
     class Status(models.TextChoices):
         CREATED = "CREATED", "Created"
@@ -120,10 +188,56 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Webhook lookup by gateway order id.
+            models.Index(fields=["razorpay_order_id"], name="orders_payment_rzp_order_idx"),
+            # Latest payment per order (OrderQuerySet.for_display).
+            models.Index(fields=["order", "-created_at"], name="orders_payment_latest_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Payment {self.id} ({self.status})"
 
 
+class WebhookEvent(models.Model):
+    """Ledger of gateway webhook deliveries; one row per (gateway, event id)."""
+
+    class Status(models.TextChoices):
+        RECEIVED = "RECEIVED", "Received"
+        PROCESSED = "PROCESSED", "Processed"
+        IGNORED = "IGNORED", "Ignored"
+        # Captured for an order already cancelled (e.g. its stock hold
+        # expired): the order stays cancelled and the payment needs a refund.
+        PAID_AFTER_CANCEL = "PAID_AFTER_CANCEL", "Paid after cancel"
+        FAILED = "FAILED", "Failed"
+
+    # Outcomes that are final: a redelivery of the event is a duplicate.
+    SETTLED_STATUSES = (Status.PROCESSED, Status.IGNORED, Status.PAID_AFTER_CANCEL)
+
+    gateway = models.CharField(max_length=20, default="razorpay")
+    event_id = models.CharField(max_length=128)
+    event_type = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=32,
+        choices=Status.choices,
+        default=Status.RECEIVED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["gateway", "event_id"], name="orders_webhook_event_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.gateway} {self.event_type} {self.event_id} ({self.status})"
+
+
 class Shipment(models.Model):
     class Status(models.TextChoices):
         CREATED = "CREATED", "Created"
@@ -168,43 +282,78 @@ class TrackingEvent(models.Model):
 
     class Meta:
         ordering = ["occurred_at"]
+        indexes = [
+            models.Index(fields=["shipment", "occurred_at"], name="orders_event_timeline_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.status} @ {self.occurred_at}"
 
 
-def create_default_shipment_for_order(order: Order) -> Shipment:
-    """Auto-create a Shipment + seed tracking events when order is paid."""
+def _default_shipment(order: Order) -> Shipment:
     from datetime import date, timedelta
 
-    est = date.today() + timedelta(days=3)
+    return Shipment(
+        order=order,
+        status=(
+            Shipment.Status.PAID
+            if order.status == Order.Status.PAID
+            else Shipment.Status.CREATED
+        ),
+        estimated_delivery_date=date.today() + timedelta(days=3),
+    )
+
+
+def _seed_events(shipment: Shipment, order: Order) -> list:
+    return [
+        TrackingEvent(
+            shipment=shipment,
+            status="ORDER_PLACED",
+            description="Order placed",
+            occurred_at=order.created_at,
+        ),
+        TrackingEvent(
+            shipment=shipment,
+            status="PAYMENT_CONFIRMED",
+            description="Payment confirmed",
+            occurred_at=order.updated_at,
+        ),
+    ]
+
+
+def create_default_shipment_for_order(order: Order) -> Shipment:
+    """Auto-create a Shipment + seed tracking events when order is paid."""
+    default = _default_shipment(order)
     shipment, _ = Shipment.objects.get_or_create(
         order=order,
         defaults={
-            "status": (
-                Shipment.Status.PAID
-                if order.status == Order.Status.PAID
-                else Shipment.Status.CREATED
-            ),
-            "estimated_delivery_date": est,
+            "status": default.status,
+            "estimated_delivery_date": default.estimated_delivery_date,
         },
     )
     if not shipment.events.exists():
-        TrackingEvent.objects.bulk_create(
-            [
-                TrackingEvent(
-                    shipment=shipment,
-                    status="ORDER_PLACED",
-                    description="Order placed",
-                    occurred_at=order.created_at,
-                ),
-                TrackingEvent(
-                    shipment=shipment,
-                    status="PAYMENT_CONFIRMED",
-                    description="Payment confirmed",
-                    occurred_at=order.updated_at,
-                ),
-            ]
-        )
+        TrackingEvent.objects.bulk_create(_seed_events(shipment, order))
     return shipment
 
+
+def create_default_shipments(orders) -> int:
+    """
+    Batch version of ``create_default_shipment_for_order``: a constant number
+    of queries for any number of orders. Orders that already have a shipment
+    are skipped; returns how many shipments were created.
+    """
+    orders = {order.pk: order for order in orders}
+    if not orders:
+        return 0
+    Shipment.objects.bulk_create(
+        [_default_shipment(order) for order in orders.values()],
+        ignore_conflicts=True,
+    )
+    # Only shipments without events: the new ones, never a concurrent writer's.
+    fresh = list(
+        Shipment.objects.filter(order_id__in=orders, events__isnull=True)
+    )
+    TrackingEvent.objects.bulk_create(
+        [event for shipment in fresh for event in _seed_events(shipment, orders[shipment.order_id])]
+    )
+    return len(fresh)
@@ -1,10 +1,12 @@
 from decimal import Decimal
 
+from django.db import transaction
 from rest_framework import serializers
 
-from cart.models import Cart
+from cart.models import Cart, CartItem
 from cart.serializers import CartItemSerializer, ProductVariantMiniSerializer
 
+from .inventory import InsufficientStock, reserve_stock
 from .models import Address, Order, OrderItem, Shipment, TrackingEvent
 
 
@@ -73,7 +75,9 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
 
     def get_payment_status(self, obj):
-        payment = obj.payments.order_by('-created_at').first()
+        if hasattr(obj, 'latest_payment_status'):
+            return obj.latest_payment_status
+        payment = obj.payments.order_by('-created_at', '-pk').first()
         return payment.status if payment else None
 
 
@@ -100,45 +104,66 @@ class CheckoutSerializer(serializers.Serializer):
     phone = serializers.CharField(max_length=32, required=False, allow_blank=True)
 
     def validate(self, attrs):
-        request = self.context.get('request')
-        cart: Cart | None = self.context.get('cart')
-        if not cart or cart.items.count() == 0:
+        if not self.context.get('cart'):
             raise serializers.ValidationError('Cart is empty.')
         return attrs
 
     def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return self._create_order(validated_data)
+        except InsufficientStock as exc:
+            raise serializers.ValidationError(
+                {'detail': 'Insufficient stock.', 'product_variant_id': exc.variant_id}
+            )
+
+    def _create_order(self, validated_data):
+        """
+        Build the order from one locked snapshot of the cart. The query count
+        does not grow with the number of cart lines.
+        """
         request = self.context['request']
         cart: Cart = self.context['cart']
-
-        address = Address.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            **validated_data,
+        user = request.user if request.user.is_authenticated else None
+
+        # Lock the cart lines (not their variants; reserve_stock locks those in
+        # id order) so concurrent edits wait for this checkout to finish.
+        lines = list(
+            CartItem.objects.select_for_update(of=('self',))
+            .filter(cart=cart)
+            .select_related('product_variant')
+            .order_by('pk')
         )
+        if not lines:
+            raise serializers.ValidationError('Cart is empty.')
 
-        subtotal: Decimal = cart.subtotal
+        subtotal = sum((line.quantity * line.price_snapshot for line in lines), Decimal('0.00'))
+        address = Address.objects.create(user=user, **validated_data)
         order = Order.objects.create(
-            user=request.user if request.user.is_authenticated else None,
+            user=user,
             cart=cart,
             subtotal=subtotal,
             currency='INR',
             shipping_address=address,
         )
-
-        items = []
-        for item in cart.items.all():
-            items.append(
+        OrderItem.objects.bulk_create(
+            [
                 OrderItem(
                     order=order,
-                    product_variant=item.product_variant,
-                    quantity=item.quantity,
-                    price_snapshot=item.price_snapshot,
-                    mrp_snapshot=item.mrp_snapshot,
+                    product_variant=line.product_variant,
+                    quantity=line.quantity,
+                    price_snapshot=line.price_snapshot,
+                    mrp_snapshot=line.mrp_snapshot,
                 )
-            )
-        OrderItem.objects.bulk_create(items)
+                for line in lines
+            ]
+        )
 
-        # Simple strategy: keep cart but clear items after checkout
-        cart.items.all().delete()
+        # Decrement stock (row locks in variant id order); rolls back on shortage
+        reserve_stock(order, [(line.product_variant_id, line.quantity) for line in lines])
 
-        return order
+        # Keep the cart but clear the lines that were checked out; anything added
+        # after the snapshot was taken stays in the cart.
+        CartItem.objects.filter(pk__in=[line.pk for line in lines]).delete()
 
+        return order
@@ -0,0 +1,151 @@
+"""
+Server-sent events for shipment tracking.
+
+One ``TrackingNotifier`` per process watches the database for new tracking
+events and shipment status changes of the orders that currently have
+subscribers, with a single pair of indexed queries per tick however many
+clients are connected, and fans each change out to those clients' queues.
+Writers (the task worker, the admin) live in other processes, so the
+notifier polls rather than relying on in-process signals.
+
+Rows do not commit in id or timestamp order, so each poll also looks back
+``TRACKING_STREAM_OVERLAP_SECONDS`` and skips the rows it already sent: an
+event whose transaction commits after a later one is still delivered.
+"""
+
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Shipment, TrackingEvent
+
+# Slow clients drop the oldest message rather than grow without bound.
+QUEUE_SIZE = 100
+
+
+def tracking_event_data(event: TrackingEvent) -> dict:
+    return {
+        "status": event.status,
+        "description": event.description,
+        "location": event.location,
+        "occurred_at": event.occurred_at.isoformat(),
+    }
+
+
+def shipment_data(shipment: Shipment) -> dict:
+    return {
+        "status": shipment.status,
+        "carrier": shipment.carrier,
+        "tracking_number": shipment.tracking_number,
+        "estimated_delivery_date": (
+            shipment.estimated_delivery_date.isoformat() if shipment.estimated_delivery_date else None
+        ),
+    }
+
+
+def events_after(order_id, last_event_id: int) -> list[tuple[str, int | None, dict]]:
+    """Replay for a reconnecting client (``Last-Event-ID``)."""
+    events = TrackingEvent.objects.filter(shipment__order_id=order_id, pk__gt=last_event_id).order_by("pk")
+    return [("tracking_event", event.pk, tracking_event_data(event)) for event in events]
+
+
+class TrackingNotifier:
+    def __init__(self, interval: float | None = None):
+        self.interval = interval
+        self.subscribers = defaultdict(set)
+        self._task = None
+        self._started = None
+        self._last_event_id = 0
+        self._since = None
+        self._sent_events = {}  # pk -> created_at, within the overlap window
+        self._sent_shipments = {}  # pk -> updated_at, within the overlap window
+
+    @asynccontextmanager
+    async def subscribe(self, order_id):
+        """Yield a queue of ``(event, id, data)`` messages for one order."""
+        order_id = str(order_id)
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers[order_id].add(queue)
+        try:
+            await self._ensure_running()
+            yield queue
+        finally:
+            self.subscribers[order_id].discard(queue)
+            if not self.subscribers[order_id]:
+                del self.subscribers[order_id]
+
+    async def _ensure_running(self):
+        if self._task is None or self._task.done():
+            # Created before any await, so concurrent subscribers share one poller.
+            self._started = asyncio.get_running_loop().create_future()
+            self._task = asyncio.create_task(self._run())
+        await asyncio.shield(self._started)
+
+    def _start_from_now(self):
+        """Clients fetch the current state from the JSON endpoint; send only what follows."""
+        now = timezone.now()
+        look_back = now - timedelta(seconds=settings.TRACKING_STREAM_OVERLAP_SECONDS)
+        self._last_event_id = TrackingEvent.objects.aggregate(last=Max("pk"))["last"] or 0
+        self._since = now
+        # Rows already visible count as sent; later polls look back past them.
+        self._sent_events = dict(TrackingEvent.objects.filter(created_at__gt=look_back).values_list("pk", "created_at"))
+        self._sent_shipments = dict(Shipment.objects.filter(updated_at__gt=look_back).values_list("pk", "updated_at"))
+
+    async def _run(self):
+        try:
+            await sync_to_async(self._start_from_now)()
+        except Exception as exc:
+            self._started.set_exception(exc)
+            return
+        self._started.set_result(None)
+        interval = self.interval or settings.TRACKING_STREAM_POLL_SECONDS
+        while self.subscribers:
+            await asyncio.sleep(interval)
+            order_ids = list(self.subscribers)
+            if order_ids:
+                for order_id, message in await sync_to_async(self.poll)(order_ids):
+                    self.publish(order_id, message)
+
+    def poll(self, order_ids) -> list[tuple[str, tuple]]:
+        """Changes since the previous tick for ``order_ids``; advances the cursor."""
+        now = timezone.now()
+        look_back = self._since - timedelta(seconds=settings.TRACKING_STREAM_OVERLAP_SECONDS)
+        changes = []
+        shipments = Shipment.objects.filter(order_id__in=order_ids, updated_at__gt=look_back)
+        for shipment in shipments:
+            if self._sent_shipments.get(shipment.pk) == shipment.updated_at:
+                continue
+            self._sent_shipments[shipment.pk] = shipment.updated_at
+            changes.append((str(shipment.order_id), ("shipment", None, shipment_data(shipment))))
+        events = (
+            TrackingEvent.objects.filter(shipment__order_id__in=order_ids)
+            .filter(Q(pk__gt=self._last_event_id) | Q(created_at__gt=look_back))
+            .select_related("shipment")
+            .order_by("pk")
+        )
+        for event in events:
+            if event.pk in self._sent_events:
+                continue
+            self._sent_events[event.pk] = event.created_at
+            changes.append((str(event.shipment.order_id), ("tracking_event", event.pk, tracking_event_data(event))))
+            self._last_event_id = max(self._last_event_id, event.pk)
+        self._since = now
+        # Rows older than the next look-back can no longer be fetched twice.
+        self._sent_events = {pk: at for pk, at in self._sent_events.items() if at > look_back}
+        self._sent_shipments = {pk: at for pk, at in self._sent_shipments.items() if at > look_back}
+        return changes
+
+    def publish(self, order_id: str, message: tuple) -> None:
+        for queue in self.subscribers.get(order_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+notifier = TrackingNotifier()
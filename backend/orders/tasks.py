@@ -0,0 +1,17 @@
+"""Background side effects of order events (run by ``manage.py run_worker``)."""
+
+from tasks.registry import task
+
+from .models import Order, create_default_shipment_for_order
+
+
+@task
+def create_shipment(order_id: str) -> None:
+    """Seed the shipment and its first tracking events for a paid order."""
+    order = Order.objects.filter(pk=order_id).first()
+    if order is not None:
+        create_default_shipment_for_order(order)
+
+
+def enqueue_shipment(order_id) -> None:
+    create_shipment.enqueue(str(order_id), dedupe_key=f"shipment:{order_id}")
@@ -1,3 +1,557 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import io
+import json
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.cache import get_catalog_version
+from cart.models import Cart, CartItem
+from catalog import facets
+from catalog.models import Brand, Category, Product, ProductVariant
+
+from .inventory import InsufficientStock, expire_pending_orders, release_expired_reservations, reserve_stock
+from tasks.models import Task
+from tasks.worker import run_pending
+
+from . import streams
+from .models import (
+    Order,
+    OrderItem,
+    Payment,
+    Shipment,
+    StockReservation,
+    TrackingEvent,
+    WebhookEvent,
+    create_default_shipment_for_order,
+)
+from .serializers import CheckoutSerializer
+
+CHECKOUT_PAYLOAD = {
+    'full_name': 'Test Buyer',
+    'line1': '1 MG Road',
+    'city': 'Chennai',
+    'state': 'TN',
+    'postal_code': '600001',
+}
+
+
+def make_variant(stock_qty, sku='SKU-1', price='1000.00'):
+    brand, _ = Brand.objects.get_or_create(slug='acme', defaults={'name': 'Acme'})
+    category, _ = Category.objects.get_or_create(slug='phones', defaults={'name': 'Phones'})
+    product = Product.objects.create(title=f'Phone {sku}', slug=sku.lower(), brand=brand, category=category)
+    return ProductVariant.objects.create(product=product, sku=sku, price=Decimal(price), stock_qty=stock_qty)
+
+
+def make_cart(session_id, variant, quantity=1):
+    cart = Cart.objects.create(cart_session_id=session_id)
+    CartItem.objects.create(cart=cart, product_variant=variant, quantity=quantity, price_snapshot=variant.price)
+    return cart
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()  # resolved carts are cached per session
+
+    def test_checkout_decrements_stock_and_reserves(self):
+        variant = make_variant(stock_qty=3)
+        make_cart('guest-1', variant, quantity=2)
+        response = self.client.post(
+            '/api/orders/checkout/', CHECKOUT_PAYLOAD, content_type='application/json', HTTP_X_CART_SESSION='guest-1'
+        )
+        self.assertEqual(response.status_code, 201)
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_qty, 1)
+        reservation = StockReservation.objects.get()
+        self.assertEqual(reservation.quantity, 2)
+        self.assertEqual(reservation.status, StockReservation.Status.ACTIVE)
+
+    def test_checkout_rejects_oversell_and_rolls_back(self):
+        variant = make_variant(stock_qty=1)
+        cart = make_cart('guest-1', variant, quantity=2)
+        response = self.client.post(
+            '/api/orders/checkout/', CHECKOUT_PAYLOAD, content_type='application/json', HTTP_X_CART_SESSION='guest-1'
+        )
+        self.assertEqual(response.status_code, 400)
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_qty, 1)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(cart.items.count(), 1)
+
+    def test_expired_reservations_release_stock(self):
+        variant = make_variant(stock_qty=2)
+        make_cart('guest-1', variant, quantity=2)
+        self.client.post(
+            '/api/orders/checkout/', CHECKOUT_PAYLOAD, content_type='application/json', HTTP_X_CART_SESSION='guest-1'
+        )
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(release_expired_reservations(), (1, 1))
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_qty, 2)
+        self.assertEqual(Order.objects.get().status, Order.Status.CANCELLED)
+        self.assertEqual(release_expired_reservations(), (0, 0))
+
+    def test_selling_out_and_releasing_refresh_the_in_stock_facet(self):
+        variant = make_variant(stock_qty=2)
+        make_cart('guest-1', variant, quantity=2)
+        index = facets.get_facet_index()
+        position = index.variant_positions[variant.pk]
+        self.assertTrue(index.in_stock >> position & 1)
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/orders/checkout/', CHECKOUT_PAYLOAD, content_type='application/json', HTTP_X_CART_SESSION='guest-1'
+            )
+        self.assertEqual(get_catalog_version(), version)  # no full rebuild
+        self.assertIs(facets.get_facet_index(), index)
+        self.assertFalse(index.in_stock >> position & 1)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            release_expired_reservations()
+        self.assertTrue(facets.get_facet_index().in_stock >> position & 1)
+
+    def test_stale_orders_without_reservations_expire(self):
+        old = Order.objects.create(subtotal=Decimal('10.00'))
+        recent = Order.objects.create(subtotal=Decimal('10.00'))
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(hours=30))
+
+        self.assertEqual(expire_pending_orders(batch_size=1), (1, 0))
+        old.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(old.status, Order.Status.CANCELLED)
+        self.assertEqual(recent.status, Order.Status.PENDING_PAYMENT)
+
+
+class CheckoutQueryTests(TestCase):
+    """Checkout cost must not grow with the number of cart lines."""
+
+    def checkout_queries(self, session_id, line_count):
+        cart = Cart.objects.create(cart_session_id=session_id)
+        for position in range(line_count):
+            variant = make_variant(stock_qty=5, sku=f'{session_id}-{position}')
+            CartItem.objects.create(cart=cart, product_variant=variant, quantity=2, price_snapshot=variant.price)
+        request = RequestFactory().post('/api/orders/checkout/')
+        request.user = AnonymousUser()
+        serializer = CheckoutSerializer(data=CHECKOUT_PAYLOAD, context={'request': request, 'cart': cart})
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as queries:
+            order = serializer.save()
+        self.assertEqual(order.items.count(), line_count)
+        self.assertEqual(order.subtotal, Decimal('2000.00') * line_count)
+        self.assertFalse(cart.items.exists())
+        return len(queries)
+
+    def test_query_count_is_constant(self):
+        self.assertEqual(self.checkout_queries('small', 1), self.checkout_queries('large', 8))
+
+
+class OrderListQueryTests(TestCase):
+    """/api/orders/ must cost the same number of queries however many orders a page holds."""
+
+    def place_orders(self, session_id, count):
+        cart = Cart.objects.create(cart_session_id=session_id)
+        for index in range(count):
+            variant = make_variant(stock_qty=5, sku=f'{session_id}-{index}')
+            order = Order.objects.create(cart=cart, subtotal=variant.price)
+            OrderItem.objects.create(order=order, product_variant=variant, quantity=1, price_snapshot=variant.price)
+            failed = Payment.objects.create(order=order, amount=variant.price, status=Payment.Status.FAILED)
+            Payment.objects.filter(pk=failed.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+            Payment.objects.create(order=order, amount=variant.price, status=Payment.Status.PAID)
+            create_default_shipment_for_order(order)
+
+    def list_orders(self, session_id):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/orders/', HTTP_X_CART_SESSION=session_id)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_query_count_is_fixed_per_page(self):
+        self.place_orders('one', 1)
+        self.place_orders('many', 6)
+        one, one_queries = self.list_orders('one')
+        many, many_queries = self.list_orders('many')
+
+        self.assertEqual(one_queries, many_queries)
+        self.assertEqual(len(many['results']), 6)
+        order = many['results'][0]
+        self.assertEqual(order['payment_status'], Payment.Status.PAID)
+        self.assertEqual(len(order['items']), 1)
+        events = order['shipment']['events']
+        self.assertTrue(events)
+        self.assertEqual(events, sorted(events, key=lambda event: event['occurred_at']))
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET='whsec')
+class RazorpayWebhookTests(TestCase):
+    def setUp(self):
+        variant = make_variant(stock_qty=5)
+        self.order = Order.objects.create(subtotal=variant.price)
+        self.payment = Payment.objects.create(order=self.order, amount=variant.price, razorpay_order_id='order_rzp1')
+
+    def deliver(self, event_id='evt_1', event='payment.captured'):
+        body = json.dumps(
+            {'event': event, 'payload': {'payment': {'entity': {'id': 'pay_1', 'order_id': 'order_rzp1'}}}}
+        ).encode()
+        signature = hmac.new(b'whsec', body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            '/api/orders/razorpay/webhook/',
+            body,
+            content_type='application/json',
+            HTTP_X_RAZORPAY_SIGNATURE=signature,
+            HTTP_X_RAZORPAY_EVENT_ID=event_id,
+        )
+
+    def test_event_is_processed_once_and_shipment_is_deferred(self):
+        response = self.deliver()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Shipment.objects.exists())
+        self.assertEqual(run_pending(), {Task.Status.SUCCEEDED: 1})
+        self.assertTrue(Shipment.objects.filter(order=self.order).exists())
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.PAID)
+        self.assertEqual(self.payment.razorpay_payment_id, 'pay_1')
+        self.assertEqual(self.order.status, Order.Status.PAID)
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.Status.PROCESSED)
+
+        with self.assertNumQueries(1):
+            response = self.deliver()
+        self.assertTrue(response.json()['duplicate'])
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_capture_after_the_sweeper_cancelled_the_order(self):
+        variant = ProductVariant.objects.get()
+        with transaction.atomic():
+            reserve_stock(self.order, [(variant.pk, 2)])
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(release_expired_reservations(), (1, 1))
+
+        response = self.deliver()
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.payment.refresh_from_db()
+        variant.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.CANCELLED)
+        self.assertEqual(self.payment.status, Payment.Status.PAID)
+        self.assertEqual(self.payment.razorpay_payment_id, 'pay_1')
+        self.assertEqual(variant.stock_qty, 5)
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.Status.RELEASED)
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.Status.PAID_AFTER_CANCEL)
+        run_pending()
+        self.assertFalse(Shipment.objects.exists())
+
+        # Settled: a redelivery is a duplicate.
+        self.assertTrue(self.deliver().json()['duplicate'])
+
+    def test_unknown_events_are_recorded_and_ignored(self):
+        response = self.deliver(event_id='evt_2', event='refund.created')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.Status.IGNORED)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.Status.CREATED)
+
+
+class OrderTrackingTests(TestCase):
+    def setUp(self):
+        variant = make_variant(stock_qty=5)
+        self.order = Order.objects.create(subtotal=variant.price, status=Order.Status.PAID)
+        self.url = f'/api/orders/{self.order.pk}/tracking/'
+
+    def test_tracking_never_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['shipment'])
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries))
+        self.assertFalse(Shipment.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_unchanged_tracking_answers_304(self):
+        create_default_shipment_for_order(self.order)
+        with self.assertNumQueries(2):
+            first = self.client.get(self.url)
+        self.assertEqual(len(first.json()['shipment']['events']), 2)
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        TrackingEvent.objects.create(
+            shipment=self.order.shipment, status='PACKED', description='Packed', occurred_at=timezone.now()
+        )
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_backfill_creates_missing_shipments_in_batches(self):
+        pending = Order.objects.create(subtotal=Decimal('10.00'))
+        for _ in range(4):
+            Order.objects.create(subtotal=Decimal('10.00'), status=Order.Status.PAID)
+        create_default_shipment_for_order(self.order)
+
+        call_command('backfill_shipments', batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(Shipment.objects.count(), 5)
+        self.assertFalse(Shipment.objects.filter(order=pending).exists())
+        self.assertEqual(TrackingEvent.objects.count(), 10)
+
+        call_command('backfill_shipments', status=[Order.Status.PENDING_PAYMENT], stdout=io.StringIO())
+        self.assertEqual(Shipment.objects.get(order=pending).status, Shipment.Status.CREATED)
+
+
+class TrackingStreamTests(TestCase):
+    def setUp(self):
+        variant = make_variant(stock_qty=5)
+        self.order = Order.objects.create(subtotal=variant.price, status=Order.Status.PAID)
+        self.shipment = create_default_shipment_for_order(self.order)
+
+    def add_event(self, status='PACKED'):
+        return TrackingEvent.objects.create(
+            shipment=self.shipment, status=status, description=status.title(), occurred_at=timezone.now()
+        )
+
+    @override_settings(TRACKING_STREAM_MAX_SECONDS=0.5, TRACKING_STREAM_HEARTBEAT_SECONDS=0.2)
+    async def test_stream_pushes_new_events(self):
+        notifier = streams.TrackingNotifier(interval=0.01)
+        with mock.patch.object(streams, 'notifier', notifier):
+            response = await self.async_client.get(f'/api/orders/{self.order.pk}/tracking/stream/')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            chunks = aiter(response.streaming_content)
+            self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+
+            event = await sync_to_async(self.add_event)()
+            rest = b''.join([chunk async for chunk in chunks]).decode()
+
+        self.assertIn(f'event: tracking_event\nid: {event.pk}\n', rest)
+        self.assertIn('"status": "PACKED"', rest)
+        self.assertIn(': keepalive', rest)
+        self.assertEqual(notifier.subscribers, {})
+
+    async def test_unknown_order_is_404(self):
+        response = await self.async_client.get(f'/api/orders/{uuid.uuid4()}/tracking/stream/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_one_poll_fans_out_to_every_subscriber(self):
+        notifier = streams.TrackingNotifier()
+        first, second = asyncio.Queue(), asyncio.Queue()
+        notifier.subscribers[str(self.order.pk)].update({first, second})
+        notifier._start_from_now()
+
+        Shipment.objects.filter(pk=self.shipment.pk).update(status=Shipment.Status.SHIPPED, updated_at=timezone.now())
+        self.add_event('SHIPPED')
+        with self.assertNumQueries(2):
+            changes = notifier.poll(list(notifier.subscribers))
+        for order_id, message in changes:
+            notifier.publish(order_id, message)
+
+        self.assertEqual([kind for _, (kind, _, _) in changes], ['shipment', 'tracking_event'])
+        self.assertEqual(first.qsize(), 2)
+        self.assertEqual(second.qsize(), 2)
+        self.assertEqual(notifier.poll(list(notifier.subscribers)), [])
+
+    async def test_concurrent_subscribers_share_one_poller(self):
+        notifier = streams.TrackingNotifier(interval=0.01)
+        starts = []
+        start_from_now = notifier._start_from_now
+
+        def slow_start():
+            starts.append(True)
+            time.sleep(0.05)  # a second subscriber arrives while the cursor is read
+            start_from_now()
+
+        notifier._start_from_now = slow_start
+
+        async def listen():
+            async with notifier.subscribe(self.order.pk):
+                return notifier._task
+
+        first, second = await asyncio.gather(listen(), listen())
+        self.assertIs(first, second)
+        self.assertEqual(len(starts), 1)
+        await first
+        self.assertEqual(notifier.subscribers, {})
+
+    def test_poll_delivers_an_event_that_commits_late(self):
+        notifier = streams.TrackingNotifier()
+        notifier.subscribers[str(self.order.pk)].add(asyncio.Queue())
+        notifier._start_from_now()
+
+        # The lower id is allocated first but its transaction commits last.
+        late = self.add_event('PACKED')
+        late_pk = late.pk
+        late.delete()
+        early = self.add_event('SHIPPED')
+        changes = notifier.poll(list(notifier.subscribers))
+        self.assertEqual([message[1] for _, message in changes], [early.pk])
+
+        TrackingEvent.objects.create(
+            pk=late_pk, shipment=self.shipment, status='PACKED', description='Packed', occurred_at=timezone.now()
+        )
+        changes = notifier.poll(list(notifier.subscribers))
+        self.assertEqual([message[1] for _, message in changes], [late_pk])
+        self.assertEqual(notifier.poll(list(notifier.subscribers)), [])
+
+    def test_reconnect_replays_missed_events(self):
+        seen = self.shipment.events.order_by('pk').first()
+        replay = streams.events_after(self.order.pk, seen.pk)
+        self.assertEqual([data['status'] for _, _, data in replay], ['PAYMENT_CONFIRMED'])
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Parallel checkouts competing for the same variant must never oversell."""
+
+    buyers = 12
+    stock = 5
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parallel_checkouts_do_not_oversell(self):
+        variant = make_variant(stock_qty=self.stock)
+        for index in range(self.buyers):
+            make_cart(f'guest-{index}', variant)
+
+        barrier = threading.Barrier(self.buyers)
+        statuses = []
+        lock = threading.Lock()
+
+        def checkout(index):
+            client = Client()
+            barrier.wait()
+            status_code = None
+            try:
+                # SQLite raises "database table is locked" instead of waiting
+                # for row locks; retry like a client would until we get an answer.
+                for attempt in range(100):
+                    try:
+                        status_code = client.post(
+                            '/api/orders/checkout/',
+                            CHECKOUT_PAYLOAD,
+                            content_type='application/json',
+                            HTTP_X_CART_SESSION=f'guest-{index}',
+                        ).status_code
+                        break
+                    except OperationalError:
+                        time.sleep(0.01 * (attempt % 5 + 1))
+            finally:
+                connection.close()
+            with lock:
+                statuses.append(status_code)
+
+        threads = [threading.Thread(target=checkout, args=(index,)) for index in range(self.buyers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Count successes from the database: on SQLite a committed checkout can
+        # still fail while rendering its response and be retried into a 400.
+        self.assertNotIn(None, statuses)
+        variant.refresh_from_db()
+        self.assertEqual(Order.objects.count(), self.stock)
+        self.assertEqual(variant.stock_qty, 0)
+        self.assertEqual(
+            sum(StockReservation.objects.values_list('quantity', flat=True)),
+            self.stock,
+        )
+
+
+class LastUnitReservationTests(TransactionTestCase):
+    """Two reservations competing for the last unit: exactly one gets it."""
+
+    def reserve(self, variant):
+        with transaction.atomic():
+            order = Order.objects.create(subtotal=variant.price)
+            reserve_stock(order, [(variant.pk, 1)])
+
+    def test_two_reservations_compete_for_the_last_unit(self):
+        variant = make_variant(stock_qty=1)
+        barrier = threading.Barrier(2)
+        outcomes = []
+        lock = threading.Lock()
+
+        def compete():
+            barrier.wait()
+            outcome = None
+            try:
+                # SQLite reports the write lock instead of waiting; retry it.
+                for attempt in range(100):
+                    try:
+                        self.reserve(variant)
+                        outcome = 'reserved'
+                        break
+                    except InsufficientStock:
+                        outcome = 'short'
+                        break
+                    except OperationalError:
+                        time.sleep(0.01 * (attempt % 5 + 1))
+            finally:
+                connection.close()
+            with lock:
+                outcomes.append(outcome)
+
+        threads = [threading.Thread(target=compete) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['reserved', 'short'])
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock_qty, 0)
+        self.assertEqual(StockReservation.objects.count(), 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_conditional_update_refuses_a_stale_read(self):
+        variant = make_variant(stock_qty=1)
+        raced = []
+
+        def take_last_unit_first(execute, sql, params, many, context):
+            # Another checkout takes the unit between our read and our UPDATE.
+            if not raced and sql.startswith('UPDATE "catalog_productvariant"'):
+                raced.append(True)
+                execute('UPDATE "catalog_productvariant" SET "stock_qty" = 0 WHERE "id" = %s', [variant.pk], False, context)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(take_last_unit_first), self.assertRaises(InsufficientStock):
+            self.reserve(variant)
+        self.assertEqual(raced, [True])
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertFalse(Order.objects.exists())
+
+    def test_shortage_names_the_short_variant_and_its_quantity(self):
+        plenty = make_variant(stock_qty=10, sku='SKU-A')
+        scarce = make_variant(stock_qty=3, sku='SKU-B')
+        raced = []
+
+        def take_scarce_stock_first(execute, sql, params, many, context):
+            if not raced and sql.startswith('UPDATE "catalog_productvariant"'):
+                raced.append(True)
+                execute('UPDATE "catalog_productvariant" SET "stock_qty" = 1 WHERE "id" = %s', [scarce.pk], False, context)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(take_scarce_stock_first), self.assertRaises(InsufficientStock) as raised:
+            with transaction.atomic():
+                order = Order.objects.create(subtotal=Decimal('10.00'))
+                reserve_stock(order, [(plenty.pk, 2), (scarce.pk, 1), (scarce.pk, 1)])
+        self.assertEqual((raised.exception.variant_id, raised.exception.requested), (scarce.pk, 2))
+        plenty.refresh_from_db()
+        self.assertEqual(plenty.stock_qty, 10)
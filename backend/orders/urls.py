@@ -6,6 +6,7 @@ from .views import (
     razorpay_webhook,
     shipping_estimate,
     order_tracking,
+    order_tracking_stream,
 )
 
 order_list = OrderViewSet.as_view({'get': 'list'})
@@ -18,6 +19,7 @@ urlpatterns = [
     path('razorpay/webhook/', razorpay_webhook, name='razorpay-webhook'),
     path('shipping/estimate/', shipping_estimate, name='shipping-estimate'),
     path('<uuid:id>/tracking/', order_tracking, name='order-tracking'),
+    path('<uuid:id>/tracking/stream/', order_tracking_stream, name='order-tracking-stream'),
     path('<uuid:id>/', order_detail, name='order-detail'),
 ]
 
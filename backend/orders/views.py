@@ -1,10 +1,16 @@
+import asyncio
 import hashlib
 import hmac
+import json
 from datetime import date, timedelta
 
 import razorpay
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from rest_framework import status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import AllowAny
@@ -12,8 +18,10 @@ from rest_framework.response import Response
 
 from cart.views import _get_or_create_cart
 
-from .models import Order, Payment, Shipment, TrackingEvent, create_default_shipment_for_order
+from . import streams
+from .models import Order, Payment, Shipment, TrackingEvent, WebhookEvent
 from .serializers import CheckoutSerializer, OrderSerializer, OrderTrackingSerializer
+from .webhooks import event_id_for, process_event, record_event
 
 
 def _get_razorpay_client():
@@ -32,7 +40,7 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     - GET  /api/orders/<id>/      → order detail
     """
 
-    queryset = Order.objects.all().order_by('-created_at')
+    queryset = Order.objects.for_display().order_by('-created_at')
     serializer_class = OrderSerializer
     lookup_field = 'id'
 
@@ -52,13 +60,14 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='checkout')
     def checkout(self, request):
-        cart = _get_or_create_cart(request)
+        cart = _get_or_create_cart(request, create=False)
         serializer = CheckoutSerializer(
             data=request.data,
             context={'request': request, 'cart': cart},
         )
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
+        order = Order.objects.for_display().get(pk=order.pk)
         return Response(
             OrderSerializer(order).data,
             status=status.HTTP_201_CREATED,
@@ -133,29 +142,20 @@ def razorpay_webhook(request):
     if not hmac.compare_digest(expected, signature):
         return Response({"detail": "Invalid signature"}, status=400)
 
-    event = request.data.get("event")
-    payload = request.data.get("payload", {})
-
-    if event == "payment.captured":
-        entity = payload.get("payment", {}).get("entity", {})
-        rzp_order_id = entity.get("order_id")
-        rzp_payment_id = entity.get("id")
-
-        payment = Payment.objects.filter(
-            razorpay_order_id=rzp_order_id
-        ).first()
-
-        if payment:
-            payment.status = Payment.Status.PAID
-            payment.razorpay_payment_id = rzp_payment_id
-            payment.save(update_fields=["status", "razorpay_payment_id", "updated_at"])
-
-            payment.order.status = Order.Status.PAID
-            payment.order.save(update_fields=["status", "updated_at"])
-
-            # Auto-create shipment with seed tracking events
-            create_default_shipment_for_order(payment.order)
+    event, created = record_event(
+        "razorpay",
+        event_id_for(request.headers.get("X-Razorpay-Event-Id"), body),
+        request.data.get("event"),
+        request.data,
+    )
+    if not created and event.status in WebhookEvent.SETTLED_STATUSES:
+        return Response({"status": "ok", "duplicate": True})
 
+    try:
+        process_event(event.pk)
+    except Exception:
+        # Recorded as FAILED on the ledger; a non-2xx makes the gateway retry.
+        return Response({"detail": "Processing failed"}, status=500)
     return Response({"status": "ok"})
 
 
@@ -191,16 +191,78 @@ def shipping_estimate(request):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def order_tracking(request, id):
-    try:
-        order = Order.objects.get(id=id)
-    except Order.DoesNotExist:
+    """
+    Read-only: orders without a shipment report ``null`` until the payment
+    task (or ``manage.py backfill_shipments``) creates one. Responses carry an
+    ETag so polling clients get a bodiless 304 while nothing changed.
+    """
+    order = (
+        Order.objects.select_related("shipment")
+        .prefetch_related("shipment__events")
+        .filter(id=id)
+        .first()
+    )
+    if order is None:
         return Response({"detail": "Order not found"}, status=404)
 
-    # Ensure a shipment exists (lazy-create for orders placed before this feature)
-    if not hasattr(order, "shipment"):
-        create_default_shipment_for_order(order)
-        order.refresh_from_db()
-
     data = OrderTrackingSerializer(order).data
-    return Response(data)
+    etag = _payload_etag(data)
+    if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@require_GET
+async def order_tracking_stream(request, id):
+    """
+    ``text/event-stream`` of ``shipment`` and ``tracking_event`` messages for
+    one order. Serve under ASGI: each open stream is a coroutine, not a thread.
+    """
+    if not await Order.objects.filter(id=id).aexists():
+        return JsonResponse({"detail": "Order not found"}, status=404)
+
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    response = StreamingHttpResponse(
+        _tracking_messages(id, int(last_event_id) if last_event_id.isdigit() else None),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def _tracking_messages(order_id, last_event_id):
+    # Streams end after a while; the browser reconnects with Last-Event-ID.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.TRACKING_STREAM_MAX_SECONDS
+    async with streams.notifier.subscribe(order_id) as queue:
+        yield f"retry: {settings.TRACKING_STREAM_RETRY_MS}\n\n"
+        if last_event_id is not None:
+            for message in await sync_to_async(streams.events_after)(order_id, last_event_id):
+                yield _sse(*message)
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                timeout = min(settings.TRACKING_STREAM_HEARTBEAT_SECONDS, remaining)
+                message = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(*message)
+
+
+def _sse(event, event_id, data) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _payload_etag(data) -> str:
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}"'
 
@@ -0,0 +1,102 @@
+"""
+Payment gateway webhook ingestion.
+
+Every delivery is recorded in the WebhookEvent ledger under the gateway's
+event id, so a retried delivery of an event that was already processed costs
+one indexed lookup. Processing runs once, in a transaction that locks the
+ledger row; slow side effects (shipment seeding) are queued as tasks in that
+same transaction and run by the worker.
+"""
+
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .inventory import consume_reservations
+from .models import Order, Payment, WebhookEvent
+from .tasks import enqueue_shipment
+
+
+def event_id_for(header_value: str | None, body: bytes) -> str:
+    """The gateway's event id, or a digest of the body when none was sent."""
+    return header_value or f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def record_event(gateway: str, event_id: str, event_type: str, payload: dict) -> tuple[WebhookEvent, bool]:
+    """Store a delivery (the whole body) in the ledger; returns ``(event, created)``."""
+    return WebhookEvent.objects.get_or_create(
+        gateway=gateway,
+        event_id=event_id,
+        defaults={"event_type": event_type or "", "payload": payload},
+    )
+
+
+def process_event(event_pk: int) -> WebhookEvent:
+    """
+    Apply an event exactly once. Concurrent deliveries of the same event wait
+    on the ledger row lock and then see it PROCESSED. Errors mark the event
+    FAILED and propagate, so the gateway's retry processes it again.
+    """
+    try:
+        with transaction.atomic():
+            event = WebhookEvent.objects.select_for_update().get(pk=event_pk)
+            if event.status in WebhookEvent.SETTLED_STATUSES:
+                return event
+            handler = HANDLERS.get(event.event_type)
+            event.status = handler(event.payload.get("payload", {})) if handler else WebhookEvent.Status.IGNORED
+            event.attempts += 1
+            event.last_error = ""
+            event.processed_at = timezone.now()
+            event.save(update_fields=["status", "attempts", "last_error", "processed_at"])
+            return event
+    except Exception as exc:
+        WebhookEvent.objects.filter(pk=event_pk).update(
+            status=WebhookEvent.Status.FAILED,
+            attempts=F("attempts") + 1,
+            last_error=repr(exc)[:2000],
+        )
+        raise
+
+
+# ── handlers: return the WebhookEvent status to record ──
+
+
+def handle_payment_captured(payload: dict) -> str:
+    entity = payload.get("payment", {}).get("entity", {})
+    rzp_order_id = entity.get("order_id")
+    if not rzp_order_id:
+        return WebhookEvent.Status.IGNORED
+
+    payment = Payment.objects.select_for_update().filter(razorpay_order_id=rzp_order_id).first()
+    if payment is None or payment.status == Payment.Status.PAID:
+        return WebhookEvent.Status.IGNORED
+    # Locked like release_expired_reservations locks it, so a payment and the
+    # stock sweeper never both act on the same pending order.
+    order = Order.objects.select_for_update().get(pk=payment.order_id)
+
+    now = timezone.now()
+    Payment.objects.filter(pk=payment.pk).update(
+        status=Payment.Status.PAID,
+        razorpay_payment_id=entity.get("id") or "",
+        updated_at=now,
+    )
+    if order.status == Order.Status.CANCELLED:
+        # The money was taken but the order was cancelled first and its stock
+        # released; leave it cancelled and flag the event for a refund.
+        return WebhookEvent.Status.PAID_AFTER_CANCEL
+    if order.status != Order.Status.PENDING_PAYMENT:
+        return WebhookEvent.Status.PROCESSED  # already paid through another payment
+
+    Order.objects.filter(pk=order.pk).update(status=Order.Status.PAID, updated_at=now)
+    consume_reservations(order)
+
+    # Seed the shipment and its tracking events off the request path.
+    enqueue_shipment(order.pk)
+    return WebhookEvent.Status.PROCESSED
+
+
+HANDLERS = {
+    "payment.captured": handle_payment_captured,
+}
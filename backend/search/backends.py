@@ -0,0 +1,250 @@
+"""
+Pluggable product search backends.
+
+``SEARCH_BACKEND`` selects the implementation: ``memory`` (in-process
+inverted index), ``postgres`` (``tsvector`` + GIN) or ``auto`` (postgres
+when the default database is PostgreSQL, memory otherwise).
+
+Both backends rank the same documents (``SearchSource.documents``). On
+PostgreSQL each document is stored as a weighted ``tsvector`` in a side table
+(see ``search.migrations``), kept current by ``refresh_search_documents``.
+"""
+
+import threading
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import IntegerField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from api.cache import get_catalog_version
+from api.category_tree import get_category_tree
+
+from .index import InvertedIndex, tokenize
+
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'brand': 2.0,
+    'category': 1.5,
+    'attributes': 1.0,
+    'description': 0.3,
+}
+
+# tsvector weight class per field; a class ranks at its best field's weight.
+WEIGHT_CLASSES = {
+    'title': 'A',
+    'brand': 'B',
+    'category': 'B',
+    'attributes': 'C',
+    'description': 'D',
+}
+
+
+def _rank_weights() -> list[float]:
+    """``ts_rank`` weights ``{D, C, B, A}`` scaled from FIELD_WEIGHTS."""
+    top = max(FIELD_WEIGHTS.values())
+    return [
+        max(weight for field, weight in FIELD_WEIGHTS.items() if WEIGHT_CLASSES[field] == label) / top
+        for label in 'DCBA'
+    ]
+
+
+def _catalog_documents(ids=None):
+    from catalog.models import Category, Product, ProductVariant
+
+    tree = get_category_tree(Category)
+    variants = ProductVariant.objects.all()
+    rows = Product.objects.filter(is_active=True)
+    if ids is not None:
+        variants = variants.filter(product_id__in=ids)
+        rows = rows.filter(pk__in=ids)
+    attributes = {}
+    for product_id, attrs in variants.values_list('product_id', 'attributes').iterator():
+        values = attrs.values() if isinstance(attrs, dict) else []
+        attributes.setdefault(product_id, []).extend(str(value) for value in values if value not in (None, True, False))
+
+    rows = rows.values_list('pk', 'title', 'description', 'brand__name', 'category_id')
+    for pk, title, description, brand, category_id in rows.iterator():
+        yield pk, {
+            'title': title,
+            'brand': brand or '',
+            'category': ' '.join(node['name'] for node in tree.path(category_id)),
+            'attributes': ' '.join(attributes.get(pk, [])),
+            'description': description,
+        }
+
+
+def _api_documents(ids=None):
+    from api.models import Category, Product
+
+    tree = get_category_tree(Category)
+    rows = Product.objects.filter(is_active=True)
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    rows = rows.values_list('pk', 'name', 'description', 'brand__name', 'category_id')
+    for pk, name, description, brand, category_id in rows.iterator():
+        yield pk, {
+            'title': name,
+            'brand': brand or '',
+            'category': ' '.join(node['name'] for node in tree.path(category_id)),
+            'description': description,
+        }
+
+
+class SearchSource:
+    def __init__(self, model_path, documents, document_table):
+        self.model_path = model_path
+        # documents(ids=None) yields (pk, {field: text}) for active products.
+        self.documents = documents
+        # PostgreSQL only: (product_id, vector) rows, created in search.migrations.
+        self.document_table = document_table
+
+    @property
+    def model(self):
+        from django.apps import apps
+
+        return apps.get_model(self.model_path)
+
+
+SOURCES = {
+    'catalog': SearchSource('catalog.Product', _catalog_documents, 'search_catalog_document'),
+    'api': SearchSource('api.Product', _api_documents, 'search_api_document'),
+}
+
+
+def search_documents_enabled() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def refresh_search_documents(source: str, ids=None, batch_size: int = 500):
+    """
+    Rewrite the stored ``tsvector`` of products ``ids`` (all when None) in
+    ``source``. Inactive or deleted products lose their row. No-op off
+    PostgreSQL, where the in-memory index reads the catalog directly.
+    """
+    if not search_documents_enabled():
+        return
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return
+    config = SOURCES[source]
+    table = connection.ops.quote_name(config.document_table)
+    vector = ' || '.join(
+        f"setweight(to_tsvector('english', %s), '{label}')" for label in WEIGHT_CLASSES.values()
+    )
+    insert = f'INSERT INTO {table} (product_id, vector) VALUES (%s, {vector})'
+    with transaction.atomic(), connection.cursor() as cursor:
+        if ids is None:
+            cursor.execute(f'DELETE FROM {table}')
+        else:
+            cursor.execute(f'DELETE FROM {table} WHERE product_id = ANY(%s)', [ids])
+        documents = config.documents(ids)
+        while batch := list(islice(documents, batch_size)):
+            cursor.executemany(
+                insert, [[pk, *(fields.get(field) or '' for field in WEIGHT_CLASSES)] for pk, fields in batch]
+            )
+
+
+class BaseSearchBackend:
+    def search(self, source: str, query: str, limit: int | None = None) -> list[tuple]:
+        """Return ``[(pk, score), ...]`` ranked best first."""
+        raise NotImplementedError
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    Inverted index per source, rebuilt lazily after a catalog write bumps
+    the catalog version.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def get_index(self, source: str) -> InvertedIndex:
+        version = get_catalog_version()
+        cached = self._indexes.get(source)
+        if cached and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            cached = self._indexes.get(source)
+            if cached and cached[0] == version:
+                return cached[1]
+            index = InvertedIndex(SOURCES[source].documents(), FIELD_WEIGHTS)
+            self._indexes[source] = (version, index)
+            return index
+
+    def search(self, source, query, limit=None):
+        return self.get_index(source).search(query, limit=limit)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Weighted ``tsvector`` match + ``ts_rank`` ordering over the stored
+    documents, served by a GIN index.
+    """
+
+    def search(self, source, query, limit=None):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        config = SOURCES[source]
+        model = config.model
+        quote = connection.ops.quote_name
+        sql = (
+            f"SELECT d.product_id, ts_rank(%s::float4[], d.vector, q.query) AS rank "
+            f"FROM {quote(config.document_table)} d "
+            f"JOIN {quote(model._meta.db_table)} p ON p.{quote(model._meta.pk.column)} = d.product_id, "
+            f"to_tsquery('english', %s) q(query) "
+            f"WHERE p.is_active AND d.vector @@ q.query "
+            f"ORDER BY rank DESC, d.product_id"
+        )
+        params = [_rank_weights(), ' & '.join(f'{token}:*' for token in tokens)]
+        if limit:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend() -> BaseSearchBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = settings.SEARCH_BACKEND
+                if name == 'auto':
+                    name = 'postgres' if connection.vendor == 'postgresql' else 'memory'
+                backends = {'memory': InMemorySearchBackend, 'postgres': PostgresSearchBackend}
+                backend_class = backends[name] if name in backends else import_string(name)
+                _backend = backend_class()
+    return _backend
+
+
+def search_ids(source: str, query: str) -> list:
+    """Ranked primary keys matching ``query``, capped at SEARCH_MAX_RESULTS."""
+    hits = get_search_backend().search(source, query, limit=settings.SEARCH_MAX_RESULTS)
+    return [pk for pk, _ in hits]
+
+
+def rank_order(model, ranked_ids) -> RawSQL:
+    """
+    ``order_by`` expression listing ``ranked_ids`` rows in rank order. One SQL
+    ``CASE pk WHEN ...`` is built directly: a ``When`` per id costs ~0.2 ms each
+    to compile.
+    """
+    pk = model._meta.pk
+    column = f'{connection.ops.quote_name(model._meta.db_table)}.{connection.ops.quote_name(pk.column)}'
+    params = []
+    for rank, value in enumerate(ranked_ids):
+        params += [pk.get_db_prep_value(value, connection), rank]
+    whens = ' '.join(['WHEN %s THEN %s'] * len(ranked_ids)) or 'WHEN NULL THEN 0'
+    return RawSQL(f'CASE {column} {whens} END', params, output_field=IntegerField())
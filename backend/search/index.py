@@ -0,0 +1,87 @@
+"""
+Small in-process inverted index with BM25 scoring and prefix expansion.
+"""
+
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+PREFIX_WEIGHT = 0.7
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class InvertedIndex:
+    """
+    Build once from ``(doc_id, {field: text})`` pairs, then query.
+
+    Term frequencies are weighted per field (``field_weights``), so a title
+    hit counts more than a hit in a variant attribute.
+    """
+
+    def __init__(self, documents, field_weights):
+        self.postings = defaultdict(dict)  # term -> {doc_id: weighted tf}
+        self.doc_lengths = {}
+        for doc_id, fields in documents:
+            length = 0.0
+            for field, text in fields.items():
+                weight = field_weights.get(field, 1.0)
+                for term in tokenize(text):
+                    self.postings[term][doc_id] = self.postings[term].get(doc_id, 0.0) + weight
+                    length += weight
+            self.doc_lengths[doc_id] = length
+        self.postings = dict(self.postings)
+        self.vocabulary = sorted(self.postings)
+        self.doc_count = len(self.doc_lengths)
+        self.avg_length = (sum(self.doc_lengths.values()) / self.doc_count) if self.doc_count else 0.0
+
+    def expand(self, token: str) -> dict[str, float]:
+        """Exact term plus vocabulary terms starting with ``token``."""
+        terms = {}
+        if token in self.postings:
+            terms[token] = 1.0
+        start = bisect_left(self.vocabulary, token)
+        for term in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(token):
+                break
+            terms.setdefault(term, PREFIX_WEIGHT)
+        return terms
+
+    def search(self, query: str, limit: int | None = None) -> list[tuple]:
+        """
+        Return ``[(doc_id, score), ...]`` best first. Every query token must
+        match (exactly or as a prefix) for a document to be returned.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.doc_count:
+            return []
+
+        scores = None
+        for token in tokens:
+            token_scores = defaultdict(float)
+            for term, boost in self.expand(token).items():
+                postings = self.postings[term]
+                idf = math.log(1 + (self.doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = 1 - B + B * self.doc_lengths[doc_id] / self.avg_length
+                    score = boost * idf * tf * (K1 + 1) / (tf + K1 * norm)
+                    token_scores[doc_id] = max(token_scores[doc_id], score)
+            if scores is None:
+                scores = dict(token_scores)
+            else:
+                scores = {doc_id: scores[doc_id] + s for doc_id, s in token_scores.items() if doc_id in scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+        return ranked[:limit] if limit else ranked
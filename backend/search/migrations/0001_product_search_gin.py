@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:20
+
+from django.db import migrations
+
+# Expressions must match SearchSource.vector_sql in search.backends.
+INDEXES = {
+    'catalog_product_search_gin': (
+        'catalog_product',
+        "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))",
+    ),
+    'api_product_search_gin': (
+        'api_product',
+        "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))",
+    ),
+}
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, (table, expression) in INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING GIN ({expression})')
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_keyset_indexes'),
+        ('catalog', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
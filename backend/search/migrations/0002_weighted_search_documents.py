@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:00
+
+from django.db import migrations
+
+# Table names must match SearchSource.document_table in search.backends.
+TABLES = {
+    'search_catalog_document': ('catalog', 'catalog_product', 'bigint'),
+    'search_api_document': ('api', 'api_product', 'uuid'),
+}
+
+
+def create_document_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS catalog_product_search_gin')
+    schema_editor.execute('DROP INDEX IF EXISTS api_product_search_gin')
+    for table, (source, products, pk_type) in TABLES.items():
+        schema_editor.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            f'product_id {pk_type} PRIMARY KEY REFERENCES {products} (id) ON DELETE CASCADE, '
+            f'vector tsvector NOT NULL)'
+        )
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {table}_gin ON {table} USING GIN (vector)')
+
+
+def backfill_documents(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Live code on purpose: documents must be built exactly as the search
+    # backend builds them. A fresh database has no products to index.
+    from search.backends import refresh_search_documents
+
+    for table, (source, products, pk_type) in TABLES.items():
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {products})')
+            if cursor.fetchone()[0]:
+                refresh_search_documents(source)
+
+
+def drop_document_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS catalog_product_search_gin ON catalog_product USING GIN '
+        "(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '')))"
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS api_product_search_gin ON api_product USING GIN '
+        "(to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')))"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_hot_lookup_indexes'),
+        ('catalog', '0005_rename_min_mrp_from_mrp'),
+        ('search', '0001_product_search_gin'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_document_tables, drop_document_tables),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
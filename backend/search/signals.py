@@ -0,0 +1,71 @@
+"""
+Keep the PostgreSQL search documents in step with the catalog. A product's
+document also embeds its brand name, category path and variant attributes,
+so edits to those rows refresh every product that shows them.
+
+Bulk writers (the catalog importer, the load generator) send no signals and
+call ``refresh_search_documents`` themselves.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from api import models as api_models
+from api.category_tree import get_category_tree
+from catalog import models as catalog_models
+
+from .backends import refresh_search_documents, search_documents_enabled
+
+SOURCE_MODELS = {
+    'catalog': catalog_models,
+    'api': api_models,
+}
+
+
+def _products_showing(source, instance) -> list:
+    models = SOURCE_MODELS[source]
+    products = models.Product.objects.all()
+    if isinstance(instance, models.Brand):
+        return list(products.filter(brand=instance).values_list('pk', flat=True))
+    # The category's own products and those of every subcategory below it.
+    category_ids = get_category_tree(models.Category).descendant_ids(instance.slug) or {instance.pk}
+    return list(products.filter(category_id__in=category_ids).values_list('pk', flat=True))
+
+
+def _connect(source):
+    models = SOURCE_MODELS[source]
+
+    def product_saved(sender, instance, **kwargs):
+        if search_documents_enabled():
+            refresh_search_documents(source, [instance.pk])
+
+    def label_saved(sender, instance, **kwargs):
+        if search_documents_enabled():
+            refresh_search_documents(source, _products_showing(source, instance))
+
+    def label_deleting(sender, instance, **kwargs):
+        # SET_NULL clears the foreign keys before post_delete; remember who pointed here.
+        if search_documents_enabled():
+            instance._search_product_ids = _products_showing(source, instance)
+
+    def label_deleted(sender, instance, **kwargs):
+        if search_documents_enabled():
+            refresh_search_documents(source, getattr(instance, '_search_product_ids', []))
+
+    uid = f'search-documents-{source}'
+    post_save.connect(product_saved, sender=models.Product, weak=False, dispatch_uid=f'{uid}-product')
+    for model in (models.Brand, models.Category):
+        label = model._meta.model_name
+        post_save.connect(label_saved, sender=model, weak=False, dispatch_uid=f'{uid}-{label}-save')
+        pre_delete.connect(label_deleting, sender=model, weak=False, dispatch_uid=f'{uid}-{label}-pre-delete')
+        post_delete.connect(label_deleted, sender=model, weak=False, dispatch_uid=f'{uid}-{label}-delete')
+
+
+def variant_changed(sender, instance, **kwargs):
+    if search_documents_enabled():
+        refresh_search_documents('catalog', [instance.product_id])
+
+
+for source in SOURCE_MODELS:
+    _connect(source)
+post_save.connect(variant_changed, sender=catalog_models.ProductVariant, dispatch_uid='search-documents-variant-save')
+post_delete.connect(variant_changed, sender=catalog_models.ProductVariant, dispatch_uid='search-documents-variant-delete')
@@ -0,0 +1,105 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from api.cache import check_shared_cache
+from api.models import Product as ApiProduct
+from catalog.models import Brand, Category, Product, ProductVariant
+
+from . import backends
+
+
+class RankedListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Phones", slug="phones")
+        # Created oldest first, so "-created_at" and rank disagree.
+        for slug, title, description in [
+            ("a-title", "Nova Phone", "Nova nova nova"),
+            ("b-desc", "Basic Phone", "Mentions nova once"),
+            ("c-none", "Other Phone", "Nothing here"),
+            ("d-title", "Nova Lite", ""),
+        ]:
+            Product.objects.create(slug=slug, title=title, description=description, brand=brand, category=category)
+        for name, description in [("Zen Nova", ""), ("Alpha", "nova")]:
+            ApiProduct.objects.create(name=name, slug=name.lower().replace(" ", "-"), description=description, price=Decimal("10"))
+
+    def setUp(self):
+        cache.clear()
+        backends._backend = None
+
+    def slugs(self, url):
+        return [item["slug"] for item in self.client.get(url).json()["results"]]
+
+    def test_catalog_search_keeps_rank_order(self):
+        ranked = backends.search_ids("catalog", "nova")
+        expected = dict(Product.objects.values_list("pk", "slug"))
+        self.assertEqual(self.slugs("/api/catalog/products/?search=nova"), [expected[pk] for pk in ranked])
+        self.assertEqual(self.slugs("/api/catalog/products/?search=nova")[-1], "b-desc")
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(self.slugs("/api/catalog/products/?search=nova&ordering=title"), ["b-desc", "d-title", "a-title"])
+
+    def test_api_search_keeps_rank_order(self):
+        self.assertEqual(self.slugs("/api/products/?search=nova"), ["zen-nova", "alpha"])
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_search_listings_are_capped_at_the_best_matches(self):
+        body = self.client.get("/api/catalog/products/?search=nova").json()
+        self.assertEqual(body["count"], 2)
+        self.assertNotIn("b-desc", [item["slug"] for item in body["results"]])
+
+
+class SearchDocumentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.brand = Brand.objects.create(name="Zephyr", slug="zephyr")
+        cls.parent = Category.objects.create(name="Electronics", slug="electronics")
+        child = Category.objects.create(name="Phones", slug="phones", parent=cls.parent)
+        cls.product = Product.objects.create(slug="p", title="Basic", description="", brand=cls.brand, category=child)
+        ProductVariant.objects.create(product=cls.product, sku="p-1", price=Decimal("10"), attributes={"color": "Teal"})
+        Product.objects.create(slug="q", title="Other", description="", brand=cls.brand, category=child)
+
+    def setUp(self):
+        cache.clear()
+        backends._backend = None
+
+    def test_documents_carry_brand_category_path_and_attributes(self):
+        documents = dict(backends.SOURCES["catalog"].documents([self.product.pk]))
+        self.assertEqual(list(documents), [self.product.pk])
+        fields = documents[self.product.pk]
+        self.assertEqual(fields["brand"], "Zephyr")
+        self.assertEqual(fields["category"], "Electronics Phones")
+        self.assertEqual(fields["attributes"], "Teal")
+
+    def test_weight_classes_rank_in_field_weight_order(self):
+        self.assertEqual(backends._rank_weights(), sorted(backends._rank_weights()))
+        self.assertEqual(backends._rank_weights()[-1], 1.0)
+
+    @skipUnless(connection.vendor == "postgresql", "stored search documents are PostgreSQL only")
+    @override_settings(SEARCH_BACKEND="postgres")
+    def test_postgres_matches_brand_category_and_attributes_and_follows_renames(self):
+        for query in ["zephyr", "electronics", "teal"]:
+            with self.subTest(query=query):
+                self.assertIn(self.product.pk, backends.search_ids("catalog", query))
+        self.parent.name = "Gadgets"
+        self.parent.save()
+        self.assertEqual(len(backends.search_ids("catalog", "gadgets")), 2)
+        self.assertEqual(backends.search_ids("catalog", "electronics"), [])
+
+
+class SharedCacheCheckTests(TestCase):
+    @override_settings(WEB_CONCURRENCY=4)
+    def test_several_workers_need_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_cache()
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}):
+            check_shared_cache()
+
+    def test_one_worker_may_use_local_memory(self):
+        check_shared_cache()
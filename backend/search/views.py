@@ -0,0 +1,41 @@
+from rest_framework.decorators import api_view
+from rest_framework.pagination import PageNumberPagination
+
+from api.category_tree import get_category_tree
+from catalog.models import Category, Product
+from catalog.serializers import ProductListSerializer
+
+from .backends import search_ids
+
+
+@api_view(["GET"])
+def search_products(request):
+    """
+    Ranked catalog search:
+    - ``q``: search text (prefix matching on every word)
+    - ``brand`` / ``category``: optional slug filters
+    """
+    query = request.query_params.get("q", "").strip()
+    ranked = search_ids("catalog", query) if query else []
+
+    if ranked:
+        candidates = Product.objects.filter(pk__in=ranked, is_active=True)
+        brand = request.query_params.get("brand")
+        if brand:
+            candidates = candidates.filter(brand__slug=brand)
+        category = request.query_params.get("category")
+        if category:
+            candidates = candidates.filter(
+                category_id__in=get_category_tree(Category).descendant_ids(category)
+            )
+        allowed = set(candidates.values_list("pk", flat=True))
+        ranked = [pk for pk in ranked if pk in allowed]
+
+    paginator = PageNumberPagination()
+    page_ids = paginator.paginate_queryset(ranked, request)
+    products = Product.objects.filter(pk__in=page_ids).select_related(
+        "brand", "category", "listing_summary"
+    )
+    by_pk = {product.pk: product for product in products}
+    page = [by_pk[pk] for pk in page_ids if pk in by_pk]
+    return paginator.get_paginated_response(ProductListSerializer(page, many=True).data)
@@ -0,0 +1,29 @@
+"""Run the database-backed task worker."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Claim and run queued tasks on a thread or process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.TASKS_WORKER_CONCURRENCY)
+        parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls when idle")
+        parser.add_argument("--once", action="store_true", help="Drain the due tasks, then exit")
+
+    def handle(self, *args, **options):
+        requeue_stale()
+        worker = Worker(
+            concurrency=options["concurrency"],
+            mode=options["mode"],
+            poll_interval=options["poll_interval"],
+        )
+        self.stdout.write(
+            f"Worker {worker.owner} started ({options['mode']} pool x{options['concurrency']})"
+        )
+        processed = worker.run(once=options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Done! {processed} tasks processed"))
@@ -0,0 +1,56 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """A queued call to a registered task function (see ``tasks.registry``)."""
+
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        SUCCEEDED = "SUCCEEDED", "Succeeded"
+        FAILED = "FAILED", "Failed"
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Optional: at most one QUEUED/RUNNING task per key.
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: due QUEUED tasks in run_at order.
+            models.Index(
+                fields=["run_at", "id"],
+                condition=models.Q(status="QUEUED"),
+                name="tasks_task_due_idx",
+            ),
+            models.Index(
+                fields=["locked_at"],
+                condition=models.Q(status="RUNNING"),
+                name="tasks_task_running_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status__in=["QUEUED", "RUNNING"]),
+                name="tasks_task_pending_dedupe",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,74 @@
+"""
+Task registration and enqueueing.
+
+    from tasks.registry import task
+
+    @task(max_attempts=3)
+    def send_receipt(order_id):
+        ...
+
+    send_receipt.enqueue(str(order.pk))
+
+``enqueue`` writes the task row on the caller's connection, so inside
+``transaction.atomic`` it commits or rolls back together with the data it
+refers to, and no worker can pick it up before that commit (the guarantee of
+``transaction.on_commit``, without a window where a crash after commit loses
+the side effect). Arguments must be JSON-serializable.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+REGISTRY = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name: str, max_attempts: int):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, dedupe_key: str | None = None, delay: float = 0, **kwargs):
+        """
+        Queue a call. With ``dedupe_key`` nothing is added while a task with
+        that key is still queued or running; returns None in that case.
+        """
+        from .models import Task
+
+        task = Task(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            dedupe_key=dedupe_key,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+        if dedupe_key is None:
+            task.save()
+            return task
+        try:
+            with transaction.atomic():
+                task.save()
+        except IntegrityError:
+            return None
+        return task
+
+
+def task(func=None, *, name: str | None = None, max_attempts: int | None = None):
+    """Register ``func`` as a task; usable as ``@task`` or ``@task(...)``."""
+
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__qualname__}"
+        attempts = max_attempts or settings.TASKS_MAX_ATTEMPTS
+        wrapped = TaskFunction(func, task_name, attempts)
+        REGISTRY[task_name] = wrapped
+        return wrapped
+
+    return decorator(func) if func is not None else decorator
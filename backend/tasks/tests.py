@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from .models import Task
+from .registry import task
+from .worker import Worker, claim, extend_leases, requeue_stale, run_pending
+
+CALLS = []
+
+
+@task(name="tests.record")
+def record(value):
+    CALLS.append(value)
+
+
+@task(name="tests.explode", max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_task_runs_once(self):
+        record.enqueue("a")
+        self.assertEqual(CALLS, [])
+        self.assertEqual(run_pending(), {Task.Status.SUCCEEDED: 1})
+        self.assertEqual(CALLS, ["a"])
+        self.assertEqual(run_pending(), {})
+
+    def test_dedupe_key_skips_pending_duplicates(self):
+        self.assertIsNotNone(record.enqueue("a", dedupe_key="k"))
+        self.assertIsNone(record.enqueue("a", dedupe_key="k"))
+        run_pending()
+        self.assertIsNotNone(record.enqueue("a", dedupe_key="k"))
+
+    @override_settings(TASKS_RETRY_BACKOFF_SECONDS=60)
+    def test_failures_retry_with_backoff_then_fail(self):
+        queued = explode.enqueue()
+        self.assertEqual(run_pending(), {Task.Status.QUEUED: 1})
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 1)
+        self.assertGreaterEqual(queued.run_at, timezone.now() + timedelta(seconds=59))
+        self.assertIn("boom", queued.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending(), {Task.Status.FAILED: 1})
+
+    def test_expired_lease_is_requeued(self):
+        queued = record.enqueue("a")
+        Task.objects.update(status=Task.Status.RUNNING, attempts=1, locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(lease_seconds=60), 1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.Status.QUEUED)
+
+    def test_heartbeat_keeps_a_long_task_leased(self):
+        mine = record.enqueue("a")
+        theirs = record.enqueue("b")
+        claim(1, owner="worker-1")
+        claim(1, owner="worker-2")
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(extend_leases("worker-1"), 1)
+        self.assertEqual(requeue_stale(lease_seconds=60), 1)
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertEqual(mine.status, Task.Status.RUNNING)
+        self.assertEqual(theirs.status, Task.Status.QUEUED)
+
+
+class SingleWorkerTests(TransactionTestCase):
+    """One pool thread never competes with another writer, so this runs on SQLite too."""
+
+    def test_single_worker_drains_queue(self):
+        CALLS.clear()
+        for value in range(4):
+            record.enqueue(value)
+        explode.enqueue()
+        processed = Worker(concurrency=1, poll_interval=0.5).run(once=True)
+        self.assertEqual(processed, 5)
+        self.assertEqual(CALLS, list(range(4)))
+        self.assertEqual(Task.objects.filter(status=Task.Status.SUCCEEDED).count(), 4)
+        self.assertEqual(Task.objects.filter(status=Task.Status.QUEUED, attempts=1).count(), 1)
+
+
+# In-memory SQLite rejects concurrent writers ("table is locked") instead of
+# waiting, so the pool is only exercised on a real concurrent database.
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+class WorkerTests(TransactionTestCase):
+    def test_thread_pool_drains_queue(self):
+        CALLS.clear()
+        for value in range(6):
+            record.enqueue(value)
+        processed = Worker(concurrency=3, poll_interval=0.05).run(once=True)
+        self.assertEqual(processed, 6)
+        self.assertEqual(sorted(CALLS), list(range(6)))
+        self.assertEqual(Task.objects.filter(status=Task.Status.SUCCEEDED).count(), 6)
@@ -0,0 +1,186 @@
+"""
+Database-backed task worker.
+
+Workers claim due QUEUED tasks (``SELECT ... FOR UPDATE SKIP LOCKED`` where
+supported, so several workers never claim the same row), run them on a
+thread or process pool, and record the outcome. A failing task is retried
+with exponential backoff until ``max_attempts``; a RUNNING task whose worker
+died is requeued once its lease expires. A running Worker renews the lease of
+its in-flight tasks every third of ``TASKS_LEASE_SECONDS``, so a task may run
+for longer than the lease; only ``run_pending`` (inline, no heartbeat) must
+finish each task within it.
+"""
+
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+from .registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number ``attempts``: base * 2^(n-1), capped, with jitter."""
+    base = settings.TASKS_RETRY_BACKOFF_SECONDS
+    delay = min(base * 2 ** max(attempts - 1, 0), settings.TASKS_RETRY_BACKOFF_MAX_SECONDS)
+    return delay + random.uniform(0, base)
+
+
+def claim(limit: int, owner: str | None = None, now=None) -> list[int]:
+    """Mark up to ``limit`` due tasks RUNNING for ``owner``; returns their ids."""
+    now = now or timezone.now()
+    owner = owner or worker_id()
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        due = Task.objects.filter(status=Task.Status.QUEUED, run_at__lte=now).order_by("run_at", "pk")
+        if skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list("pk", flat=True)[:limit])
+        if not ids:
+            return []
+        running = dict(status=Task.Status.RUNNING, locked_at=now, locked_by=owner, attempts=F("attempts") + 1)
+        if skip_locked:
+            Task.objects.filter(pk__in=ids).update(**running)
+            return ids
+        # Without row locks another worker may race us: keep only rows we flipped.
+        return [pk for pk in ids if Task.objects.filter(pk=pk, status=Task.Status.QUEUED).update(**running)]
+
+
+def execute(task_id: int) -> str:
+    """Run one claimed task and store its outcome; returns the new status."""
+    close_old_connections()
+    try:
+        task = Task.objects.get(pk=task_id)
+        try:
+            func = REGISTRY.get(task.name)
+            if func is None:
+                raise LookupError(f"Unknown task {task.name!r}")
+            func(*task.args, **task.kwargs)
+        except Exception as exc:
+            logger.exception("Task %s #%s failed (attempt %s)", task.name, task.pk, task.attempts)
+            return _failed(task, exc)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.Status.SUCCEEDED,
+            locked_at=None,
+            last_error="",
+            updated_at=timezone.now(),
+        )
+        return Task.Status.SUCCEEDED
+    finally:
+        close_old_connections()
+
+
+def _failed(task: Task, exc: Exception) -> str:
+    now = timezone.now()
+    fields = dict(locked_at=None, locked_by="", last_error=repr(exc)[:4000], updated_at=now)
+    if task.attempts < task.max_attempts:
+        status = Task.Status.QUEUED
+        fields["run_at"] = now + timedelta(seconds=backoff_seconds(task.attempts))
+    else:
+        status = Task.Status.FAILED
+    Task.objects.filter(pk=task.pk).update(status=status, **fields)
+    return status
+
+
+def requeue_stale(lease_seconds: int | None = None, now=None) -> int:
+    """Return RUNNING tasks whose lease expired (crashed worker) to the queue."""
+    now = now or timezone.now()
+    lease_seconds = settings.TASKS_LEASE_SECONDS if lease_seconds is None else lease_seconds
+    stale = Task.objects.filter(status=Task.Status.RUNNING, locked_at__lt=now - timedelta(seconds=lease_seconds))
+    exhausted = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Task.Status.FAILED, locked_at=None, last_error="Lease expired", updated_at=now
+    )
+    requeued = stale.update(status=Task.Status.QUEUED, locked_at=None, locked_by="", updated_at=now)
+    return exhausted + requeued
+
+
+def extend_leases(owner: str, now=None) -> int:
+    """Heartbeat: renew the lease of every task ``owner`` is still running."""
+    now = now or timezone.now()
+    return Task.objects.filter(status=Task.Status.RUNNING, locked_by=owner).update(locked_at=now)
+
+
+def run_pending(limit: int = 100) -> dict:
+    """Run every due task inline, in this thread. Handy in tests and cron."""
+    counts = {}
+    while True:
+        ids = claim(limit)
+        if not ids:
+            return counts
+        for task_id in ids:
+            status = execute(task_id)
+            counts[status] = counts.get(status, 0) + 1
+
+
+def _init_process():
+    import django
+
+    django.setup()  # no-op when forked; needed under the "spawn" start method
+    # Forked children must not share the parent's database sockets.
+    connections.close_all()
+
+
+class Worker:
+    def __init__(self, concurrency: int = 4, mode: str = "thread", poll_interval: float = 1.0):
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.owner = worker_id()
+        self.stopping = threading.Event()
+        self.processed = 0
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def _executor(self):
+        if self.mode == "process":
+            connections.close_all()
+            return ProcessPoolExecutor(max_workers=self.concurrency, initializer=_init_process)
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="task-worker")
+
+    def run(self, once: bool = False) -> int:
+        """Poll until stopped (SIGINT/SIGTERM) or, with ``once``, until the queue is drained."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        in_flight = set()
+        heartbeat_seconds = settings.TASKS_LEASE_SECONDS / 3
+        last_heartbeat = timezone.now()
+        with self._executor() as pool:
+            while not self.stopping.is_set():
+                now = timezone.now()
+                if in_flight and (now - last_heartbeat).total_seconds() >= heartbeat_seconds:
+                    extend_leases(self.owner, now=now)
+                    last_heartbeat = now
+                requeue_stale()
+                free = self.concurrency - len(in_flight)
+                ids = claim(free, owner=self.owner) if free else []
+                in_flight.update(pool.submit(execute, task_id) for task_id in ids)
+                if once and not ids and not in_flight:
+                    break
+                if in_flight:
+                    done, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    self.processed += len(done)
+                elif not ids:
+                    self.stopping.wait(self.poll_interval)
+            # Let claimed tasks finish so none is left RUNNING until its lease expires.
+            done, _ = wait(in_flight)
+            self.processed += len(done)
+        return self.processed
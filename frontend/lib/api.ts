@@ -196,3 +196,30 @@ export async function getOrderTracking(id: string) {
     };
   }>(`/api/orders/${id}/tracking/`);
 }
+
+export type TrackingStreamHandlers = {
+  onShipment?: (shipment: {
+    status: string;
+    carrier: string;
+    tracking_number: string;
+    estimated_delivery_date: string | null;
+  }) => void;
+  onEvent?: (event: {
+    status: string;
+    description: string;
+    location: string;
+    occurred_at: string;
+  }) => void;
+};
+
+/** Live tracking updates over SSE; returns a function that closes the stream. */
+export function subscribeToOrderTracking(id: string, handlers: TrackingStreamHandlers) {
+  const source = new EventSource(`${API_BASE}/api/orders/${id}/tracking/stream/`);
+  source.addEventListener("shipment", (e) =>
+    handlers.onShipment?.(JSON.parse((e as MessageEvent).data)),
+  );
+  source.addEventListener("tracking_event", (e) =>
+    handlers.onEvent?.(JSON.parse((e as MessageEvent).data)),
+  );
+  return () => source.close();
+}
@@ -57,13 +57,15 @@ export type ProductDetail = {
 export type CartItem = {
   id: number;
   product_variant: ProductVariant;
+  product_title?: string;
+  image_url?: string;
   quantity: number;
   price_snapshot: number | string;
   mrp_snapshot: number | string | null;
 };
 
 export type Cart = {
-  id: string;
+  id: string | null;
   item_count: number;
   subtotal: number | string;
   items: CartItem[];